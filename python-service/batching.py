@@ -0,0 +1,164 @@
+"""
+AEGIS NET - Micro-batching
+Collects calls from concurrent requests on the event loop and evaluates
+them together, trading a few milliseconds of latency for per-call
+overhead paid once per batch instead of once per request.
+
+  * MicroBatcher  single feature rows -> one array call on a worker thread
+  * Coalescer     whole requests -> one batch handler, identical requests
+                  deduplicated
+
+A batch is flushed when it reaches max_batch entries or max_delay seconds
+after its first entry arrived, whichever comes first.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Coalesce submit(row) calls into fn(rows) on a worker thread"""
+
+    def __init__(self, fn: Callable[[np.ndarray], Any], max_batch: int = 256,
+                 max_delay: float = 0.002):
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay  # seconds
+        self._pending: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+
+    async def submit(self, row: np.ndarray) -> Any:
+        """Result row for one input row"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[np.ndarray, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.rows += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            results = await asyncio.to_thread(self.fn, np.vstack([row for row, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "max_batch": self.max_batch,
+            "max_delay_ms": self.max_delay * 1000,
+        }
+
+
+class Coalescer:
+    """Gather concurrent requests into batches, deduplicating identical ones
+
+    submit(item) waits for handler(unique_items) -> results in the same
+    order (an Exception result fails only its own callers). Requests whose
+    key is already pending or in flight share that result instead of
+    being computed again.
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], Awaitable[List[Any]]],
+                 key: Callable[[Any], str], max_batch: int = 64, max_delay: float = 0.002):
+        self.handler = handler
+        self.key = key
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay  # seconds
+        self._pending: Dict[str, Tuple[Any, asyncio.Future]] = {}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.requests = 0
+        self.deduplicated = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.largest_batch = 0
+
+    async def submit(self, item: Any) -> Any:
+        self.requests += 1
+        key = self.key(item)
+        shared = self._in_flight.get(key)
+        if shared is None and key in self._pending:
+            shared = self._pending[key][1]
+        if shared is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(shared)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[key] = (item, future)
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            self._in_flight.update({key: future for key, (_, future) in batch.items()})
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[str, Tuple[Any, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.batched_items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            results = await self.handler([item for item, _ in batch.values()])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (key, (_, future)), result in zip(batch.items(), results):
+            self._in_flight.pop(key, None)
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "deduplicated": self.deduplicated,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "max_batch": self.max_batch,
+            "window_ms": self.max_delay * 1000,
+        }
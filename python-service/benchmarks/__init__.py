@@ -0,0 +1,6 @@
+"""
+AEGIS NET - Benchmarks
+Microbenchmarks of the prediction and routing methods and a load
+generator for /predict, with JSON results for regression gating.
+Run from python-service/ (see benchmarks/run.py).
+"""
@@ -0,0 +1,192 @@
+"""
+AEGIS NET - Load generator
+Drives POST /predict at a fixed concurrency and reports throughput and
+latency percentiles.
+
+  * asgi   the FastAPI app in-process: requests are handed straight to the
+           ASGI callable, so no sockets or client library are measured
+  * http   any server over HTTP/1.1 keep-alive connections, one client
+           thread per concurrent connection (e.g. simple-server.py, which
+           simple_server() launches on a free port)
+"""
+
+import asyncio
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def summarize(latencies: List[float], errors: int, wall: float) -> dict:
+    ms = np.asarray(latencies) * 1000 if latencies else np.zeros(1)
+    p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 1) if wall > 0 else 0.0,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+async def asgi_request(app, method: str, path: str, body: bytes = b"",
+                       headers: Optional[List[Tuple[bytes, bytes]]] = None) -> Tuple[int, bytes]:
+    """One request through the ASGI callable: (status, body)"""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"benchmark"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())] + (headers or []),
+        "client": ("127.0.0.1", 0), "server": ("benchmark", 80),
+    }
+    done = asyncio.Event()
+    delivered = False
+    status = 500
+    chunks = []
+
+    async def receive():
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()  # streaming responses listen for disconnects
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+    done.set()
+    return status, b"".join(chunks)
+
+
+async def run_asgi_load(app, make_body: Callable[[int], dict], concurrency: int, requests: int,
+                        path: str = "/predict", warmup: int = 20) -> dict:
+    """requests POSTs from concurrency workers against app"""
+    for i in range(warmup):
+        await asgi_request(app, "POST", path, json.dumps(make_body(-1 - i)).encode())
+    bodies = [json.dumps(make_body(i)).encode() for i in range(requests)]
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < requests:
+            body = bodies[next_index]
+            next_index += 1
+            start = time.perf_counter()
+            status, _ = await asgi_request(app, "POST", path, body)
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def run_http_load(host: str, port: int, make_body: Callable[[int], dict], concurrency: int,
+                  requests: int, path: str = "/predict", warmup: int = 20) -> dict:
+    """requests POSTs from concurrency threads, each on its own connection"""
+    bodies = [json.dumps(make_body(i)).encode() for i in range(requests)]
+    headers = {"Content-Type": "application/json"}
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    next_index = [0]
+
+    def post(conn: http.client.HTTPConnection, body: bytes) -> int:
+        conn.request("POST", path, body, headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+
+    warm = http.client.HTTPConnection(host, port, timeout=30)
+    for i in range(warmup):
+        post(warm, json.dumps(make_body(-1 - i)).encode())
+    warm.close()
+
+    def worker():
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        while True:
+            with lock:
+                if next_index[0] >= requests:
+                    break
+                body = bodies[next_index[0]]
+                next_index[0] += 1
+            start = time.perf_counter()
+            try:
+                ok = post(conn, body) == 200
+            except (OSError, http.client.HTTPException):
+                conn.close()  # reconnect on the next request
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], time.perf_counter() - start)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def simple_server(timeout: float = 10.0) -> Iterator[Tuple[str, int]]:
+    """simple-server.py running on a free port: yields (host, port)"""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(SERVICE_DIR, "simple-server.py"), str(port)],
+        cwd=SERVICE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                conn.request("GET", "/health")
+                conn.getresponse().read()
+                conn.close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    raise RuntimeError("simple-server.py did not start")
+                time.sleep(0.05)
+        yield "127.0.0.1", port
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
@@ -0,0 +1,102 @@
+"""
+AEGIS NET - Microbenchmarks
+Times each AsteroidImpactPredictor and EvacuationOptimizer method across
+input sizes: median and best seconds per call over repeated timing runs,
+each run long enough (min_time) to dwarf timer resolution.
+"""
+
+import statistics
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from benchmarks.scenarios import ASTEROIDS, USER_LOCATION
+
+
+def time_call(fn: Callable[[], object], min_time: float = 0.05, repeat: int = 5) -> dict:
+    """Median/best seconds per fn() call"""
+    fn()  # warm-up: lazy loads, first-call allocations
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed * 1.2))
+    runs = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        runs.append((time.perf_counter() - start) / loops)
+    return {"median_s": statistics.median(runs), "best_s": min(runs), "loops": loops, "repeat": repeat}
+
+
+def cases(predictor, optimizer, quick: bool = False) -> List[tuple]:
+    """(method name, size, items per call, fn) for every benchmarked call"""
+    diameter, velocity, density, location = ASTEROIDS["medium_coastal"]
+    blast = predictor.calculate_blast_radius(diameter, velocity, density)
+    rng = np.random.default_rng(0)
+    found = []
+
+    def add(name, size, items, fn):
+        found.append((name, size, items, fn))
+
+    add("AsteroidImpactPredictor.calculate_blast_radius", 1, 1,
+        lambda: predictor.calculate_blast_radius(diameter, velocity, density))
+    for n in ((100, 10000) if quick else (100, 10000, 1000000)):
+        d, v, p = (10 ** rng.uniform(1, 3.3, n), rng.uniform(11, 72, n), rng.uniform(1000, 8000, n))
+        add("AsteroidImpactPredictor.calculate_blast_radius_batch", n, n,
+            lambda d=d, v=v, p=p: predictor.calculate_blast_radius_batch(d, v, p))
+    for name, (d, v, p, where) in ASTEROIDS.items():
+        radius = predictor.calculate_blast_radius(d, v, p).blast_radius
+        add(f"AsteroidImpactPredictor.assess_tsunami_risk[{name}]", 1, 1,
+            lambda where=where, radius=radius, d=d: predictor.assess_tsunami_risk(where, radius, d))
+    add("AsteroidImpactPredictor.estimate_exposure", 1, 1,
+        lambda: predictor.estimate_exposure(location, blast, 1000.0))
+    for grid in ((20, 64) if quick else (20, 64, 256)):
+        add("AsteroidImpactPredictor.calculate_debris_dispersion", grid, grid * grid,
+            lambda grid=grid: predictor.calculate_debris_dispersion(blast.blast_radius, velocity,
+                                                                    location, grid))
+    for n in ((1, 64) if quick else (1, 16, 64)):
+        add("AsteroidImpactPredictor.calculate_debris_dispersion_batch", n, n,
+            lambda n=n: predictor.calculate_debris_dispersion_batch(
+                [blast.blast_radius] * n, [velocity] * n, [location] * n))
+    for resolution in ((64, 256) if quick else (64, 256, 1024)):
+        add("AsteroidImpactPredictor.debris_probability_grid", resolution, resolution * resolution,
+            lambda resolution=resolution: predictor.debris_probability_grid(
+                blast.blast_radius * 2.5, velocity, location, resolution))
+
+    # Destinations on a ring beyond the seismic radius
+    for n in ((1, 3) if quick else (1, 3, 10)):
+        angles = np.linspace(0, 2 * np.pi, n, endpoint=False)
+        reach = (blast.seismic_radius + 10) / 111.0
+        zones = [(USER_LOCATION[0] + reach * np.sin(a), USER_LOCATION[1] + reach * np.cos(a))
+                 for a in angles]
+        add("EvacuationOptimizer.optimize_routes", n, n,
+            lambda zones=zones: optimizer.optimize_routes(USER_LOCATION, zones, blast.blast_radius,
+                                                          impact_location=location,
+                                                          blast_prediction=blast))
+    return found
+
+
+def run_micro(predictor, optimizer, quick: bool = False, min_time: float = 0.05,
+              repeat: int = 5, match: str = "") -> List[dict]:
+    results = []
+    for name, size, items, fn in cases(predictor, optimizer, quick):
+        if match and match not in name:
+            continue
+        timing = time_call(fn, min_time, repeat)
+        results.append({
+            "name": name,
+            "size": size,
+            "per_call_us": round(timing["median_s"] * 1e6, 3),
+            "best_us": round(timing["best_s"] * 1e6, 3),
+            "per_item_ns": round(timing["median_s"] / items * 1e9, 3),
+            "loops": timing["loops"],
+            "repeat": timing["repeat"],
+        })
+    return results
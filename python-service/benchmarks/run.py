@@ -0,0 +1,202 @@
+"""
+AEGIS NET - Benchmark runner
+Runs the microbenchmarks and /predict load scenarios and writes one JSON
+document; compare gates a run against a saved baseline (exit status 1 on
+regressions beyond the tolerance).
+
+Results:
+  meta   interpreter, library versions, CPU count, git revision, settings
+  micro  per method and input size: per_call_us (median), best_us, per_item_ns
+  load   per target, scenario and concurrency: throughput_rps, p50/p95/p99_ms
+
+Compared: micro per_call_us, load p95_ms (lower is better) and
+throughput_rps (higher is better). Keep baselines per machine.
+
+Usage (from python-service/):
+  python -m benchmarks.run run --output bench.json
+  python -m benchmarks.run run --quick --targets asgi simple --concurrency 1 16
+  python -m benchmarks.run run --url 127.0.0.1:8000 --targets http   # e.g. uvicorn main:app
+  python -m benchmarks.run compare baseline.json bench.json --tolerance 0.25
+  python -m benchmarks.run run --output bench.json --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List
+
+import numpy as np
+
+from benchmarks.load import run_asgi_load, run_http_load, simple_server
+from benchmarks.micro import run_micro
+from benchmarks.scenarios import LOAD_SCENARIOS
+
+TARGETS = ("asgi", "simple", "http")
+
+
+def _meta(args) -> dict:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                  text=True, timeout=5).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_revision": revision,
+        "quick": args.quick,
+        "requests": args.requests,
+        "executor": {name: os.getenv(name) for name in ("EXECUTOR_KIND", "EXECUTOR_WORKERS")},
+    }
+
+
+def run_load(args) -> List[dict]:
+    results = []
+
+    def record(target, scenario, concurrency, summary):
+        results.append({"target": target, "scenario": scenario, "concurrency": concurrency, **summary})
+        print(f"  {target:6} {scenario:9} c={concurrency:<4} {summary['throughput_rps']:>9.1f} req/s  "
+              f"p50 {summary['p50_ms']:.2f}  p95 {summary['p95_ms']:.2f}  p99 {summary['p99_ms']:.2f} ms"
+              f"{'  errors ' + str(summary['errors']) if summary['errors'] else ''}", file=sys.stderr)
+
+    if "asgi" in args.targets:
+        import main
+
+        async def drive():
+            for scenario, make_body in LOAD_SCENARIOS.items():
+                for concurrency in args.concurrency:
+                    record("asgi", scenario, concurrency,
+                           await run_asgi_load(main.app, make_body, concurrency, args.requests))
+        try:
+            asyncio.run(drive())
+        finally:
+            main.stage_executor.shutdown()
+            main.ensemble_runner.shutdown()
+
+    http_targets = []
+    if "http" in args.targets:
+        if not args.url:
+            raise SystemExit("--url host:port is required for the http target")
+        host, _, port = args.url.rpartition(":")
+        http_targets.append(("http", None, (host or "127.0.0.1", int(port))))
+    if "simple" in args.targets:
+        http_targets.append(("simple", simple_server, None))
+    for target, server, address in http_targets:
+        if server is not None:
+            with server() as address:
+                _drive_http(target, address, args, record)
+        else:
+            _drive_http(target, address, args, record)
+    return results
+
+
+def _drive_http(target, address, args, record) -> None:
+    for scenario, make_body in LOAD_SCENARIOS.items():
+        for concurrency in args.concurrency:
+            record(target, scenario, concurrency,
+                   run_http_load(address[0], address[1], make_body, concurrency, args.requests))
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> List[str]:
+    """Descriptions of every metric that got worse by more than tolerance"""
+    regressions = []
+
+    def check(label, old, new, lower_is_better):
+        if old is None or new is None or old <= 0:
+            return
+        change = (new - old) / old
+        worse = change > tolerance if lower_is_better else change < -tolerance
+        print(f"{'REGRESSION' if worse else 'ok':10} {label}: {old:g} -> {new:g} ({change:+.1%})",
+              file=sys.stderr)
+        if worse:
+            regressions.append(f"{label}: {old:g} -> {new:g} ({change:+.1%})")
+
+    old_micro = {(r["name"], r["size"]): r for r in baseline.get("micro", [])}
+    for r in current.get("micro", []):
+        old = old_micro.get((r["name"], r["size"]))
+        if old is not None:
+            check(f"{r['name']}[{r['size']}] per_call_us", old["per_call_us"], r["per_call_us"], True)
+
+    old_load = {(r["target"], r["scenario"], r["concurrency"]): r for r in baseline.get("load", [])}
+    for r in current.get("load", []):
+        old = old_load.get((r["target"], r["scenario"], r["concurrency"]))
+        if old is not None:
+            label = f"{r['target']}/{r['scenario']}/c{r['concurrency']}"
+            check(f"{label} throughput_rps", old["throughput_rps"], r["throughput_rps"], False)
+            check(f"{label} p95_ms", old["p95_ms"], r["p95_ms"], True)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AEGIS NET benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = sub.add_parser("run", help="Run benchmarks and write JSON results")
+    run_cmd.add_argument("--output", help="results file (default: stdout)")
+    run_cmd.add_argument("--quick", action="store_true", help="smaller sizes and fewer requests")
+    run_cmd.add_argument("--skip-micro", action="store_true")
+    run_cmd.add_argument("--skip-load", action="store_true")
+    run_cmd.add_argument("--match", default="", help="only microbenchmarks whose name contains this")
+    run_cmd.add_argument("--targets", nargs="+", choices=TARGETS, default=["asgi", "simple"])
+    run_cmd.add_argument("--url", help="host:port of a running server for the http target")
+    run_cmd.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    run_cmd.add_argument("--requests", type=int, help="requests per load run (default 2000, quick 300)")
+    run_cmd.add_argument("--baseline", help="compare against this results file afterwards")
+    run_cmd.add_argument("--tolerance", type=float, default=0.25)
+
+    compare_cmd = sub.add_parser("compare", help="Gate results against a baseline")
+    compare_cmd.add_argument("baseline")
+    compare_cmd.add_argument("current")
+    compare_cmd.add_argument("--tolerance", type=float, default=0.25,
+                             help="allowed relative slowdown (0.25 = 25%%)")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.tolerance)
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        sys.exit(1 if regressions else 0)
+
+    args.requests = args.requests or (300 if args.quick else 2000)
+    start = time.perf_counter()
+    results = {"meta": _meta(args), "micro": [], "load": []}
+    if not args.skip_micro:
+        import main
+        print("Microbenchmarks", file=sys.stderr)
+        results["micro"] = run_micro(main.impact_predictor, main.evacuation_optimizer,
+                                     quick=args.quick, match=args.match)
+        for r in results["micro"]:
+            print(f"  {r['name']}[{r['size']}]: {r['per_call_us']:.1f} us", file=sys.stderr)
+    if not args.skip_load:
+        print("Load", file=sys.stderr)
+        results["load"] = run_load(args)
+    results["meta"]["elapsed_s"] = round(time.perf_counter() - start, 1)
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+AEGIS NET - Benchmark scenarios
+Request bodies shared by the microbenchmarks and the load generator, so
+the FastAPI service and simple-server.py are driven with the same inputs.
+"""
+
+from itertools import count
+from typing import Callable, Dict
+
+IMPACT_TIME = "2030-01-01T00:00:00"
+
+# name -> asteroid (diameter m, velocity km/s, density kg/m³, impact lat/lng)
+ASTEROIDS = {
+    "small_land": (50.0, 17.0, 2600.0, (40.71, -74.01)),
+    "medium_coastal": (300.0, 20.0, 3000.0, (40.58, -73.80)),
+    "large_ocean": (1200.0, 25.0, 3500.0, (36.00, -70.00)),
+}
+USER_LOCATION = (40.76, -73.98)
+
+
+def prediction_body(name: str, variant: int = 0) -> dict:
+    """/predict body; variants perturb the diameter so caches and memos miss"""
+    diameter, velocity, density, location = ASTEROIDS[name]
+    return {
+        "asteroid_data": {
+            "diameter": diameter * (1 + 1e-6 * variant),
+            "velocity": velocity,
+            "density": density,
+            "impact_location": list(location),
+            "impact_time": IMPACT_TIME,
+        },
+        "user_location": list(USER_LOCATION),
+        "population_density": 1000,
+    }
+
+
+_variants = count(1)
+
+# Load scenarios: request index -> body
+LOAD_SCENARIOS: Dict[str, Callable[[int], dict]] = {
+    # Same payload every time: the prediction cache path
+    "cached": lambda i: prediction_body("medium_coastal"),
+    # Payloads never seen before (across runs too): every stage runs
+    "uncached": lambda i: prediction_body(("small_land", "medium_coastal", "large_ocean")[i % 3],
+                                          next(_variants)),
+}
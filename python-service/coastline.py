@@ -0,0 +1,245 @@
+"""
+AEGIS NET - Coastline and ocean mask
+Global land/ocean lookup with water depth and distance to the coastline,
+preprocessed once into a regular lat/lng grid and opened with
+mmap_mode="r" so startup is instant and every uvicorn worker shares the
+pages. A point query is two index computations; batches are vectorized.
+
+Grid directory layout:
+  * elevation.npy  int16 metres, negative over water (bathymetry); grids
+                   built from land polygons store LAND/OCEAN markers only
+  * coast_km.npy   float32 great-circle km from the cell centre to the
+                   nearest cell on the other side of the coastline
+  * meta.json      bounds, cell size and whether depths are real
+
+Usage:
+  python coastline.py raster etopo.npy coast_grid --bounds -90 -180 90 180
+  python coastline.py polygons land.geojson coast_grid --cell-deg 0.1
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from road_network import chord_to_km, unit_vectors
+
+GRID_VERSION = 1
+LAND = 1
+OCEAN = -1
+QUERY_CHUNK = 1 << 20
+
+
+def _cell_centres(bounds: Tuple[float, float, float, float], shape: Tuple[int, int]):
+    south, west, north, east = bounds
+    rows, cols = shape
+    lat = north - (np.arange(rows) + 0.5) * (north - south) / rows
+    lng = west + (np.arange(cols) + 0.5) * (east - west) / cols
+    return lat, lng
+
+
+def coast_distance(ocean: np.ndarray, bounds: Tuple[float, float, float, float]) -> np.ndarray:
+    """Great-circle km from every cell centre to the nearest coastline cell"""
+    # Coastline cells: any cell with a 4-neighbour on the other side
+    edge = np.zeros_like(ocean)
+    edge[1:] |= ocean[1:] != ocean[:-1]
+    edge[:-1] |= ocean[:-1] != ocean[1:]
+    edge[:, 1:] |= ocean[:, 1:] != ocean[:, :-1]
+    edge[:, :-1] |= ocean[:, :-1] != ocean[:, 1:]
+
+    distance = np.full(ocean.shape, np.inf, dtype=np.float32)
+    if not edge.any():
+        return distance
+    lat, lng = _cell_centres(bounds, ocean.shape)
+    rows, cols = np.nonzero(edge)
+    tree = cKDTree(unit_vectors(lat[rows], lng[cols]))
+
+    flat = distance.reshape(-1)
+    for start in range(0, flat.size, QUERY_CHUNK):
+        idx = np.arange(start, min(start + QUERY_CHUNK, flat.size))
+        r, c = np.divmod(idx, ocean.shape[1])
+        chord, _ = tree.query(unit_vectors(lat[r], lng[c]), workers=-1)
+        flat[idx] = chord_to_km(chord)
+    return distance
+
+
+def build_grid(elevation: np.ndarray, bounds: Tuple[float, float, float, float],
+               output_dir: str, has_bathymetry: bool = True) -> dict:
+    """Write elevation and coast-distance layers for a (rows, cols) grid"""
+    elevation = np.clip(np.asarray(elevation), -32767, 32767).astype(np.int16)
+    distance = coast_distance(elevation < 0, bounds)
+
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, "elevation.npy"), elevation)
+    np.save(os.path.join(output_dir, "coast_km.npy"), distance)
+    meta = {
+        "version": GRID_VERSION,
+        "bounds": list(bounds),
+        "shape": list(elevation.shape),
+        "has_bathymetry": has_bathymetry,
+    }
+    with open(os.path.join(output_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def rasterize_polygons(geojson_path: str, bounds: Tuple[float, float, float, float],
+                       cell_deg: float) -> np.ndarray:
+    """Land mask from GeoJSON (Multi)Polygons, scanline-filled at cell centres"""
+    with open(geojson_path) as f:
+        collection = json.load(f)
+    rings = []  # (coordinates, +1 outer / -1 hole)
+    for feature in collection.get("features", []):
+        geometry = feature.get("geometry") or {}
+        polygons = {"Polygon": [geometry.get("coordinates")],
+                    "MultiPolygon": geometry.get("coordinates")}.get(geometry.get("type"), [])
+        for polygon in polygons:
+            for i, ring in enumerate(polygon):
+                rings.append((np.asarray(ring, dtype=np.float64)[:, :2], 1 if i == 0 else -1))
+
+    south, west, north, east = bounds
+    n_rows = int(round((north - south) / cell_deg))
+    n_cols = int(round((east - west) / cell_deg))
+    width = n_cols + 1
+    diff = np.zeros(n_rows * width, dtype=np.int32)
+    for ring, sign in rings:
+        x0, y0 = ring[:-1, 0], ring[:-1, 1]
+        x1, y1 = ring[1:, 0], ring[1:, 1]
+        # Row-centre index range crossed by each edge (half-open in latitude)
+        lo = np.ceil((north - np.maximum(y0, y1)) / cell_deg - 0.5)
+        hi = np.ceil((north - np.minimum(y0, y1)) / cell_deg - 0.5)
+        lo, hi = np.clip(lo, 0, n_rows).astype(np.int64), np.clip(hi, 0, n_rows).astype(np.int64)
+        counts = hi - lo
+        if counts.sum() == 0:
+            continue
+        edge = np.repeat(np.arange(len(x0)), counts)
+        row = lo[edge] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        yc = north - (row + 0.5) * cell_deg
+        t = (yc - y0[edge]) / (y1[edge] - y0[edge])
+        x = x0[edge] + t * (x1[edge] - x0[edge])
+
+        # Even-odd: consecutive crossings on a row bound a filled span
+        order = np.lexsort((x, row))
+        row, x = row[order][0::2], np.stack((x[order][0::2], x[order][1::2]), axis=1)
+        start = np.clip(np.ceil((x[:, 0] - west) / cell_deg - 0.5), 0, n_cols).astype(np.int64)
+        stop = np.clip(np.floor((x[:, 1] - west) / cell_deg - 0.5) + 1, 0, n_cols).astype(np.int64)
+        keep = start < stop
+        np.add.at(diff, row[keep] * width + start[keep], sign)
+        np.add.at(diff, row[keep] * width + stop[keep], -sign)
+    coverage = np.cumsum(diff.reshape(n_rows, width), axis=1)[:, :n_cols]
+    return coverage > 0
+
+
+def _read_raster(path: str) -> np.ndarray:
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return data["elevation"]
+    if path.endswith(".npy"):
+        return np.load(path)
+    import rasterio  # optional, only for GeoTIFF/NetCDF sources
+
+    with rasterio.open(path) as src:
+        return src.read(1)
+
+
+class CoastalGrid:
+    """Memory-mapped elevation and coast-distance layers"""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != GRID_VERSION:
+            raise ValueError(f"unsupported coastline grid version {meta.get('version')}")
+        self.bounds = tuple(meta["bounds"])
+        self.has_bathymetry = meta["has_bathymetry"]
+        self.elevation = np.load(os.path.join(path, "elevation.npy"), mmap_mode="r")
+        self.coast_km = np.load(os.path.join(path, "coast_km.npy"), mmap_mode="r")
+        self.rows, self.cols = self.elevation.shape
+        south, west, north, east = self.bounds
+        self._lat_scale = self.rows / (north - south)
+        self._lng_scale = self.cols / (east - west)
+        self._global = east - west >= 360
+
+    def _cells(self, lat: np.ndarray, lng: np.ndarray):
+        south, west, north, east = self.bounds
+        if self._global:
+            lng = (lng - west) % 360 + west
+        row = np.floor((north - lat) * self._lat_scale).astype(np.int64)
+        col = np.floor((lng - west) * self._lng_scale).astype(np.int64)
+        valid = (row >= 0) & (row < self.rows) & (col >= 0) & (col < self.cols)
+        return np.where(valid, row, 0), np.where(valid, col, 0), valid
+
+    def sample(self, lat: np.ndarray, lng: np.ndarray) -> Dict[str, np.ndarray]:
+        """Vectorized lookup: ocean flag, water depth (m) and coast distance (km)
+
+        Points outside the grid come back with valid=False.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lng = np.atleast_1d(np.asarray(lng, dtype=np.float64))
+        row, col, valid = self._cells(lat, lng)
+        elevation = self.elevation[row, col].astype(np.float64)
+        ocean = valid & (elevation < 0)
+        depth = np.where(ocean, -elevation, 0.0) if self.has_bathymetry else np.full(lat.shape, np.nan)
+        return {
+            "valid": valid,
+            "ocean": ocean,
+            "depth_m": depth,
+            "coast_km": np.where(valid, self.coast_km[row, col], np.nan),
+        }
+
+    def point(self, lat: float, lng: float) -> Optional[Tuple[bool, Optional[float], float]]:
+        """(is_ocean, depth_m or None, coast_km) for one point, None outside the grid"""
+        sample = self.sample(lat, lng)
+        if not sample["valid"][0]:
+            return None
+        depth = float(sample["depth_m"][0])
+        return (bool(sample["ocean"][0]), depth if np.isfinite(depth) else None,
+                float(sample["coast_km"][0]))
+
+
+def load_coastal_grid(path: Optional[str]) -> Optional[CoastalGrid]:
+    """Open the configured grid, or None when no dataset is available"""
+    if not path or not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    try:
+        return CoastalGrid(path)
+    except ValueError as e:
+        print(f"Ignoring coastline grid at {path}: {e}")
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AEGIS NET coastline grid tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    raster_cmd = sub.add_parser("raster", help="Build from an elevation/bathymetry raster")
+    raster_cmd.add_argument("source", help=".npy/.npz (key 'elevation') or GeoTIFF via rasterio")
+    raster_cmd.add_argument("output")
+    raster_cmd.add_argument("--bounds", type=float, nargs=4, default=(-90, -180, 90, 180),
+                            metavar=("SOUTH", "WEST", "NORTH", "EAST"))
+
+    poly_cmd = sub.add_parser("polygons", help="Build from GeoJSON land polygons (no depths)")
+    poly_cmd.add_argument("source")
+    poly_cmd.add_argument("output")
+    poly_cmd.add_argument("--cell-deg", type=float, default=0.1)
+    poly_cmd.add_argument("--bounds", type=float, nargs=4, default=(-90, -180, 90, 180),
+                          metavar=("SOUTH", "WEST", "NORTH", "EAST"))
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+    bounds = tuple(args.bounds)
+    if args.command == "raster":
+        meta = build_grid(_read_raster(args.source), bounds, args.output)
+    else:
+        land = rasterize_polygons(args.source, bounds, args.cell_deg)
+        meta = build_grid(np.where(land, LAND, OCEAN), bounds, args.output, has_bathymetry=False)
+    print(f"Wrote {args.output}: {meta['shape'][0]}x{meta['shape'][1]} cells "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
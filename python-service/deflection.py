@@ -0,0 +1,218 @@
+"""
+AEGIS NET - Deflection what-if engine
+Where an impactor lands (or whether it misses) after a velocity change
+delta-v applied lead_time days before impact.
+
+The nominal heliocentric trajectory is propagated once, backwards from
+the impact, together with its state transition matrix, and cached. A
+deflection is tiny next to the orbit, so its effect at impact is linear:
+the displacement is Φ(impact, t0) @ delta-v. Batches of candidates are
+then a gather and a small matrix product each, with no re-propagation,
+so thousands of (delta-v, lead time) options evaluate in milliseconds.
+
+Geometry (two-body Sun, Earth on a circular 1 AU orbit, ecliptic frame):
+  * the asteroid meets Earth with hyperbolic excess speed
+    v_inf = sqrt(v_impact² - v_esc²) along approach (azimuth from
+    Earth's direction of motion towards the Sun, elevation above the
+    ecliptic)
+  * the nominal trajectory is a central hit: its radiant is at the zenith
+    of the reported impact_location
+  * a deflected trajectory crosses the b-plane (normal to the approach) at
+    b; it misses when |b| exceeds the gravitationally focused capture
+    radius R_E·sqrt(1 + v_esc²/v_inf²)
+  * hits move |b|/capture of the way to the limb along b's bearing (b-plane
+    ξ → east, ζ → north), and Earth's rotation during the arrival-time
+    shift moves them in longitude
+  * delta-v components are radial, transverse (along-track) and normal
+    to the orbit at the time of deflection, in m/s
+"""
+
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from impact_core import EARTH_RADIUS_KM
+from physics_kernels import blast_radius_kernel, impact_energy_kernel
+
+AU_KM = 149597870.7
+DAY_S = 86400.0
+GM_SUN = 2.9591220828559115e-4  # AU³/day²
+EARTH_ESCAPE_SPEED = 11.186  # km/s
+SIDEREAL_DAY_S = 86164.0905
+MIN_V_INF = 1.0  # km/s, for impact speeds at or below Earth's escape speed
+MAX_LEAD_DAYS = 3650
+DEFAULT_APPROACH = (90.0, 10.0)  # azimuth, elevation in degrees
+KM_S_TO_AU_DAY = DAY_S / AU_KM
+M_S_TO_AU_DAY = KM_S_TO_AU_DAY / 1000
+
+
+def v_infinity(impact_speed: float) -> float:
+    """Hyperbolic excess speed (km/s) for a speed at the top of the atmosphere"""
+    return math.sqrt(max(impact_speed ** 2 - EARTH_ESCAPE_SPEED ** 2, MIN_V_INF ** 2))
+
+
+def _two_body(_, y: np.ndarray) -> np.ndarray:
+    """Heliocentric motion plus variational equations dΦ/dt = A Φ"""
+    r, v, phi = y[:3], y[3:6], y[6:].reshape(6, 6)
+    distance = np.sqrt(r @ r)
+    unit = r / distance
+    gravity_gradient = GM_SUN / distance ** 3 * (3 * np.outer(unit, unit) - np.eye(3))
+    derivative = np.empty_like(y)
+    derivative[:3] = v
+    derivative[3:6] = -GM_SUN * r / distance ** 3
+    # A = [[0, I], [G, 0]]
+    derivative[6:] = np.concatenate([phi[3:], gravity_gradient @ phi[:3]]).ravel()
+    return derivative
+
+
+class NominalTrajectory:
+    """The undeflected orbit and its linear response to delta-v, per lead day"""
+
+    def __init__(self, v_inf: float, azimuth: float = DEFAULT_APPROACH[0],
+                 elevation: float = DEFAULT_APPROACH[1], max_lead_days: int = MAX_LEAD_DAYS):
+        from scipy.integrate import solve_ivp
+
+        self.v_inf = v_inf  # km/s
+        self.max_lead_days = max_lead_days
+        az, el = math.radians(azimuth), math.radians(elevation)
+        # Approach direction in (sunward-outward x, Earth's motion y, ecliptic north z)
+        self.approach = np.array([-math.sin(az) * math.cos(el), math.cos(az) * math.cos(el), math.sin(el)])
+        earth_velocity = np.array([0.0, math.sqrt(GM_SUN), 0.0])  # circular, AU/day
+        position = np.array([1.0, 0.0, 0.0])
+        velocity = earth_velocity + self.approach * v_inf * KM_S_TO_AU_DAY
+
+        # b-plane: ζ opposite Earth's projected motion, ξ completes the frame
+        projected = earth_velocity - (earth_velocity @ self.approach) * self.approach
+        self.zeta = -projected / np.linalg.norm(projected)
+        self.xi = np.cross(self.zeta, self.approach)
+        self.capture_radius = EARTH_RADIUS_KM * math.sqrt(1 + (EARTH_ESCAPE_SPEED / v_inf) ** 2)
+
+        # Backwards from impact: Φ(t0, impact) at every whole lead day
+        self.lead_days = np.arange(max_lead_days + 1, dtype=np.float64)
+        solution = solve_ivp(_two_body, (0.0, -float(max_lead_days)),
+                             np.concatenate([position, velocity, np.eye(6).ravel()]),
+                             method="DOP853", t_eval=-self.lead_days, rtol=1e-11, atol=1e-14)
+        if not solution.success:
+            raise RuntimeError(f"Propagation failed: {solution.message}")
+        states = solution.y.T
+        to_impact = np.linalg.inv(states[:, 6:].reshape(-1, 6, 6))  # Φ(impact, t0)
+
+        # delta-v axes (radial, transverse, normal) at each deflection epoch
+        r, v = states[:, :3], states[:, 3:6]
+        radial = r / np.linalg.norm(r, axis=1, keepdims=True)
+        normal = np.cross(r, v)
+        normal /= np.linalg.norm(normal, axis=1, keepdims=True)
+        transverse = np.cross(normal, radial)
+        axes = np.stack([radial, transverse, normal], axis=2)  # columns R, T, N
+        # (lead day, impact state [km, km/s], delta-v RTN [m/s])
+        units = np.array([AU_KM] * 3 + [AU_KM / DAY_S] * 3)[:, None]
+        self.response = units * (to_impact[:, :, 3:] @ axes) * M_S_TO_AU_DAY
+        self.elements = self._elements(position, velocity)
+
+    @staticmethod
+    def _elements(position: np.ndarray, velocity: np.ndarray) -> dict:
+        """Semi-major axis (AU), eccentricity, inclination (deg), period (days)"""
+        energy = velocity @ velocity / 2 - GM_SUN / np.linalg.norm(position)
+        semi_major = -GM_SUN / (2 * energy)
+        momentum = np.cross(position, velocity)
+        eccentricity = np.linalg.norm(np.cross(velocity, momentum) / GM_SUN
+                                      - position / np.linalg.norm(position))
+        inclination = math.degrees(math.acos(momentum[2] / np.linalg.norm(momentum)))
+        period = 2 * math.pi * math.sqrt(semi_major ** 3 / GM_SUN) if semi_major > 0 else None
+        return {
+            "semi_major_axis": round(float(semi_major), 6),
+            "eccentricity": round(float(eccentricity), 6),
+            "inclination": round(inclination, 4),
+            "period_days": round(period, 3) if period is not None else None,
+        }
+
+    def response_at(self, lead_days: np.ndarray) -> np.ndarray:
+        """(candidate, 6, 3) response matrices, linear between whole days"""
+        position = np.clip(np.asarray(lead_days, dtype=np.float64), 0, self.max_lead_days)
+        base = np.minimum(position.astype(np.int64), self.max_lead_days - 1)
+        frac = (position - base)[:, None, None]
+        return self.response[base] * (1 - frac) + self.response[base + 1] * frac
+
+    def b_plane(self, displacement: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(ξ, ζ) km of displacements (candidate, 3) at the nominal impact time"""
+        return displacement @ self.xi, displacement @ self.zeta
+
+    def required_delta_v(self, lead_days: np.ndarray, direction=(0.0, 1.0, 0.0)) -> np.ndarray:
+        """Smallest delta-v (m/s) along direction (R, T, N) that turns the hit into a miss"""
+        direction = np.asarray(direction, dtype=np.float64)
+        direction = direction / np.linalg.norm(direction)
+        displacement = self.response_at(lead_days)[:, :3] @ direction
+        xi, zeta = self.b_plane(displacement)
+        per_unit = np.hypot(xi, zeta)  # km of b-plane offset per m/s
+        with np.errstate(divide="ignore"):
+            return np.where(per_unit > 0, self.capture_radius / per_unit, np.inf)
+
+
+def _destination(lat: float, lng: float, bearing: np.ndarray, angle: np.ndarray):
+    """Great-circle destination (degrees) from one point along bearings by angles (radians)"""
+    phi, lam = math.radians(lat), math.radians(lng)
+    sin_phi = math.sin(phi) * np.cos(angle) + math.cos(phi) * np.sin(angle) * np.cos(bearing)
+    phi2 = np.arcsin(np.clip(sin_phi, -1, 1))
+    lam2 = lam + np.arctan2(np.sin(bearing) * np.sin(angle) * math.cos(phi),
+                            np.cos(angle) - math.sin(phi) * sin_phi)
+    return np.degrees(phi2), np.degrees(lam2)
+
+
+def evaluate(trajectory: NominalTrajectory, impact_location: Tuple[float, float],
+             lead_days: np.ndarray, delta_v: np.ndarray, diameter: float,
+             density: float) -> Dict[str, np.ndarray]:
+    """Outcome of each candidate (lead_days[i], delta_v[i] = (R, T, N) m/s)
+
+    Misses get NaN impact fields. miss_distance is |b| minus the capture
+    radius (km; negative for hits).
+    """
+    response = trajectory.response_at(lead_days)
+    change = np.einsum("cij,cj->ci", response, np.asarray(delta_v, dtype=np.float64))
+    displacement, velocity_change = change[:, :3], change[:, 3:]
+    xi, zeta = trajectory.b_plane(displacement)
+    b = np.hypot(xi, zeta)
+    hit = b < trajectory.capture_radius
+
+    # Arrival-time shift: positive = later, and Earth has turned further east
+    relative = trajectory.approach * trajectory.v_inf + velocity_change
+    speed = np.linalg.norm(relative, axis=1)
+    arrival_shift = -(displacement @ trajectory.approach) / speed
+    impact_speed = np.sqrt(speed ** 2 + EARTH_ESCAPE_SPEED ** 2)
+
+    angle = np.arcsin(np.clip(b / trajectory.capture_radius, 0, 1))
+    lat, lng = _destination(impact_location[0], impact_location[1], np.arctan2(xi, zeta), angle)
+    lng = (lng - arrival_shift * 360.0 / SIDEREAL_DAY_S + 180) % 360 - 180
+    radii = blast_radius_kernel(np.where(hit, diameter, np.nan), impact_speed, density)
+    return {
+        "hit": hit,
+        "miss_distance": b - trajectory.capture_radius,
+        "b_plane_xi": xi,
+        "b_plane_zeta": zeta,
+        "arrival_shift": arrival_shift,
+        "impact_lat": np.where(hit, lat, np.nan),
+        "impact_lng": np.where(hit, lng, np.nan),
+        "impact_velocity": np.where(hit, impact_speed, np.nan),
+        "energy_megatons": impact_energy_kernel(np.where(hit, diameter, np.nan), impact_speed, density),
+        "blast_radius": radii["blast_radius"],
+    }
+
+
+class DeflectionEngine:
+    """Nominal trajectories cached per approach geometry (LRU)"""
+
+    def __init__(self, cache, max_lead_days: int = MAX_LEAD_DAYS):
+        self.cache = cache  # PredictionCache
+        self.max_lead_days = max_lead_days
+
+    def nominal(self, impact_speed: float, azimuth: float = DEFAULT_APPROACH[0],
+                elevation: float = DEFAULT_APPROACH[1]) -> Tuple[NominalTrajectory, bool]:
+        """(trajectory, whether it came from the cache)"""
+        v_inf = v_infinity(impact_speed)
+        key = f"{v_inf:.9g}:{azimuth:.9g}:{elevation:.9g}:{self.max_lead_days}"
+        trajectory: Optional[NominalTrajectory] = self.cache.get(key)
+        if trajectory is not None:
+            return trajectory, True
+        trajectory = NominalTrajectory(v_inf, azimuth, elevation, self.max_lead_days)
+        self.cache.put(key, trajectory)
+        return trajectory, False
@@ -0,0 +1,278 @@
+"""
+AEGIS NET - Monte Carlo impact ensemble
+Samples impact scenarios from per-parameter uncertainty distributions and
+evaluates them in vectorized chunks on a process pool, so all cores are
+used while the asyncio event loop keeps serving /health.
+
+Distributions (1-sigma values are relative to the nominal asteroid):
+  * diameter, density  lognormal with the given relative std
+  * velocity           normal, clipped at 0.1 km/s
+  * impact point       isotropic normal offset with std in km
+
+Jobs are admitted like StageExecutor work, counted in chunks: a job that
+would push the backlog past workers + max_queue chunks gets QueueFull
+(429), one facing an estimated wait over max_wait seconds gets Overloaded
+(503). Cancelling a job (or evicting it from the registry) cancels its
+queued chunks; chunks already on a worker run to completion unobserved.
+"""
+
+import asyncio
+import math
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from executor import Overloaded, QueueFull
+from physics_kernels import blast_radius_kernel
+
+EFFECTS = ("blast_radius", "thermal_radius", "seismic_radius")
+RADII = EFFECTS + ("airburst_height",)
+PERCENTILES = (5, 25, 50, 75, 95)
+CHUNK_SIZE = 25000
+MAX_JOBS = 64
+
+
+def _lognormal(rng: np.random.Generator, mean: float, rel_std: float, size: int) -> np.ndarray:
+    if rel_std <= 0:
+        return np.full(size, mean)
+    sigma = math.sqrt(math.log1p(rel_std ** 2))
+    return rng.lognormal(math.log(mean) - sigma ** 2 / 2, sigma, size)
+
+
+def sample_scenarios(spec: dict, rng: np.random.Generator, size: int) -> Dict[str, np.ndarray]:
+    """Draw size scenarios around the nominal parameters in spec"""
+    velocity = rng.normal(spec["velocity"], spec["velocity"] * spec["velocity_uncertainty"], size)
+    return {
+        "diameter": _lognormal(rng, spec["diameter"], spec["diameter_uncertainty"], size),
+        "density": _lognormal(rng, spec["density"], spec["density_uncertainty"], size),
+        "velocity": np.maximum(velocity, 0.1),
+        "east_km": rng.normal(0.0, spec["impact_uncertainty_km"], size),
+        "north_km": rng.normal(0.0, spec["impact_uncertainty_km"], size),
+    }
+
+
+def _rasterize_disks(east: np.ndarray, north: np.ndarray, radius: np.ndarray,
+                     half_width: float, resolution: int) -> np.ndarray:
+    """Count, per cell centre, how many disks cover it (row 0 = north edge)"""
+    cell = 2 * half_width / resolution
+    centres = (np.arange(resolution) + 0.5) * cell - half_width
+    row_north = centres[::-1]
+
+    # Half-chord of every disk along every row; rows outside a disk give NaN
+    dy = row_north[None, :] - north[:, None]
+    with np.errstate(invalid="ignore"):
+        half = np.sqrt(radius[:, None] ** 2 - dy ** 2)
+    hit = np.isfinite(half)
+    sample_idx, row_idx = np.nonzero(hit)
+    half = half[hit]
+    x = east[sample_idx]
+
+    # Difference array per row: +1 at the first covered column, -1 past the last
+    start = np.clip(np.ceil((x - half + half_width) / cell - 0.5), 0, resolution).astype(np.int64)
+    stop = np.clip(np.floor((x + half + half_width) / cell - 0.5) + 1, 0, resolution).astype(np.int64)
+    keep = start < stop
+    width = resolution + 1
+    diff = (np.bincount(row_idx[keep] * width + start[keep], minlength=resolution * width) -
+            np.bincount(row_idx[keep] * width + stop[keep], minlength=resolution * width))
+    return np.cumsum(diff.reshape(resolution, width), axis=1)[:, :resolution]
+
+
+def run_chunk(spec: dict, seed: np.random.SeedSequence, size: int) -> dict:
+    """Evaluate one chunk of scenarios (runs inside a pool worker)"""
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    scenario = sample_scenarios(spec, rng, size)
+    radii = blast_radius_kernel(scenario["diameter"], scenario["velocity"], scenario["density"])
+    counts = {
+        effect: _rasterize_disks(scenario["east_km"], scenario["north_km"], radii[effect],
+                                 spec["raster_half_width"], spec["raster_resolution"])
+        for effect in EFFECTS
+    }
+    return {
+        "radii": {name: radii[name].astype(np.float32) for name in RADII},
+        "counts": counts,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+class EnsembleJob:
+    """Progress and result of one ensemble run"""
+
+    def __init__(self, samples: int, chunks: int):
+        self.job_id = uuid.uuid4().hex
+        self.samples = samples
+        self.chunks_total = chunks
+        self.chunks_done = 0
+        self.samples_done = 0
+        self.status = "queued"
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+        self.bounds = None  # raster (south, west, north, east), set by the caller
+        self.task: Optional[asyncio.Task] = None
+        self.outstanding = chunks  # admitted chunks not yet finished or released
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def progress(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "samples": self.samples,
+            "samples_done": self.samples_done,
+            "chunks_done": self.chunks_done,
+            "chunks_total": self.chunks_total,
+            "progress": round(self.chunks_done / self.chunks_total, 4) if self.chunks_total else 1.0,
+            "elapsed": round(self.elapsed or time.monotonic() - self.started, 3),
+            "error": self.error,
+        }
+
+
+def _aggregate(parts: List[dict], samples: int, spec: dict) -> dict:
+    """Percentile bands per radius and probability-of-effect rasters"""
+    bands = {}
+    for name in RADII:
+        values = np.concatenate([part["radii"][name] for part in parts])
+        levels = np.percentile(values, PERCENTILES)
+        bands[name] = {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, levels)}
+    rasters = {
+        effect: np.round(sum(part["counts"][effect] for part in parts) / samples, 4).tolist()
+        for effect in EFFECTS
+    }
+    return {"percentiles": bands, "probability_rasters": rasters}
+
+
+class EnsembleRunner:
+    """Owns the worker pool, admission control and the registry of recent jobs"""
+
+    def __init__(self, workers: Optional[int] = None, max_queue: int = 160, max_wait: float = 60.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max(0, max_queue)  # chunks
+        self.max_wait = max_wait  # seconds
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.jobs: "OrderedDict[str, EnsembleJob]" = OrderedDict()
+        self._tasks = set()
+        self.pending = 0  # admitted chunks, queued + running
+        self.rejected = 0
+        self.cancelled = 0
+        self._chunk_time = 0.8  # EWMA of run time per chunk, seconds
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # spawn: workers start clean and import this module plus __main__,
+        # which main.py keeps from being the app (see its __main__ block)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+        return self._pool
+
+    def estimated_wait(self) -> float:
+        """Expected wait before a job admitted now gets its first worker"""
+        return max(0, self.pending - self.workers + 1) * self._chunk_time / self.workers
+
+    def create_job(self, samples: int) -> EnsembleJob:
+        """Admit and register a job, raising Rejected when the pool is saturated"""
+        chunks = math.ceil(samples / CHUNK_SIZE)
+        # An idle pool takes any job, however many chunks it has
+        if self.pending and self.pending + chunks > self.workers + self.max_queue:
+            self.rejected += 1
+            raise QueueFull(f"Ensemble queue full ({self.pending} chunks pending)",
+                            self.estimated_wait())
+        wait = self.estimated_wait()
+        if wait > self.max_wait:
+            self.rejected += 1
+            raise Overloaded(f"Estimated ensemble wait {wait:.1f}s exceeds {self.max_wait:.1f}s", wait)
+        job = EnsembleJob(samples, chunks)
+        self.pending += chunks
+        self.jobs[job.job_id] = job
+        while len(self.jobs) > MAX_JOBS:
+            # Oldest finished job first; an active one only when every job is active
+            evicted = next((j for j in self.jobs.values() if not j.active), None)
+            evicted = self.jobs.pop(evicted.job_id) if evicted else self.jobs.popitem(last=False)[1]
+            self.cancel(evicted)
+        return job
+
+    def start(self, job: EnsembleJob, spec: dict, seed: Optional[int]) -> asyncio.Task:
+        """Run job in the background; poll self.jobs for progress"""
+        task = asyncio.ensure_future(self.run(job, spec, seed))
+        job.task = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        # Also covers a job cancelled before run() started
+        task.add_done_callback(lambda _: self._finish(job))
+        return task
+
+    def cancel(self, job: EnsembleJob) -> None:
+        """Stop a queued or running job"""
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+        elif job.active:
+            self._finish(job)
+
+    def _finish(self, job: EnsembleJob) -> None:
+        """Release the job's outstanding chunks; a job ending while active was cancelled"""
+        self.pending -= job.outstanding
+        job.outstanding = 0
+        if job.active:
+            job.status = "cancelled"
+            self.cancelled += 1
+            job.elapsed = time.monotonic() - job.started
+
+    async def run(self, job: EnsembleJob, spec: dict, seed: Optional[int]) -> EnsembleJob:
+        job.status = "running"
+        sizes = [min(CHUNK_SIZE, job.samples - start) for start in range(0, job.samples, CHUNK_SIZE)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        futures = [
+            asyncio.wrap_future(self.pool.submit(run_chunk, spec, chunk_seed, size))
+            for chunk_seed, size in zip(seeds, sizes)
+        ]
+        parts = []
+        try:
+            for finished in asyncio.as_completed(futures):
+                part = await finished
+                parts.append(part)
+                job.outstanding -= 1
+                self.pending -= 1
+                self._chunk_time = 0.9 * self._chunk_time + 0.1 * part["seconds"]
+                job.chunks_done += 1
+                job.samples_done += len(part["radii"]["blast_radius"])
+            job.result = await asyncio.to_thread(_aggregate, parts, job.samples, spec)
+            job.status = "completed"
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            self._finish(job)
+            raise
+        except Exception as e:
+            for future in futures:
+                future.cancel()
+            job.status = "failed"
+            job.error = str(e)
+        self._finish(job)
+        job.elapsed = time.monotonic() - job.started
+        return job
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending_chunks": self.pending,
+            "max_queue": self.max_queue,
+            "active_jobs": sum(job.active for job in self.jobs.values()),
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "avg_chunk_seconds": round(self._chunk_time, 4),
+            "estimated_wait_seconds": round(self.estimated_wait(), 4),
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
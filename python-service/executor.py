@@ -0,0 +1,140 @@
+"""
+AEGIS NET - Stage executor
+Runs CPU-bound prediction work off the asyncio event loop on a thread or
+process pool, with admission control so a saturated worker sheds load
+quickly instead of letting /health time out.
+
+A job is rejected when
+  * the bounded queue is full (QueueFull -> HTTP 429), or
+  * the wait it would face, estimated from queue depth and recent service
+    times, exceeds max_wait (Overloaded -> HTTP 503).
+Both carry a retry_after hint in seconds for the Retry-After header.
+
+Process pools use the fork context so workers inherit the loaded road
+graph and models; submitted callables must be module-level functions and
+their arguments must pickle. Workers are forked on the first job, which
+first awaits before_fork(): a fork while a warm-up thread holds a loader
+lock would leave that lock held forever in every worker.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Awaitable, Callable, Optional
+
+
+class Rejected(Exception):
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class QueueFull(Rejected):
+    status_code = 429
+
+
+class Overloaded(Rejected):
+    status_code = 503
+
+
+def _timed_call(fn: Callable, args: tuple, enqueued_at: float) -> tuple:
+    """Run fn in the worker; report queue wait and run time (wall clock, valid across processes)"""
+    started = time.time()
+    result = fn(*args)
+    return started - enqueued_at, time.time() - started, result
+
+
+class StageExecutor:
+    """Bounded thread/process pool with queue-depth and wait-time accounting"""
+
+    def __init__(self, kind: str = "thread", workers: int = 4, max_queue: int = 32,
+                 max_wait: float = 10.0, before_fork: Optional[Callable[[], Awaitable[bool]]] = None):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"unknown executor kind {kind!r}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait  # seconds
+        self._executor: Executor = (
+            ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="aegis-stage")
+            if kind == "thread" else
+            ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("fork"))
+        )
+        # Process pools only: awaited before the first job; False rejects the job
+        self._before_fork = before_fork if kind == "process" else None
+        self._lock = threading.Lock()
+        self.pending = 0  # queued + running
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+        self._service_time = 0.05  # EWMA of run time, seconds
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.pending - self.workers)
+
+    def estimated_wait(self) -> float:
+        """Expected wait for a job submitted now"""
+        return (self.queue_depth + 1) * self._service_time / self.workers if self.pending >= self.workers else 0.0
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise QueueFull(f"Prediction queue full ({self.queue_depth} waiting)",
+                                self.estimated_wait())
+            wait = self.estimated_wait()
+            if wait > self.max_wait:
+                self.rejected += 1
+                raise Overloaded(f"Estimated queue wait {wait:.1f}s exceeds {self.max_wait:.1f}s", wait)
+            self.pending += 1
+            self.submitted += 1
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Run fn(*args) on the pool, raising Rejected when saturated"""
+        if self._before_fork is not None:
+            if not await self._before_fork():
+                raise Overloaded("Worker processes start once the warm-up finishes", 5)
+            self._before_fork = None
+        self._admit()
+        loop = asyncio.get_running_loop()
+        try:
+            wait, run_time, result = await loop.run_in_executor(
+                self._executor, _timed_call, fn, args, time.time()
+            )
+        finally:
+            with self._lock:
+                self.pending -= 1
+        with self._lock:
+            self.completed += 1
+            self.total_wait += wait
+            self.max_observed_wait = max(self.max_observed_wait, wait)
+            self._service_time = 0.9 * self._service_time + 0.1 * run_time
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "in_flight": min(self.pending, self.workers),
+                "queue_depth": self.queue_depth,
+                "max_queue": self.max_queue,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_seconds": round(self.total_wait / self.completed, 4) if self.completed else 0.0,
+                "max_wait_seconds": round(self.max_observed_wait, 4),
+                "avg_service_seconds": round(self._service_time, 4),
+                "estimated_wait_seconds": round(self.estimated_wait(), 4),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
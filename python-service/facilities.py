@@ -0,0 +1,214 @@
+"""
+AEGIS NET - Facility registry
+Safe zones, shelters, hospitals and evacuation centres loaded from a local
+dataset and indexed with one KD-tree per facility type (on 3D unit
+vectors, where chord order equals great-circle order), so k-nearest
+queries stay logarithmic for national-scale lists.
+
+Queries that skip everything within a radius (e.g. the blast zone) walk
+the KD-tree while few facilities lie inside. With many inside they search
+outwards through grid cells of CELL_DEGREES instead. Cells wholly inside
+the radius are skipped without reading their facilities, so the cost
+follows the ring searched, not the area excluded.
+
+Input formats:
+  * CSV with columns id, name, type, lat, lng, capacity
+  * GeoJSON FeatureCollection of Point features whose properties hold
+    id, name, type and capacity
+"""
+
+import json
+import math
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from road_network import EARTH_RADIUS_KM, chord_to_km, unit_vectors
+
+FACILITY_TYPES = ("safe_zone", "shelter", "hospital", "evacuation_center")
+CELL_DEGREES = 0.25  # lat/lng grid of the ring search
+RING_SEARCH_INSIDE = 1024  # facilities inside the excluded radius before the ring search is used
+
+
+def km_to_chord(distance_km: float) -> float:
+    return 2 * math.sin(min(distance_km / (2 * EARTH_RADIUS_KM), math.pi / 2))
+
+
+class _CellIndex:
+    """Facilities grouped by lat/lng grid cell, with each cell's bounding cap"""
+
+    def __init__(self, points: np.ndarray, lat: np.ndarray, lng: np.ndarray):
+        cells = np.floor(lat / CELL_DEGREES) * 1000 + np.floor(lng / CELL_DEGREES)
+        self.order = np.argsort(cells, kind="stable")
+        _, self.starts, self.counts = np.unique(cells[self.order], return_index=True, return_counts=True)
+        sorted_points = points[self.order]
+        centers = np.add.reduceat(sorted_points, self.starts)
+        self.centers = centers / np.linalg.norm(centers, axis=1)[:, None]
+        spread = np.linalg.norm(sorted_points - np.repeat(self.centers, self.counts, axis=0), axis=1)
+        self.radius = np.maximum.reduceat(spread, self.starts)  # chord from centre to farthest member
+
+    def candidates(self, query: np.ndarray, avoid: np.ndarray, min_chord: float,
+                   max_chord: float) -> np.ndarray:
+        """Members (local indices) of cells that may hold points beyond min_chord
+        of avoid and within max_chord of query"""
+        cells = np.flatnonzero(
+            (np.linalg.norm(self.centers - avoid, axis=1) + self.radius > min_chord)
+            & (np.linalg.norm(self.centers - query, axis=1) - self.radius <= max_chord)
+        )
+        counts = self.counts[cells]
+        first = np.repeat(self.starts[cells] - np.cumsum(counts) + counts, counts)
+        return self.order[first + np.arange(counts.sum())]
+
+
+class FacilityRegistry:
+    """Column-oriented facility table with per-type KD-trees"""
+
+    def __init__(self, ids: Sequence[str], names: Sequence[str], types: Sequence[str],
+                 lat: Sequence[float], lng: Sequence[float], capacity: Sequence[float]):
+        self.ids = np.asarray(ids, dtype=object)
+        self.names = np.asarray(names, dtype=object)
+        self.types = np.asarray(types, dtype=object)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lng = np.asarray(lng, dtype=np.float64)
+        self.capacity = np.asarray(capacity, dtype=np.float64)
+
+        self._trees: Dict[str, Tuple[np.ndarray, cKDTree]] = {}
+        self._cells: Dict[str, _CellIndex] = {}
+        self._points = unit_vectors(self.lat, self.lng)
+        for facility_type in np.unique(self.types):
+            members = np.flatnonzero(self.types == facility_type)
+            self._trees[str(facility_type)] = (members, cKDTree(self._points[members]))
+            self._cells[str(facility_type)] = _CellIndex(self._points[members], self.lat[members],
+                                                         self.lng[members])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def counts(self) -> Dict[str, int]:
+        return {facility_type: len(members) for facility_type, (members, _) in self._trees.items()}
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "FacilityRegistry":
+        records = list(records)
+        return cls([str(r["id"]) for r in records], [r.get("name", str(r["id"])) for r in records],
+                   [r["type"] for r in records], [r["lat"] for r in records],
+                   [r["lng"] for r in records], [r.get("capacity", 0) for r in records])
+
+    @classmethod
+    def from_csv(cls, path: str) -> "FacilityRegistry":
+        import pandas as pd
+
+        table = pd.read_csv(path, dtype={"id": str, "name": str, "type": str})
+        return cls(table["id"].to_numpy(), table["name"].fillna(table["id"]).to_numpy(),
+                   table["type"].to_numpy(), table["lat"].to_numpy(), table["lng"].to_numpy(),
+                   table["capacity"].fillna(0).to_numpy())
+
+    @classmethod
+    def from_geojson(cls, path: str) -> "FacilityRegistry":
+        with open(path) as f:
+            collection = json.load(f)
+        records = []
+        for feature in collection.get("features", []):
+            geometry = feature.get("geometry") or {}
+            if geometry.get("type") != "Point":
+                continue
+            lng, lat = geometry["coordinates"][:2]
+            props = feature.get("properties") or {}
+            records.append({
+                "id": props.get("id", feature.get("id", len(records))),
+                "name": props.get("name"),
+                "type": props.get("type", "shelter"),
+                "lat": lat,
+                "lng": lng,
+                "capacity": props.get("capacity", 0) or 0,
+            })
+        return cls.from_records(records)
+
+    @classmethod
+    def load(cls, path: str) -> "FacilityRegistry":
+        if path.lower().endswith((".geojson", ".json")):
+            return cls.from_geojson(path)
+        return cls.from_csv(path)
+
+    def nearest(self, point: Tuple[float, float], k: int, types: Sequence[str],
+                outside_km: float = 0.0, avoid: Optional[Tuple[float, float]] = None,
+                min_capacity: float = 1.0) -> List[dict]:
+        """k nearest facilities to point, of the given types and with capacity
+
+        Facilities within outside_km of avoid (defaults to point) are skipped,
+        e.g. everything inside the blast radius around the impact.
+        """
+        if k <= 0:
+            return []
+        query = unit_vectors(np.array([point[0]]), np.array([point[1]]))[0]
+        avoid_vec = query if avoid is None else unit_vectors(np.array([avoid[0]]), np.array([avoid[1]]))[0]
+        min_chord = km_to_chord(outside_km) if outside_km > 0 else 0.0
+
+        found: List[Tuple[float, int]] = []
+        for facility_type in types:
+            entry = self._trees.get(facility_type)
+            if entry is None:
+                continue
+            members, tree = entry
+            # At most `inside` neighbours can be excluded; widen further only for capacity
+            inside = int(tree.query_ball_point(avoid_vec, min_chord, return_length=True)) if min_chord else 0
+            if inside > RING_SEARCH_INSIDE:
+                found.extend(self._ring_search(facility_type, query, avoid_vec, min_chord, k, min_capacity))
+                continue
+            want = min(len(members), inside + k)
+            while True:
+                chords, local = tree.query(query, k=want)
+                chords, local = np.atleast_1d(chords), np.atleast_1d(local)
+                valid = local < len(members)
+                chords, rows = chords[valid], members[local[valid]]
+                ok = self.capacity[rows] >= min_capacity
+                if min_chord:
+                    ok &= np.linalg.norm(self._points[rows] - avoid_vec, axis=1) > min_chord
+                if ok.sum() >= k or want >= len(members):
+                    found.extend(zip(chords[ok][:k].tolist(), rows[ok][:k].tolist()))
+                    break
+                want = min(len(members), want * 2)
+
+        found.sort()
+        return [self.record(row, chord) for chord, row in found[:k]]
+
+    def _ring_search(self, facility_type: str, query: np.ndarray, avoid: np.ndarray, min_chord: float,
+                     k: int, min_capacity: float) -> List[Tuple[float, int]]:
+        """(chord, row) of the k nearest beyond min_chord of avoid, searching
+        outwards from query in rings that double in width"""
+        members = self._trees[facility_type][0]
+        cells = self._cells[facility_type]
+        # No facility outside the excluded cap is closer to query than this
+        reach = max(min_chord - float(np.linalg.norm(query - avoid)), 0.0)
+        width = km_to_chord(1.0)
+        while True:
+            max_chord = reach + width
+            rows = members[cells.candidates(query, avoid, min_chord, max_chord)]
+            chords = np.linalg.norm(self._points[rows] - query, axis=1)
+            ok = ((self.capacity[rows] >= min_capacity) & (chords <= max_chord)
+                  & (np.linalg.norm(self._points[rows] - avoid, axis=1) > min_chord))
+            if ok.sum() >= k or max_chord >= 2.0:  # 2 = antipode, the whole sphere
+                nearest = np.argsort(chords[ok], kind="stable")[:k]
+                return list(zip(chords[ok][nearest].tolist(), rows[ok][nearest].tolist()))
+            width *= 2
+
+    def record(self, row: int, chord: Optional[float] = None) -> dict:
+        result = {
+            "id": str(self.ids[row]),
+            "name": str(self.names[row]),
+            "facility_type": str(self.types[row]),
+            "location": (float(self.lat[row]), float(self.lng[row])),
+            "capacity": int(self.capacity[row]),
+        }
+        if chord is not None:
+            result["distance_km"] = round(float(chord_to_km(np.array(chord))), 2)
+        return result
+
+
+def load_facility_registry(path: Optional[str], fallback: Iterable[dict]) -> FacilityRegistry:
+    """Load the configured dataset, or the built-in fallback records"""
+    if path and os.path.exists(path):
+        return FacilityRegistry.load(path)
+    return FacilityRegistry.from_records(fallback)
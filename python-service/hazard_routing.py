@@ -0,0 +1,382 @@
+"""
+AEGIS NET - Hazard-aware routing
+Per-edge penalties from the blast, thermal and seismic radii, and
+shortest-path trees that are repaired incrementally when the radii are
+revised instead of being recomputed from scratch.
+
+Edges are classified by the distance of their midpoint to the impact
+point: 0 outside every zone, 1 seismic, 2 thermal, 3 blast. The routing
+weight is the base edge cost times HAZARD_PENALTIES[class].
+
+When a revised estimate arrives for the same impact point, only edges
+whose class changed get new weights. A cached tree is repaired in two
+passes (dynamic Dijkstra):
+  1. increase/decrease-key: every node keeps its tree path, re-priced
+     under the new weights by summing the weight changes down the tree
+     (vectorized pointer doubling). A ring crossing the tree shifts tens
+     of thousands of distances, but all in one array pass;
+  2. only nodes where another in-edge now beats the re-priced tree path
+     are re-parented, spreading Dijkstra-style from there.
+A small radius revision re-parents ~1% of the nodes. If more than
+FULL_RECOMPUTE_FRACTION of the edges changed class, or pass 2 would
+settle more than that fraction of the nodes, scipy's compiled full
+Dijkstra is faster and is used instead.
+"""
+
+import heapq
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from road_network import EARTH_RADIUS_KM, RoadGraph
+
+OUTSIDE, SEISMIC, THERMAL, BLAST = 0, 1, 2, 3
+HAZARD_PENALTIES = np.array([1.0, 1.5, 4.0, 20.0])
+# Python settles ~2.5e5 nodes/s against scipy's full pass over the whole graph, so
+# a revision changing more than this share of edges, or a repair settling more
+# than this share of nodes, is abandoned for a full run
+FULL_RECOMPUTE_FRACTION = 0.02
+# Relative improvement below which a repair keeps the existing parent: re-priced
+# distances carry rounding noise that must not re-parent whole subtrees
+REPAIR_TOLERANCE = 1e-9
+# Limit doublings before exit_paths settles for one unlimited Dijkstra
+EXIT_SEARCH_DOUBLINGS = 8
+
+
+def hazard_class(distance_km: np.ndarray, radii: Tuple[float, float, float]) -> np.ndarray:
+    """Zone class per distance for (blast, thermal, seismic) radii in km"""
+    blast, thermal, seismic = radii
+    zone = np.zeros(np.shape(distance_km), dtype=np.int8)
+    zone[distance_km <= seismic] = SEISMIC
+    zone[distance_km <= thermal] = THERMAL
+    zone[distance_km <= blast] = BLAST
+    return zone
+
+
+def haversine_km(lat: np.ndarray, lng: np.ndarray, center: Tuple[float, float]) -> np.ndarray:
+    lat0, lng0 = np.radians(center[0]), np.radians(center[1])
+    lat_r, lng_r = np.radians(lat), np.radians(lng)
+    a = (np.sin((lat_r - lat0) / 2) ** 2 +
+         np.cos(lat0) * np.cos(lat_r) * np.sin((lng_r - lng0) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class HazardField:
+    """Edge classes and routing weights for one (impact point, radii) estimate"""
+
+    def __init__(self, graph: RoadGraph, center: Tuple[float, float],
+                 radii: Tuple[float, float, float], edge_distance: np.ndarray):
+        self.center = center
+        self.radii = radii
+        self.edge_class = hazard_class(edge_distance, radii)
+        self.weights = graph.weights * HAZARD_PENALTIES[self.edge_class]
+        self.matrix = csr_matrix((self.weights, graph.indices, graph.indptr),
+                                 shape=(graph.num_nodes, graph.num_nodes))
+        self.trees: "OrderedDict[int, ShortestPathTree]" = OrderedDict()
+        self.exits: Optional[np.ndarray] = None  # see HazardRouter.exit_paths
+
+
+class ShortestPathTree:
+    """Single-source distances plus predecessor node and edge per node"""
+
+    def __init__(self, source: int, dist: np.ndarray, pred: np.ndarray, pred_edge: np.ndarray):
+        self.source = source
+        self.dist = dist
+        self.pred = pred
+        self.pred_edge = pred_edge
+
+    def path_edges(self, target: int) -> Optional[np.ndarray]:
+        """Edge ids from source to target, or None if unreachable"""
+        if target != self.source and self.pred_edge[target] < 0:
+            return None
+        edges = []
+        node = target
+        while node != self.source:
+            edges.append(int(self.pred_edge[node]))
+            node = int(self.pred[node])
+        edges.reverse()
+        return np.array(edges, dtype=np.int64)
+
+    def path_nodes(self, target: int) -> Optional[list]:
+        if target != self.source and self.pred[target] < 0:
+            return None
+        path = [target]
+        node = target
+        while node != self.source:
+            node = int(self.pred[node])
+            path.append(node)
+        path.reverse()
+        return path
+
+
+class HazardRouter:
+    """Caches hazard fields and their shortest-path trees, repairing on revision"""
+
+    def __init__(self, graph: RoadGraph, max_fields: int = 4, max_trees: int = 16):
+        self.graph = graph
+        self.max_fields = max_fields
+        self.max_trees = max_trees
+        self._fields: "OrderedDict[tuple, HazardField]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._edge_distance: Optional[Tuple[tuple, np.ndarray]] = None
+        self.full_computations = 0
+        self.repairs = 0
+        self.index_routes = 0
+
+        n = graph.num_nodes
+        self._edge_source = np.repeat(np.arange(n, dtype=np.int32), np.diff(graph.indptr))
+        self._edge_target = graph.indices
+        self._midpoint_lat = (graph.node_lat[self._edge_source] + graph.node_lat[graph.indices]) / 2
+        self._midpoint_lng = (graph.node_lng[self._edge_source] + graph.node_lng[graph.indices]) / 2
+
+    @staticmethod
+    def _center_key(center: Tuple[float, float]) -> tuple:
+        return (round(center[0], 6), round(center[1], 6))
+
+    def field(self, center: Tuple[float, float], radii: Tuple[float, float, float]) -> HazardField:
+        """Hazard field for an estimate, built once and shared across requests"""
+        key = (self._center_key(center), tuple(round(r, 3) for r in radii))
+        with self._lock:
+            field = self._fields.get(key)
+            if field is not None:
+                self._fields.move_to_end(key)
+                return field
+            distance = self._edge_distance_from(key[0])
+        field = HazardField(self.graph, key[0], key[1], distance)
+        with self._lock:
+            field = self._fields.setdefault(key, field)
+            self._fields.move_to_end(key)
+            while len(self._fields) > self.max_fields:
+                self._fields.popitem(last=False)
+        return field
+
+    def _edge_distance_from(self, center: tuple) -> np.ndarray:
+        # Revisions usually keep the impact point, so reuse midpoint distances
+        if self._edge_distance is None or self._edge_distance[0] != center:
+            distance = haversine_km(self._midpoint_lat, self._midpoint_lng, center)
+            self._edge_distance = (center, distance)
+        return self._edge_distance[1]
+
+    def tree(self, field: HazardField, source: int) -> ShortestPathTree:
+        """Shortest-path tree from source under field, repaired from an older estimate if possible"""
+        with self._lock:
+            tree = field.trees.get(source)
+            if tree is not None:
+                field.trees.move_to_end(source)
+                return tree
+            previous = None
+            for other in reversed(self._fields.values()):
+                if other is not field and other.center == field.center and source in other.trees:
+                    previous = (other, other.trees[source])
+                    break
+
+        tree = None
+        if previous is not None:
+            tree = self._repair(previous[1], previous[0], field)
+        if tree is None:
+            tree = self._full(field, source)
+
+        with self._lock:
+            field.trees[source] = tree
+            field.trees.move_to_end(source)
+            while len(field.trees) > self.max_trees:
+                field.trees.popitem(last=False)
+        return tree
+
+    def _full(self, field: HazardField, source: int) -> ShortestPathTree:
+        self.full_computations += 1
+        dist, pred = dijkstra(field.matrix, directed=True, indices=source, return_predecessors=True)
+        pred = np.where(pred >= 0, pred, -1).astype(np.int32)
+        return ShortestPathTree(source, dist, pred, self._tree_edges(pred))
+
+    def _tree_edges(self, pred: np.ndarray) -> np.ndarray:
+        """Edge id (pred[v] -> v) for every node with a predecessor"""
+        graph = self.graph
+        pred_edge = np.full(graph.num_nodes, -1, dtype=np.int64)
+        nodes = np.flatnonzero(pred >= 0)
+        if len(nodes):
+            # Scan each predecessor's CSR row for the column equal to the child
+            parents = pred[nodes].astype(np.int64)
+            counts = graph.indptr[parents + 1].astype(np.int64) - graph.indptr[parents]
+            child = np.repeat(nodes, counts)
+            edge_ids = self._expand(graph.indptr, parents)
+            match = graph.indices[edge_ids] == child
+            pred_edge[child[match]] = edge_ids[match]
+        return pred_edge
+
+    def _expand(self, indptr: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+        """Positions of all CSR entries belonging to nodes"""
+        starts = indptr[nodes].astype(np.int64)
+        counts = indptr[nodes + 1].astype(np.int64) - starts
+        if counts.sum() == 0:
+            return np.zeros(0, dtype=np.int64)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(starts, counts) + offsets
+
+    def _repair(self, tree: ShortestPathTree, old: HazardField,
+                new: HazardField) -> Optional[ShortestPathTree]:
+        """Update tree from old to new weights; None when a full run is cheaper"""
+        changed = np.flatnonzero(old.edge_class != new.edge_class)
+        if len(changed) == 0:
+            return tree
+        graph = self.graph
+        if len(changed) > FULL_RECOMPUTE_FRACTION * graph.num_edges:
+            return None
+        weights = new.weights
+        pred = tree.pred.copy()
+        pred_edge = tree.pred_edge.copy()
+
+        # Pass 1 (increase/decrease-key): every node keeps its tree path,
+        # re-priced under the new weights. Vectorized, whatever the subtree sizes
+        in_tree = np.flatnonzero(pred_edge >= 0)
+        delta = np.zeros(graph.num_nodes)
+        delta[in_tree] = weights[pred_edge[in_tree]] - old.weights[pred_edge[in_tree]]
+        dist = tree.dist + self._path_sums(delta, pred)
+
+        # Pass 2: re-parent only where another in-edge now beats the tree
+        # path; the improvement spreads Dijkstra-style from there
+        budget = int(FULL_RECOMPUTE_FRACTION * graph.num_nodes)
+        heap = self._relax(np.arange(graph.num_edges), dist, pred, pred_edge, weights)
+        if len(heap) > budget:
+            return None
+        if self._settle(heap, dist, pred, pred_edge, weights, budget) > budget:
+            return None
+
+        self.repairs += 1
+        return ShortestPathTree(tree.source, dist, pred, pred_edge)
+
+    @staticmethod
+    def _path_sums(values: np.ndarray, pred: np.ndarray) -> np.ndarray:
+        """values summed over each node's tree path from the root (pointer doubling)"""
+        total = values.copy()
+        ancestor = pred.astype(np.int64)
+        active = np.flatnonzero(ancestor >= 0)
+        while len(active):
+            up = ancestor[active]
+            total[active] += total[up]
+            ancestor[active] = ancestor[up]
+            active = active[ancestor[active] >= 0]
+        return total
+
+    def _relax(self, edges: np.ndarray, dist: np.ndarray, pred: np.ndarray,
+               pred_edge: np.ndarray, weights: np.ndarray) -> list:
+        """Apply every improving edge in edges; returns the seeded heap"""
+        if len(edges) == 0:
+            return []
+        src = self._edge_source[edges]
+        dst = self._edge_target[edges]
+        cand = dist[src] + weights[edges]
+        better = cand < dist[dst] * (1 - REPAIR_TOLERANCE)
+        edges, src, dst, cand = edges[better], src[better], dst[better], cand[better]
+        # Keep the best edge per target
+        order = np.lexsort((cand, dst))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = dst[order][1:] != dst[order][:-1]
+        order = order[first]
+        dist[dst[order]] = cand[order]
+        pred[dst[order]] = src[order]
+        pred_edge[dst[order]] = edges[order]
+        heap = list(zip(cand[order].tolist(), dst[order].tolist()))
+        heapq.heapify(heap)
+        return heap
+
+    def _settle(self, heap: list, dist: np.ndarray, pred: np.ndarray, pred_edge: np.ndarray,
+                weights: np.ndarray, budget: int) -> int:
+        """Dijkstra from a seeded heap; returns nodes settled (stops past budget)"""
+        indptr = self.graph.indptr
+        indices = self.graph.indices
+        keep = 1 - REPAIR_TOLERANCE
+        settled = 0
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            settled += 1
+            if settled > budget:
+                return settled
+            start, end = int(indptr[node]), int(indptr[node + 1])
+            for edge, nbr, w in zip(range(start, end), indices[start:end].tolist(),
+                                    weights[start:end].tolist()):
+                nd = d + w
+                if nd < dist[nbr] * keep:
+                    dist[nbr] = nd
+                    pred[nbr] = node
+                    pred_edge[nbr] = edge
+                    heapq.heappush(heap, (nd, nbr))
+        return settled
+
+    def exit_paths(self, field: HazardField, source: int, targets: List[int],
+                   index: "RouteIndex") -> List[Optional[list]]:
+        """Node paths to landmark targets finishing on the index; None where not provably optimal
+
+        A route's last zone edge ends at an exit: a node with a zone-free
+        out-edge, or the target itself. Beyond it the route pays base
+        weights, so it costs at least hazard(source, x) + base(x, target).
+        The exit minimizing that bound gives an optimal route whenever the
+        index's base path from it avoids every zone. hazard() comes from a
+        Dijkstra limited to where the minimum can still lie, which stays
+        near the zones instead of covering the whole graph.
+        """
+        graph = self.graph
+        if field.exits is None:
+            zoned = field.edge_class > 0
+            entered = np.zeros(graph.num_nodes, dtype=bool)
+            entered[graph.indices[zoned]] = True
+            leaves = np.zeros(graph.num_nodes, dtype=bool)
+            leaves[self._edge_source[~zoned]] = True
+            field.exits = np.flatnonzero(entered & leaves)
+        start, end = int(graph.indptr[source]), int(graph.indptr[source + 1])
+        if start == end:
+            return [None] * len(targets)
+        exits = field.exits
+        if not field.edge_class[start:end].all():
+            # A route may avoid the zones altogether
+            exits = np.union1d(exits, [source])
+
+        candidates = [np.append(exits, t) for t in targets]
+        base = [index.costs_to(nodes, t) for nodes, t in zip(candidates, targets)]
+        limit = 2 * float(field.weights[start:end].min())
+        for attempt in range(EXIT_SEARCH_DOUBLINGS + 2):
+            dist, pred = dijkstra(field.matrix, directed=True, indices=source,
+                                  limit=limit, return_predecessors=True)
+            # Best bound among settled exits; cheapest base cost beyond the limit
+            best, floor = [], []
+            for nodes, cost in zip(candidates, base):
+                reached = np.isfinite(dist[nodes])
+                best.append(float(np.min(dist[nodes][reached] + cost[reached], initial=np.inf)))
+                floor.append(float(np.min(cost[~reached], initial=np.inf)))
+            if all(b <= limit + f for b, f in zip(best, floor)):
+                break
+            if all(np.isfinite(best)):
+                # Best only falls and floor only rises as the limit grows
+                limit = max(b - f for b, f in zip(best, floor))
+            else:
+                limit = limit * 2 if attempt < EXIT_SEARCH_DOUBLINGS else np.inf
+        else:
+            return [None] * len(targets)
+
+        paths = []
+        for nodes, cost, target in zip(candidates, base, targets):
+            exit_node = int(nodes[np.argmin(dist[nodes] + cost)])
+            path = graph.path_nodes(pred, source, exit_node)
+            if path is not None and exit_node != target:
+                tail = index.path(exit_node, target)
+                if tail is None or field.edge_class[graph.path_edges(tail)].any():
+                    path = None
+                else:
+                    path = path + tail[1:]
+            paths.append(path)
+        self.index_routes += sum(path is not None for path in paths)
+        return paths
+
+    def stats(self) -> dict:
+        return {
+            "fields": len(self._fields),
+            "full_computations": self.full_computations,
+            "incremental_repairs": self.repairs,
+            "index_routes": self.index_routes,
+        }
@@ -0,0 +1,341 @@
+"""
+AEGIS NET - Impact physics core
+Scalar formulas shared by main.py and simple-server.py. Standard library
+only, so the fallback server runs without NumPy, SciPy or FastAPI and
+still returns the numbers the full service gives when no optional
+datasets (coastline, population raster, road graph, facilities, risk
+model) are configured.
+
+Where main.py has a NumPy version (debris grids, blast batches) it uses
+the same IEEE operations in the same order: sqrt(n*n + e*e) rather than
+hypot, and NumPy-style rounding (scale, round half to even, unscale), so
+both produce identical values.
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_GRID = 111.32
+
+# Fallback evacuation destinations when FACILITIES_PATH is not set
+# (also the landmarks of the precomputed route index)
+SAFE_ZONES = [
+    (40.7589, -73.9851),  # Safe zone 1
+    (40.7829, -73.9654),  # Safe zone 2
+    (40.6782, -73.9442),  # Safe zone 3
+]
+
+DEBRIS_SIZE_DISTRIBUTION = {
+    "large": 0.1,    # > 1m
+    "medium": 0.3,   # 0.1-1m
+    "small": 0.6     # < 0.1m
+}
+
+# Evacuee ceiling unless a population raster counted them: a uniform density
+# times the blast area counts ocean and wilderness as if they were city
+MAX_ESTIMATED_EVACUEES = 100000
+
+# Hazard zones, innermost last (hazard_routing.hazard_class)
+OUTSIDE, SEISMIC, THERMAL, BLAST = 0, 1, 2, 3
+
+
+def blast_radii(diameter: float, velocity: float, density: float) -> Dict[str, float]:
+    """Blast, thermal and seismic radii and airburst height (km, 2 decimals)"""
+    # Convert to SI units
+    diameter_m = diameter
+    velocity_ms = velocity * 1000  # km/s to m/s
+
+    # Calculate kinetic energy (Joules)
+    mass = (4/3) * math.pi * (diameter_m/2)**3 * density
+    kinetic_energy = 0.5 * mass * velocity_ms**2
+
+    # Convert to TNT equivalent (1 ton TNT = 4.184e9 J)
+    tnt_equivalent = kinetic_energy / (4.184e9)
+
+    # Simplified blast radius calculation (scaled from nuclear weapon models)
+    blast_radius = 0.1 * (tnt_equivalent ** (1/3))  # km
+
+    return {
+        "blast_radius": round(blast_radius, 2),
+        "thermal_radius": round(blast_radius * 1.5, 2),
+        "seismic_radius": round(blast_radius * 2.0, 2),
+        "airburst_height": round(max(0, diameter_m / 100), 2),  # km
+    }
+
+
+def is_coastal_location(lat: float, lng: float) -> bool:
+    """Simplified coastal detection (fallback without COASTLINE_PATH)"""
+    # NYC area is considered coastal
+    return (lat > 40.5 and lat < 41.0 and lng > -74.5 and lng < -73.5) or \
+           (lat > 25.0 and lat < 30.0 and lng > -85.0 and lng < -80.0)  # Florida
+
+
+def fallback_tsunami(lat: float, lng: float, blast_radius: float, diameter: float) -> dict:
+    """Tsunami fields without coastline data: demo coastal regions only"""
+    if not is_coastal_location(lat, lng) or diameter < 50:
+        return {"tsunami_risk": False}
+    return {
+        "tsunami_risk": True,
+        "wave_height": round(min(diameter / 10, 50), 1),  # meters, capped at 50m
+        "coastal_impact_radius": round(blast_radius * 3, 1),  # km
+    }
+
+
+def debris_extent(dispersion_radius: float, velocity: float) -> Tuple[float, float]:
+    """(reach, grid half width) in km
+
+    Faster impactors throw ejecta farther: the reach is the dispersion
+    radius scaled by sqrt(velocity / 20 km/s), clamped to [0.5, 2].
+    """
+    velocity_scale = min(max(math.sqrt(max(velocity, 0.0) / 20.0), 0.5), 2.0)
+    reach = max(dispersion_radius * velocity_scale, 1e-6)
+    return reach, max(dispersion_radius, reach)
+
+
+def grid_offsets(resolution: int, half_width: float) -> List[float]:
+    """Cell centres in km from the impact point along one axis"""
+    return [((i + 0.5) / resolution * 2 - 1) * half_width for i in range(resolution)]
+
+
+def debris_grid(dispersion_radius: float, velocity: float, resolution: int,
+                decimals: int = 3) -> List[List[float]]:
+    """Rounded debris fall probabilities, row 0 at the north edge"""
+    reach, half_width = debris_extent(dispersion_radius, velocity)
+    squares = [offset * offset for offset in grid_offsets(resolution, half_width)]
+    scale = 10 ** decimals
+    sqrt = math.sqrt
+    # 1 - d/reach never exceeds 1, so only the lower clamp is needed
+    return [
+        [round(p * scale) / scale if (p := 1 - sqrt(north + east) / reach) > 0 else 0.0
+         for east in squares]
+        for north in squares
+    ]
+
+
+def grid_bounds(center: Tuple[float, float], half_width: float) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) of a square half_width km around center"""
+    lat, lng = center
+    dlat = half_width / KM_PER_DEGREE_GRID
+    dlng = half_width / (KM_PER_DEGREE_GRID * max(math.cos(math.radians(lat)), 1e-6))
+    return (round(lat - dlat, 6), round(lng - dlng, 6),
+            round(lat + dlat, 6), round(lng + dlng, 6))
+
+
+def density_exposure(population_density: float, radii: Sequence[float]) -> List[float]:
+    """People within each radius at a uniform density (people/km²)"""
+    return [population_density * math.pi * r ** 2 for r in radii]
+
+
+# What to do at each risk level: the model's, or the blast-driven one for the thresholds
+LEVEL_RECOMMENDATIONS = {
+    "high": "Immediate evacuation required",
+    "medium": "Prepare for evacuation",
+}
+
+
+def risk_factors(blast_radius: float, tsunami_risk: bool, velocity: float) -> List[str]:
+    """Hazards that drive the risk level"""
+    factors = []
+    if blast_radius > 20:
+        factors.append("Large blast radius")
+    elif blast_radius > 10:
+        factors.append("Moderate blast radius")
+    if tsunami_risk:
+        factors.append("Tsunami risk")
+    if velocity > 20:
+        factors.append("High velocity impact")
+    return factors
+
+
+def risk_recommendations(risk_level: str, tsunami_risk: bool, velocity: float) -> List[str]:
+    """Actions for a risk level, plus those specific to the hazards present"""
+    recommendations = []
+    if risk_level in LEVEL_RECOMMENDATIONS:
+        recommendations.append(LEVEL_RECOMMENDATIONS[risk_level])
+    if tsunami_risk:
+        recommendations.append("Evacuate to higher ground")
+    if velocity > 20:
+        recommendations.append("Seek immediate shelter")
+    return recommendations
+
+
+def blast_risk_level(blast_radius: float) -> str:
+    """Threshold risk level from the blast radius alone"""
+    if blast_radius > 20:
+        return "high"
+    if blast_radius > 10:
+        return "medium"
+    return "low"
+
+
+def risk_rules(blast_radius: float, tsunami_risk: bool, velocity: float) -> dict:
+    """Threshold risk level with the factors and recommendations behind it
+
+    A tsunami raises the level to high but only adds its own advice: the
+    evacuation wording follows the blast radius, as it always has.
+    """
+    blast_level = blast_risk_level(blast_radius)
+    return {
+        "risk_level": "high" if tsunami_risk else blast_level,
+        "risk_factors": risk_factors(blast_radius, tsunami_risk, velocity),
+        "recommendations": risk_recommendations(blast_level, tsunami_risk, velocity),
+        "confidence_score": 0.85,
+    }
+
+
+def resource_needs(blast_radius: float, exposed: Optional[float], measured: bool = False) -> dict:
+    """Shelters, hospitals and centres for everyone inside the blast radius
+
+    exposed is the blast-zone population when known; only a measured
+    (raster) count may exceed MAX_ESTIMATED_EVACUEES.
+    """
+    if exposed is None:
+        exposed = blast_radius * 1000
+    estimated_evacuees = exposed if measured else min(exposed, MAX_ESTIMATED_EVACUEES)
+    shelters_needed = max(1, int(estimated_evacuees / 500))
+    hospitals_needed = max(1, int(estimated_evacuees / 1000))
+    evacuation_centers_needed = max(1, int(estimated_evacuees / 2000))
+
+    resource_shortage_risk = "low"
+    if shelters_needed > 50 or hospitals_needed > 25:
+        resource_shortage_risk = "high"
+    elif shelters_needed > 25 or hospitals_needed > 15:
+        resource_shortage_risk = "medium"
+
+    return {
+        "shelters_needed": shelters_needed,
+        "hospitals_needed": hospitals_needed,
+        "evacuation_centers_needed": evacuation_centers_needed,
+        "estimated_evacuees": int(estimated_evacuees),
+        "resource_shortage_risk": resource_shortage_risk,
+    }
+
+
+def haversine_distance(point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
+    """Great-circle distance in km"""
+    lat1, lng1 = point1
+    lat2, lng2 = point2
+
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+
+    a = (math.sin(dlat/2) * math.sin(dlat/2) +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
+         math.sin(dlng/2) * math.sin(dlng/2))
+
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    return EARTH_RADIUS_KM * c
+
+
+def hazard_zone(distance_km: float, radii: Tuple[float, float, float]) -> int:
+    """Zone of one distance for (blast, thermal, seismic) radii in km"""
+    blast, thermal, seismic = radii
+    zone = OUTSIDE
+    if distance_km <= seismic:
+        zone = SEISMIC
+    if distance_km <= thermal:
+        zone = THERMAL
+    if distance_km <= blast:
+        zone = BLAST
+    return zone
+
+
+def straight_line_exposure(start: Tuple[float, float], destination: Tuple[float, float],
+                           impact_location: Tuple[float, float],
+                           radii: Tuple[float, float, float], samples: int = 32) -> List[float]:
+    """Share of a straight-line route in [outside, seismic, thermal, blast]"""
+    lat0, lng0 = math.radians(impact_location[0]), math.radians(impact_location[1])
+    cos_lat0 = math.cos(lat0)
+    counts = [0, 0, 0, 0]
+    step = 1.0 / (samples - 1) if samples > 1 else 0.0
+    for i in range(samples):
+        t = 1.0 if i == samples - 1 else i * step
+        lat = math.radians(start[0] + (destination[0] - start[0]) * t)
+        lng = math.radians(start[1] + (destination[1] - start[1]) * t)
+        a = math.sin((lat - lat0) / 2) ** 2 + cos_lat0 * math.cos(lat) * math.sin((lng - lng0) / 2) ** 2
+        distance = 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(max(a, 0.0), 1.0)))
+        counts[hazard_zone(distance, radii)] += 1
+    return [count / samples for count in counts]
+
+
+def route_fields(index: int, waypoints: list, distance: float, base_time: float,
+                 road_capacity: float, exposure: Sequence[float],
+                 impact_location: Tuple[float, float], destination: Tuple[float, float],
+                 radii: Tuple[float, float, float], destination_id: Optional[str] = None) -> dict:
+    """EvacuationRoute fields for one leg; exposure as [outside, seismic, thermal, blast]"""
+    _, seismic, thermal, blast = exposure
+    # Evacuees converge on roads near the impact, so congestion grows
+    # with the share of the route inside each zone
+    traffic_factor = float(1.0 + 1.5 * blast + 0.8 * thermal + 0.4 * seismic)
+    estimated_time = base_time * traffic_factor
+
+    if traffic_factor < 1.2:
+        traffic_level = "light"
+    elif traffic_factor < 1.8:
+        traffic_level = "medium"
+    else:
+        traffic_level = "heavy"
+
+    # Penalize time spent in each zone; a destination inside a zone caps the score
+    destination_zone = hazard_zone(haversine_distance(impact_location, destination), radii)
+    score = 0.9 - 0.7 * blast - 0.4 * thermal - 0.2 * seismic
+    destination_cap = (0.9, 0.7, 0.5, 0.2)[destination_zone]
+    safety_score = float(max(0.1, min(score, destination_cap)))
+
+    return {
+        "route_id": f"route_{index + 1}",
+        "name": f"Evacuation Route {index + 1}",
+        "waypoints": waypoints,
+        "distance": round(distance, 2),
+        "estimated_time": round(estimated_time, 1),
+        "traffic_level": traffic_level,
+        "safety_score": round(safety_score, 2),
+        "capacity": int(road_capacity / traffic_factor),  # people per hour
+        "destination": destination_id,
+    }
+
+
+def straight_line_route(index: int, start: Tuple[float, float], destination: Tuple[float, float],
+                        impact_location: Tuple[float, float], radii: Tuple[float, float, float],
+                        destination_id: Optional[str] = None) -> dict:
+    """Route fields for a straight-line estimate (no road graph)"""
+    distance = haversine_distance(start, destination)
+    exposure = straight_line_exposure(start, destination, impact_location, radii)
+    return route_fields(index, [start, destination], distance, distance * 2,  # 2 minutes per km
+                        1000, exposure, impact_location, destination, radii, destination_id)
+
+
+def rank_routes(routes: List[dict]) -> List[dict]:
+    """Safest first, then longest estimated time (the service's order)"""
+    return sorted(routes, key=lambda route: (route["safety_score"], route["estimated_time"]),
+                  reverse=True)
+
+
+def _unit_vector(point: Tuple[float, float]) -> Tuple[float, float, float]:
+    lat, lng = math.radians(point[0]), math.radians(point[1])
+    return (math.cos(lat) * math.cos(lng), math.cos(lat) * math.sin(lng), math.sin(lat))
+
+
+def _chord(a: Tuple[float, float, float], b: Tuple[float, float, float]) -> float:
+    return math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2)
+
+
+def nearest_zones(start: Tuple[float, float], zones: Sequence[Tuple[float, float]], k: int,
+                  outside_km: float = 0.0,
+                  avoid: Optional[Tuple[float, float]] = None) -> List[int]:
+    """Indices of the k zones nearest start, skipping those within outside_km of avoid
+
+    Pure-Python FacilityRegistry.nearest for a handful of zones.
+    """
+    query = _unit_vector(start)
+    avoid_vector = query if avoid is None else _unit_vector(avoid)
+    min_chord = 2 * math.sin(min(outside_km / (2 * EARTH_RADIUS_KM), math.pi / 2)) if outside_km > 0 else 0.0
+    found = []
+    for i, zone in enumerate(zones):
+        vector = _unit_vector(zone)
+        if min_chord and _chord(vector, avoid_vector) <= min_chord:
+            continue
+        found.append((_chord(vector, query), i))
+    found.sort()
+    return [i for _, i in found[:k]]
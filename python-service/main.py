@@ -3,19 +3,51 @@ AEGIS NET - AI/ML Prediction Service
 FastAPI microservice for asteroid impact predictions and evacuation optimization
 """
 
-from fastapi import FastAPI, HTTPException
+# First import: starts the clock for startup timings (see startup.py)
+from startup import Assets, LazyAsset
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Tuple
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Tuple
+import asyncio
+import io
+import json
 import numpy as np
-import math
-from datetime import datetime
-import uvicorn
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from physics_kernels import blast_radius_kernel, impact_energy_kernel
+from prediction_cache import PredictionCache, canonical_key
+from prediction_store import HISTORY_COLUMNS, MAX_QUERY_ROWS, load_prediction_store
+from ensemble import EnsembleRunner
+from executor import Rejected, StageExecutor
+from pipeline import Pipeline
+from batching import Coalescer, MicroBatcher
+from risk_models import load_risk_model, risk_features
+from serialization import dumps_json, encode
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, MetricsRegistry, load_profiler
+import impact_core
+import scenario_sweep
+import deflection
+from simulation import LAYERS as SIMULATION_LAYERS, MAX_DURATION, MAX_STEPS, ImpactSimulation, run_frames
+from impact_core import DEBRIS_SIZE_DISTRIBUTION, SAFE_ZONES, grid_bounds
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm-up and history writer on startup (warm_up); pools stopped on shutdown"""
+    await warm_up()
+    yield
+    shutdown_workers()
 
 app = FastAPI(
     title="AEGIS NET AI Service",
     description="AI/ML predictions for asteroid impact response",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for Next.js integration
@@ -25,6 +57,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Grid-Shape", "X-Grid-Bounds", "X-Grid-Dtype", "X-Dispersion-Radius",
+                    "X-Sweep-Shape", "X-Sweep-Dtype", "X-Sweep-Axes", "X-Sweep-Fields"],
 )
 
 # Pydantic models
@@ -37,6 +71,7 @@ class AsteroidData(BaseModel):
 
 class PredictionRequest(BaseModel):
     asteroid_data: AsteroidData
+    asteroid_id: Optional[str] = None  # lets GET /predict/{asteroid_id} find the result
     user_location: Optional[Tuple[float, float]] = None
     population_density: Optional[float] = 1000  # people/km²
 
@@ -50,11 +85,66 @@ class TsunamiPrediction(BaseModel):
     tsunami_risk: bool
     wave_height: Optional[float] = None  # meters
     coastal_impact_radius: Optional[float] = None  # km
+    distance_to_coast: Optional[float] = None  # km, when coastline data covers the point
+    water_depth: Optional[float] = None  # meters, ocean impacts with bathymetry
 
 class DebrisDispersion(BaseModel):
     dispersion_radius: float  # km
     debris_size_distribution: dict
-    impact_probability_map: List[List[float]]
+    impact_probability_map: List[List[float]]  # row 0 = north edge
+    grid_bounds: Optional[Tuple[float, float, float, float]] = None  # south, west, north, east
+
+MAX_GRID_RESOLUTION = 4096
+MAX_JSON_GRID_RESOLUTION = 512  # larger grids only as binary
+
+class DebrisGridRequest(BaseModel):
+    asteroid_data: AsteroidData
+    resolution: int = Field(256, ge=2, le=MAX_GRID_RESOLUTION)
+    format: Literal["json", "float32", "float16", "npy"] = "json"
+
+MAX_ENSEMBLE_SAMPLES = 1000000
+
+class EnsembleRequest(BaseModel):
+    asteroid_data: AsteroidData
+    samples: int = Field(100000, ge=1000, le=MAX_ENSEMBLE_SAMPLES)
+    diameter_uncertainty: float = Field(0.1, ge=0)  # relative 1-sigma (lognormal)
+    density_uncertainty: float = Field(0.2, ge=0)  # relative 1-sigma (lognormal)
+    velocity_uncertainty: float = Field(0.05, ge=0)  # relative 1-sigma (normal)
+    impact_uncertainty_km: float = Field(10.0, ge=0)  # 1-sigma per axis
+    raster_resolution: int = Field(128, ge=8, le=256)
+    seed: Optional[int] = None
+    wait: bool = True  # False: return at once and poll GET /predict/ensemble/{job_id}
+
+class EnsembleStatus(BaseModel):
+    job_id: str
+    status: str  # queued, running, completed, failed, cancelled
+    samples: int
+    samples_done: int
+    chunks_done: int
+    chunks_total: int
+    progress: float  # 0-1
+    elapsed: float  # seconds
+    error: Optional[str] = None
+    raster_bounds: Optional[Tuple[float, float, float, float]] = None  # south, west, north, east
+    percentiles: Optional[dict] = None  # radius -> {p5, p25, p50, p75, p95} in km
+    probability_rasters: Optional[dict] = None  # effect -> grid of P(cell inside radius)
+
+MAX_SIMULATION_RESOLUTION = 512
+
+class SimulationRequest(BaseModel):
+    asteroid_data: AsteroidData
+    resolution: int = Field(128, ge=8, le=MAX_SIMULATION_RESOLUTION)
+    duration: Optional[float] = Field(None, gt=0, le=MAX_DURATION)  # seconds; None = until every process ends
+    steps: int = Field(120, ge=1, le=MAX_STEPS)
+    frame_every: int = Field(1, ge=1)  # send every n-th step (the last step is always sent)
+    stride: int = Field(1, ge=1)  # send every n-th cell along each axis
+    layers: List[Literal["zones", "debris", "wave"]] = list(SIMULATION_LAYERS)
+    roi: Optional[Tuple[float, float, float, float]] = None  # south, west, north, east
+
+class StreamPredictionRequest(PredictionRequest):
+    # Optional slow stages, streamed after the core prediction
+    debris_grid_resolution: Optional[int] = Field(None, ge=2, le=MAX_JSON_GRID_RESOLUTION)
+    ensemble_samples: Optional[int] = Field(None, ge=1000, le=MAX_ENSEMBLE_SAMPLES)
 
 class EvacuationRoute(BaseModel):
     route_id: str
@@ -65,12 +155,31 @@ class EvacuationRoute(BaseModel):
     traffic_level: str  # light, medium, heavy
     safety_score: float  # 0-1
     capacity: int  # people/hour
+    destination: Optional[str] = None  # facility id
+
+class FacilityAssignment(BaseModel):
+    id: str
+    name: str
+    facility_type: str  # safe_zone, shelter, hospital, evacuation_center
+    location: Tuple[float, float]
+    capacity: int  # people
+    distance_km: float  # from the impact point
 
 class RiskAssessment(BaseModel):
     risk_level: str  # low, medium, high
     risk_factors: List[str]
     recommendations: List[str]
     confidence_score: float  # 0-1
+    model_version: Optional[str] = None  # None = rule-based thresholds
+    class_probabilities: Optional[dict] = None  # risk level -> calibrated probability
+    rule_risk_level: Optional[str] = None  # thresholds' level when the model set risk_level
+
+class PopulationExposure(BaseModel):
+    # People within each radius (cumulative: thermal includes blast)
+    blast_zone: int
+    thermal_zone: int
+    seismic_zone: int
+    source: str  # raster, density
 
 class ResourceAllocation(BaseModel):
     shelters_needed: int
@@ -78,6 +187,10 @@ class ResourceAllocation(BaseModel):
     evacuation_centers_needed: int
     estimated_evacuees: int
     resource_shortage_risk: str  # low, medium, high
+    exposure: Optional[PopulationExposure] = None
+    shelters: List[FacilityAssignment] = []
+    hospitals: List[FacilityAssignment] = []
+    evacuation_centers: List[FacilityAssignment] = []
 
 class PredictionResponse(BaseModel):
     blast_prediction: BlastRadiusPrediction
@@ -88,220 +201,581 @@ class PredictionResponse(BaseModel):
     resource_allocation: ResourceAllocation
     processing_time: float  # seconds
 
+class BatchPredictionRequest(BaseModel):
+    asteroids: List[AsteroidData]
+
+class BatchBlastPrediction(BaseModel):
+    # Columnar layout: index i of every list belongs to asteroids[i]
+    blast_radius: List[float]  # km
+    thermal_radius: List[float]  # km
+    seismic_radius: List[float]  # km
+    airburst_height: List[float]  # km
+
+class BatchPredictionResponse(BaseModel):
+    count: int
+    blast_predictions: BatchBlastPrediction
+    processing_time: float  # seconds
+
+MAX_BATCH_SIZE = 100000
+
+class SweepLookupRequest(BaseModel):
+    # Columnar: index i of every list is one scenario
+    diameter: List[float]  # meters
+    velocity: List[float]  # km/s
+    density: Optional[List[float]] = None  # kg/m³, 3000 for every scenario when omitted
+
+class DeflectionRequest(BaseModel):
+    asteroid_data: AsteroidData
+    # Approach direction (see deflection.py): azimuth from Earth's motion towards the Sun
+    approach_azimuth: float = Field(deflection.DEFAULT_APPROACH[0], ge=-360, le=360)  # degrees
+    approach_elevation: float = Field(deflection.DEFAULT_APPROACH[1], ge=-89, le=89)  # degrees
+    # Columnar candidates: index i of every list is one deflection
+    lead_time_days: List[float]
+    delta_v_radial: Optional[List[float]] = None  # m/s, 0 for every candidate when omitted
+    delta_v_transverse: Optional[List[float]] = None  # m/s, along-track
+    delta_v_normal: Optional[List[float]] = None  # m/s
+
+class DeflectionRequirementRequest(BaseModel):
+    asteroid_data: AsteroidData
+    approach_azimuth: float = Field(deflection.DEFAULT_APPROACH[0], ge=-360, le=360)
+    approach_elevation: float = Field(deflection.DEFAULT_APPROACH[1], ge=-89, le=89)
+    lead_time_days: List[float]
+    direction: Tuple[float, float, float] = (0.0, 1.0, 0.0)  # radial, transverse, normal
+
+ROUTE_DESTINATIONS = 3
+ROUTE_DESTINATION_TYPES = ("safe_zone", "shelter", "evacuation_center")
+MAX_ASSIGNED_SHELTERS = 50
+MAX_ASSIGNED_HOSPITALS = 25
+MAX_ASSIGNED_EVACUATION_CENTERS = 25
+
+# Dataset loaders. Their modules (and SciPy) are imported on first use, in
+# the startup warm-up or the first request, not when this module is imported
+def _load_coastal_grid():
+    from coastline import load_coastal_grid
+    return load_coastal_grid(os.getenv("COASTLINE_PATH"))
+
+def _load_population_raster():
+    from population import load_population_raster
+    return load_population_raster(os.getenv("POPULATION_RASTER_PATH"))
+
+def _load_facility_registry(path: Optional[str] = None):
+    from facilities import load_facility_registry
+    return load_facility_registry(
+        path,
+        [{"id": f"safe_zone_{i + 1}", "name": f"Safe Zone {i + 1}", "type": "safe_zone",
+          "lat": lat, "lng": lng, "capacity": 10000}
+         for i, (lat, lng) in enumerate(SAFE_ZONES)]
+    )
+
+def _load_risk_model():
+    return load_risk_model(
+        os.getenv("RISK_MODEL_PATH"),
+        version=os.getenv("RISK_MODEL_VERSION") or None,
+        prewarm=os.getenv("RISK_MODEL_PREWARM", "1") == "1"
+    )
+
+def _load_sweep_table():
+    # Built in memory (well under a second) when SWEEP_TABLE_PATH is unset
+    return scenario_sweep.load_sweep_table(os.getenv("SWEEP_TABLE_PATH")) or scenario_sweep.build_sweep()
+
 # AI/ML Models (simplified for hackathon)
 class AsteroidImpactPredictor:
     """Simplified AI model for asteroid impact predictions"""
     
+    min_tsunami_wave = 0.5  # meters at the coast
+    
     def __init__(self):
         self.earth_radius = 6371  # km
         self.gravity = 9.81  # m/s²
+        # Land/ocean mask with depth and coast distance (see coastline.py)
+        self.coastal_grid_asset = LazyAsset("coastal_grid", _load_coastal_grid, fallback=lambda: None)
+        # Tiled population pyramid (see population.py)
+        self.population_raster_asset = LazyAsset("population_raster", _load_population_raster,
+                                                 fallback=lambda: None)
+    
+    @property
+    def coastal_grid(self):
+        return self.coastal_grid_asset.get()
+    
+    @property
+    def population_raster(self):
+        return self.population_raster_asset.get()
     
     def calculate_blast_radius(self, diameter: float, velocity: float, density: float) -> BlastRadiusPrediction:
-        """Calculate blast radius using simplified physics models"""
-        
-        # Convert to SI units
-        diameter_m = diameter
-        velocity_ms = velocity * 1000  # km/s to m/s
-        
-        # Calculate kinetic energy (Joules)
-        mass = (4/3) * math.pi * (diameter_m/2)**3 * density
-        kinetic_energy = 0.5 * mass * velocity_ms**2
-        
-        # Convert to TNT equivalent (1 ton TNT = 4.184e9 J)
-        tnt_equivalent = kinetic_energy / (4.184e9)
-        
-        # Simplified blast radius calculation (scaled from nuclear weapon models)
-        blast_radius = 0.1 * (tnt_equivalent ** (1/3))  # km
+        """Calculate blast radius using simplified physics models (see impact_core.py)"""
+        return BlastRadiusPrediction(**impact_core.blast_radii(diameter, velocity, density))
+    
+    def calculate_blast_radius_batch(self, diameters: np.ndarray, velocities: np.ndarray,
+                                     densities: np.ndarray) -> dict:
+        """Vectorized calculate_blast_radius over arrays of asteroids
+
+        Mirrors the scalar formula step for step. NumPy's pow may differ from
+        libm in the last bit, so rows whose unrounded value lands on a rounding
+        boundary are recomputed through the scalar path to keep results identical.
+        """
+        diameter_m = np.asarray(diameters, dtype=np.float64)
+        velocity = np.asarray(velocities, dtype=np.float64)
+        density = np.asarray(densities, dtype=np.float64)
         
-        # Thermal and seismic effects
-        thermal_radius = blast_radius * 1.5
-        seismic_radius = blast_radius * 2.0
+        raw = blast_radius_kernel(diameter_m, velocity, density)
+        results = {name: np.round(values, 2) for name, values in raw.items()}
         
-        # Airburst height (simplified)
-        airburst_height = max(0, diameter_m / 100)  # km
+        ambiguous = np.zeros(len(diameter_m), dtype=bool)
+        for values in raw.values():
+            ambiguous |= _near_rounding_boundary(values)
+        for i in np.flatnonzero(ambiguous):
+            exact = self.calculate_blast_radius(
+                float(diameter_m[i]), float(velocity[i]), float(density[i])
+            )
+            for name in results:
+                results[name][i] = getattr(exact, name)
         
-        return BlastRadiusPrediction(
-            blast_radius=round(blast_radius, 2),
-            thermal_radius=round(thermal_radius, 2),
-            seismic_radius=round(seismic_radius, 2),
-            airburst_height=round(airburst_height, 2)
-        )
+        return results
     
     def assess_tsunami_risk(self, impact_location: Tuple[float, float], 
                           blast_radius: float, diameter: float) -> TsunamiPrediction:
         """Assess tsunami risk based on impact location and size"""
         
         lat, lng = impact_location
-        
-        # Check if impact is in coastal area (simplified)
-        is_coastal = self._is_coastal_location(lat, lng)
-        
-        if not is_coastal or diameter < 50:  # Small asteroids unlikely to cause tsunamis
-            return TsunamiPrediction(tsunami_risk=False)
+        site = self.coastal_grid.point(lat, lng) if self.coastal_grid is not None else None
         
         # Simplified tsunami wave height calculation
         wave_height = min(diameter / 10, 50)  # meters, capped at 50m
         coastal_impact_radius = blast_radius * 3  # km
         
+        if site is None:
+            # No coastline data for this point: demo regions only
+            return TsunamiPrediction(**impact_core.fallback_tsunami(lat, lng, blast_radius, diameter))
+        
+        is_ocean, depth, coast_km = site
+        if is_ocean:
+            # Shallow water limits the displaced column; waves decay ~1/r beyond
+            # the coastal impact radius on their way to shore
+            if depth is not None:
+                wave_height *= min(1.0, depth / diameter)
+            wave_height *= min(1.0, coastal_impact_radius / max(coast_km, 1e-6))
+        else:
+            # Land impact: only a blast zone reaching the water displaces it
+            wave_height *= max(0.0, 1 - coast_km / blast_radius) if blast_radius > 0 else 0.0
+        
+        details = {
+            "distance_to_coast": round(coast_km, 1),
+            "water_depth": round(depth, 0) if is_ocean and depth is not None else None,
+        }
+        # Small asteroids unlikely to cause tsunamis
+        if diameter < 50 or wave_height < self.min_tsunami_wave:
+            return TsunamiPrediction(tsunami_risk=False, **details)
         return TsunamiPrediction(
             tsunami_risk=True,
             wave_height=round(wave_height, 1),
-            coastal_impact_radius=round(coastal_impact_radius, 1)
+            coastal_impact_radius=round(coastal_impact_radius, 1),
+            **details
         )
     
-    def _is_coastal_location(self, lat: float, lng: float) -> bool:
-        """Simplified coastal detection (for hackathon demo)"""
-        # NYC area is considered coastal
-        return (lat > 40.5 and lat < 41.0 and lng > -74.5 and lng < -73.5) or \
-               (lat > 25.0 and lat < 30.0 and lng > -85.0 and lng < -80.0)  # Florida
+    def estimate_exposure(self, impact_location: Tuple[float, float],
+                          blast_prediction: BlastRadiusPrediction,
+                          population_density: Optional[float]) -> Optional[PopulationExposure]:
+        """Population inside the blast, thermal and seismic footprints
+        
+        Integrates the population raster when one is configured, otherwise
+        assumes a uniform population_density (people/km²).
+        """
+        radii = (blast_prediction.blast_radius, blast_prediction.thermal_radius,
+                 blast_prediction.seismic_radius)
+        if self.population_raster is not None:
+            people, _ = self.population_raster.exposure(impact_location, radii)
+            source = "raster"
+        elif population_density is not None:
+            people = impact_core.density_exposure(population_density, radii)
+            source = "density"
+        else:
+            return None
+        return PopulationExposure(
+            blast_zone=int(people[0]),
+            thermal_zone=int(people[1]),
+            seismic_zone=int(people[2]),
+            source=source
+        )
     
-    def calculate_debris_dispersion(self, blast_radius: float, velocity: float) -> DebrisDispersion:
+    def calculate_debris_dispersion(self, blast_radius: float, velocity: float,
+                                    impact_location: Optional[Tuple[float, float]] = None,
+                                    grid_size: int = 20) -> DebrisDispersion:
         """Calculate debris dispersion patterns"""
         
         # Debris dispersion radius (simplified)
         dispersion_radius = blast_radius * 2.5
         
-        # Debris size distribution (simplified)
-        debris_sizes = {
-            "large": 0.1,    # > 1m
-            "medium": 0.3,   # 0.1-1m
-            "small": 0.6     # < 0.1m
-        }
+        # Create impact probability map
+        impact_map, bounds = self.debris_probability_grid(
+            dispersion_radius, velocity, impact_location or (0.0, 0.0), grid_size
+        )
         
-        # Create impact probability map (simplified grid)
-        grid_size = 20
-        impact_map = []
-        for i in range(grid_size):
-            row = []
-            for j in range(grid_size):
-                # Distance from center
-                distance = math.sqrt((i - grid_size/2)**2 + (j - grid_size/2)**2)
-                # Probability decreases with distance
-                probability = max(0, 1 - (distance / (grid_size/2)))
-                row.append(round(probability, 3))
-            impact_map.append(row)
-        
-        return DebrisDispersion(
+        # Internally built floats: skip validating every cell of the map
+        return DebrisDispersion.model_construct(
             dispersion_radius=round(dispersion_radius, 2),
-            debris_size_distribution=debris_sizes,
-            impact_probability_map=impact_map
+            debris_size_distribution=dict(DEBRIS_SIZE_DISTRIBUTION),
+            impact_probability_map=np.round(impact_map, 3).tolist(),
+            grid_bounds=bounds if impact_location is not None else None
         )
+    
+    def calculate_debris_dispersion_batch(self, blast_radii: List[float], velocities: List[float],
+                                          impact_locations: List[Tuple[float, float]],
+                                          grid_size: int = 20) -> List[DebrisDispersion]:
+        """calculate_debris_dispersion for many impacts with one array pass
+        
+        Every grid comes from the same element-wise operations as the scalar
+        path, so results are identical.
+        """
+        dispersion = [blast_radius * 2.5 for blast_radius in blast_radii]
+        reach, half_width = (np.array(values) for values in zip(*(
+            impact_core.debris_extent(d, v) for d, v in zip(dispersion, velocities)
+        )))
+        
+        unit = (np.arange(grid_size, dtype=np.float64) + 0.5) / grid_size * 2 - 1
+        squares = np.square(unit[None, :] * half_width[:, None])
+        grids = np.sqrt(squares[:, :, None] + squares[:, None, :])
+        grids /= reach[:, None, None]
+        np.subtract(1, grids, out=grids)
+        np.clip(grids, 0, 1, out=grids)
+        maps = np.round(grids, 3)
+        
+        return [
+            DebrisDispersion.model_construct(
+                dispersion_radius=round(dispersion[i], 2),
+                debris_size_distribution=dict(DEBRIS_SIZE_DISTRIBUTION),
+                impact_probability_map=maps[i].tolist(),
+                grid_bounds=grid_bounds(impact_locations[i], float(half_width[i]))
+            )
+            for i in range(len(dispersion))
+        ]
+    
+    def debris_probability_grid(self, dispersion_radius: float, velocity: float,
+                                impact_location: Tuple[float, float], resolution: int,
+                                dtype=np.float64) -> Tuple[np.ndarray, Tuple[float, float, float, float]]:
+        """Debris fall probability on a resolution x resolution lat/lng grid
+        
+        The grid spans the larger of the dispersion radius and the ejecta
+        reach (impact_core.debris_extent) around the impact point, row 0 at
+        the north edge. Returns (grid, (south, west, north, east)).
+        """
+        reach, half_width = impact_core.debris_extent(dispersion_radius, velocity)  # km
+        
+        # Cell centres in km from the impact point; sqrt(n² + e²) rather than
+        # hypot so impact_core.debris_grid reproduces every cell
+        offsets = ((np.arange(resolution, dtype=dtype) + 0.5) / resolution * 2 - 1) * half_width
+        squares = np.square(offsets)
+        grid = np.sqrt(squares[:, None] + squares[None, :])
+        grid /= reach
+        np.subtract(1, grid, out=grid)
+        np.clip(grid, 0, 1, out=grid)
+        
+        return grid, grid_bounds(impact_location, half_width)
 
 class EvacuationOptimizer:
     """AI-powered evacuation route optimization"""
     
+    max_snap_distance = 10.0  # km from a point to the road graph before falling back
+    max_waypoints = 200
+    
     def __init__(self):
-        self.road_network = self._load_road_network()
+        # Road graph with its landmark index and hazard router, loaded together
+        # Straight-line estimates when the road graph fails to load
+        self.routing_asset = LazyAsset("road_network", self._load_routing, fallback=lambda: (None, None, None))
     
-    def _load_road_network(self) -> dict:
-        """Load simplified road network (for hackathon demo)"""
-        # In production, this would load real road network data
-        return {
-            "highways": [
-                {"id": "hwy1", "capacity": 2000, "speed_limit": 100},
-                {"id": "hwy2", "capacity": 1500, "speed_limit": 80},
-            ],
-            "streets": [
-                {"id": "st1", "capacity": 500, "speed_limit": 50},
-                {"id": "st2", "capacity": 300, "speed_limit": 40},
-            ]
-        }
+    @property
+    def road_network(self):
+        return self.routing_asset.get()[0]
+    
+    @property
+    def route_index(self):
+        return self.routing_asset.get()[1]
+    
+    @property
+    def hazard_router(self):
+        return self.routing_asset.get()[2]
+    
+    def _load_routing(self) -> tuple:
+        from hazard_routing import HazardRouter
+        from route_index import load_route_index
+        
+        road_network = self._load_road_network()
+        # Optional precomputed landmark index (see route_index.py build)
+        route_index = load_route_index(os.getenv("ROUTE_INDEX_PATH"), road_network)
+        # Hazard-weighted trees, repaired incrementally as radii estimates change
+        hazard_router = HazardRouter(road_network) if road_network is not None else None
+        return road_network, route_index, hazard_router
+    
+    def _load_road_network(self) -> Optional["RoadGraph"]:
+        """Load the road graph named by ROAD_GRAPH_PATH (.npz or CSV directory)"""
+        from road_network import load_road_graph
+        # Without a dataset, routes fall back to straight-line estimates
+        return load_road_graph(os.getenv("ROAD_GRAPH_PATH"))
     
     def optimize_routes(self, start_location: Tuple[float, float],
                        safe_zones: List[Tuple[float, float]],
-                       blast_radius: float) -> List[EvacuationRoute]:
-        """Optimize evacuation routes using AI algorithms"""
+                       blast_radius: float,
+                       impact_location: Optional[Tuple[float, float]] = None,
+                       blast_prediction: Optional[BlastRadiusPrediction] = None,
+                       destination_ids: Optional[List[str]] = None) -> List[EvacuationRoute]:
+        """Optimize evacuation routes using AI algorithms
+        
+        Routes avoid the blast, thermal and seismic zones around impact_location
+        (defaults to start_location). Without a full blast_prediction the thermal
+        and seismic radii follow the calculate_blast_radius ratios.
+        destination_ids, when given, label each safe zone's route.
+        """
+        
+        if impact_location is None:
+            impact_location = start_location
+        if blast_prediction is not None:
+            radii = (blast_prediction.blast_radius, blast_prediction.thermal_radius,
+                     blast_prediction.seismic_radius)
+        else:
+            radii = (blast_radius, blast_radius * 1.5, blast_radius * 2.0)
         
         routes = []
+        legs = self._road_legs(start_location, safe_zones, impact_location, radii)
         
-        for i, safe_zone in enumerate(safe_zones):
-            # Calculate distance and route
-            distance = self._calculate_distance(start_location, safe_zone)
-            
-            # Estimate travel time based on distance and traffic
-            base_time = distance * 2  # 2 minutes per km
-            traffic_factor = self._estimate_traffic_factor(distance, blast_radius)
-            estimated_time = base_time * traffic_factor
-            
-            # Determine traffic level
-            if traffic_factor < 1.2:
-                traffic_level = "light"
-            elif traffic_factor < 1.8:
-                traffic_level = "medium"
+        for i, (safe_zone, leg) in enumerate(zip(safe_zones, legs)):
+            destination_id = destination_ids[i] if destination_ids else None
+            if leg is None:
+                # Straight-line estimate
+                fields = impact_core.straight_line_route(i, start_location, safe_zone,
+                                                         impact_location, radii, destination_id)
             else:
-                traffic_level = "heavy"
-            
-            # Calculate safety score
-            safety_score = self._calculate_safety_score(start_location, safe_zone, blast_radius)
-            
-            # Estimate capacity
-            capacity = int(1000 / traffic_factor)  # people per hour
-            
-            route = EvacuationRoute(
-                route_id=f"route_{i+1}",
-                name=f"Evacuation Route {i+1}",
-                waypoints=[start_location, safe_zone],
-                distance=round(distance, 2),
-                estimated_time=round(estimated_time, 1),
-                traffic_level=traffic_level,
-                safety_score=round(safety_score, 2),
-                capacity=capacity
-            )
-            routes.append(route)
+                # Travel time, traffic, safety score and capacity from the road leg
+                waypoints, distance, base_time, road_capacity, exposure = leg
+                fields = impact_core.route_fields(i, waypoints, distance, base_time, road_capacity,
+                                                  exposure, impact_location, safe_zone, radii,
+                                                  destination_id)
+            routes.append(fields)
         
         # Sort by safety score and estimated time
-        routes.sort(key=lambda x: (x.safety_score, x.estimated_time), reverse=True)
-        
-        return routes
+        return [EvacuationRoute(**fields) for fields in impact_core.rank_routes(routes)]
     
-    def _calculate_distance(self, point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
-        """Calculate distance between two points using Haversine formula"""
-        lat1, lng1 = point1
-        lat2, lng2 = point2
+    def _road_legs(self, start_location: Tuple[float, float],
+                   safe_zones: List[Tuple[float, float]],
+                   impact_location: Tuple[float, float],
+                   radii: Tuple[float, float, float]) -> List[Optional[tuple]]:
+        """Hazard-aware shortest road paths from start to every safe zone
+        
+        Each leg is (waypoints, distance km, free-flow minutes, bottleneck
+        capacity, hazard exposure), or None where the graph cannot serve that zone.
+        """
+        graph = self.road_network
+        if graph is None or not safe_zones:
+            return [None] * len(safe_zones)
         
-        R = 6371  # Earth's radius in km
+        nodes, snap_km = graph.nearest_nodes([start_location] + list(safe_zones))
+        if snap_km[0] > self.max_snap_distance:
+            return [None] * len(safe_zones)
         
-        dlat = math.radians(lat2 - lat1)
-        dlng = math.radians(lng2 - lng1)
+        source = int(nodes[0])
+        field = self.hazard_router.field(impact_location, radii)
+        index = self.route_index
+        tree = None
         
-        a = (math.sin(dlat/2) * math.sin(dlat/2) +
-             math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
-             math.sin(dlng/2) * math.sin(dlng/2))
+        # Destinations built into the index are landmarks: past the zones, routes follow the index
+        indexed = {}
+        if index is not None and source not in field.trees:
+            landmarks = [int(t) for t, snap in zip(nodes[1:], snap_km[1:])
+                         if snap <= self.max_snap_distance and index.is_landmark(int(t))]
+            if landmarks:
+                indexed = dict(zip(landmarks, self.hazard_router.exit_paths(field, source, landmarks, index)))
         
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        distance = R * c
+        legs = []
+        for safe_zone, target, target_snap in zip(safe_zones, nodes[1:], snap_km[1:]):
+            target = int(target)
+            path = edges = None
+            if target_snap <= self.max_snap_distance:
+                path = indexed.get(target)
+                if path is not None:
+                    edges = graph.path_edges(path)
+                else:
+                    if tree is None:
+                        tree = self.hazard_router.tree(field, source)
+                    path = tree.path_nodes(target)
+                    edges = tree.path_edges(target) if path is not None else None
+            if path is None:
+                legs.append(None)
+                continue
+            
+            access_km = float(snap_km[0] + target_snap)
+            distance = float(graph.length_km[edges].sum()) + access_km
+            base_time = float(graph.travel_minutes[edges].sum()) + access_km * 2
+            road_capacity = float(graph.capacity[edges].min()) if len(edges) else 1000
+            exposure = self._zone_fractions(field.edge_class[edges], graph.length_km[edges])
+            
+            if len(path) > self.max_waypoints:
+                keep = np.linspace(0, len(path) - 1, self.max_waypoints).astype(int)
+                path = [path[k] for k in keep]
+            waypoints = ([start_location] +
+                         [(float(graph.node_lat[n]), float(graph.node_lng[n])) for n in path] +
+                         [safe_zone])
+            legs.append((waypoints, distance, base_time, road_capacity, exposure))
         
-        return distance
+        return legs
     
-    def _estimate_traffic_factor(self, distance: float, blast_radius: float) -> float:
-        """Estimate traffic congestion factor"""
-        # Closer to blast radius = more traffic
-        if distance < blast_radius:
-            return 2.5  # Heavy traffic
-        elif distance < blast_radius * 2:
-            return 1.8  # Medium traffic
-        else:
-            return 1.2  # Light traffic
-    
-    def _calculate_safety_score(self, start: Tuple[float, float], 
-                               destination: Tuple[float, float], 
-                               blast_radius: float) -> float:
-        """Calculate safety score for evacuation route"""
-        distance = self._calculate_distance(start, destination)
-        
-        # Higher score for routes that move away from blast radius
-        if distance > blast_radius * 3:
-            return 0.9
-        elif distance > blast_radius * 2:
-            return 0.7
-        elif distance > blast_radius:
-            return 0.5
-        else:
-            return 0.2
+    def _zone_fractions(self, zones: np.ndarray, lengths: Optional[np.ndarray] = None) -> np.ndarray:
+        """Share of the route (by length) in [outside, seismic, thermal, blast]"""
+        totals = np.bincount(zones, weights=lengths, minlength=4)[:4]
+        total = totals.sum()
+        return totals / total if total > 0 else np.array([1.0, 0.0, 0.0, 0.0])
+
+def _near_rounding_boundary(values: np.ndarray, decimals: int = 2, tolerance=1e-9) -> np.ndarray:
+    """Flag values whose rounding could flip within a relative error of tolerance"""
+    scaled = values * (10 ** decimals)
+    distance = np.abs(scaled - np.floor(scaled) - 0.5)
+    return distance <= tolerance * np.maximum(1.0, np.abs(scaled))
 
 # Initialize AI models
 impact_predictor = AsteroidImpactPredictor()
 evacuation_optimizer = EvacuationOptimizer()
+# Shelters, hospitals and safe zones (see facilities.py for the CSV/GeoJSON layout)
+facility_registry = LazyAsset("facilities", lambda: _load_facility_registry(os.getenv("FACILITIES_PATH")),
+                              fallback=_load_facility_registry)
+
+# CPU-bound request work runs here, never on the event loop
+def _stage_executor() -> StageExecutor:
+    return StageExecutor(
+        kind=os.getenv("EXECUTOR_KIND", "thread"),
+        workers=int(os.getenv("EXECUTOR_WORKERS", "0")) or (os.cpu_count() or 1),
+        max_queue=int(os.getenv("EXECUTOR_MAX_QUEUE", "32")),
+        max_wait=float(os.getenv("EXECUTOR_MAX_WAIT", "10")),
+        # Fork process workers only after the warm-up has released its locks
+        before_fork=lambda: assets.wait(READY_TIMEOUT)
+    )
+
+stage_executor = _stage_executor()
+
+def after_fork() -> None:
+    """Own pools for a worker forked from a parent that loaded the assets (prefork.py)"""
+    global stage_executor
+    stage_executor = _stage_executor()
+
+# Monte Carlo ensembles run on a process pool sized by ENSEMBLE_WORKERS
+ensemble_runner = EnsembleRunner(
+    int(os.getenv("ENSEMBLE_WORKERS", "0")) or None,
+    max_queue=int(os.getenv("ENSEMBLE_MAX_QUEUE", "160")),
+    max_wait=float(os.getenv("ENSEMBLE_MAX_WAIT", "60"))
+)
+
+# Prometheus metrics (GET /metrics). Hot-path instruments are updated from
+# the event loop; component stats are read when scraped (see below).
+# PROFILE_DIR enables per-request profiles (X-Profile header or sampling)
+metrics = MetricsRegistry("aegis")
+http_requests = metrics.counter("http_requests_total", "HTTP requests by route and status",
+                                ("method", "route", "status"))
+http_latency = metrics.histogram("http_request_duration_seconds", "HTTP request latency",
+                                 ("method", "route"))
+stage_latency = metrics.histogram(
+    "stage_duration_seconds",
+    "Prediction stage latency incl. executor and batch waits (memo hits excluded); "
+    "serialization is response encoding", ("stage",)
+)
+stage_memo = metrics.counter("stage_memo_lookups_total", "Stage memo lookups", ("stage", "result"))
+app.add_middleware(
+    MetricsMiddleware, requests=http_requests, latency=http_latency,
+    profiler=load_profiler(os.getenv("PROFILE_DIR"), float(os.getenv("PROFILE_SAMPLE_RATE", "0")))
+)
+
+def observe_stage(name: str, seconds: float, hit: bool) -> None:
+    stage_memo.inc(name, "hit" if hit else "miss")
+    if not hit:
+        stage_latency.observe(seconds, name)
+
+# Prediction cache (LRU + TTL), keyed by a hash of the normalized request
+prediction_cache = PredictionCache(
+    max_size=int(os.getenv("PREDICTION_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+)
+
+def history_row(request: PredictionRequest, response: PredictionResponse) -> dict:
+    """HISTORY_COLUMNS of one prediction (runs on the store's writer thread)"""
+    asteroid = request.asteroid_data
+    blast = response.blast_prediction
+    exposure = response.resource_allocation.exposure
+    return {
+        "diameter": asteroid.diameter,
+        "velocity": asteroid.velocity,
+        "density": asteroid.density,
+        "lat": asteroid.impact_location[0],
+        "lng": asteroid.impact_location[1],
+        "blast_radius": blast.blast_radius,
+        "thermal_radius": blast.thermal_radius,
+        "seismic_radius": blast.seismic_radius,
+        "dispersion_radius": response.debris_dispersion.dispersion_radius,
+        "tsunami_risk": int(response.tsunami_prediction.tsunami_risk),
+        "wave_height": response.tsunami_prediction.wave_height,
+        "risk_level": response.risk_assessment.risk_level,
+        "confidence_score": response.risk_assessment.confidence_score,
+        "exposed_population": exposure.seismic_zone if exposure is not None else None,
+        "processing_time": response.processing_time,
+    }
+
+# Every /predict result, written in batches off the request path (see
+# prediction_store.py). Unset PREDICTION_STORE_PATH = in-memory cache only
+prediction_store = load_prediction_store(
+    os.getenv("PREDICTION_STORE_PATH"), history_row, dumps_json,
+    retention_days=float(os.getenv("PREDICTION_STORE_RETENTION_DAYS", "30")) or None,
+    max_rows=int(os.getenv("PREDICTION_STORE_MAX_ROWS", "1000000")) or None,
+    max_delay=float(os.getenv("PREDICTION_STORE_FLUSH_MS", "100")) / 1000,
+    dedupe_window=prediction_cache.ttl
+)
+
+def record_prediction(request: PredictionRequest, cache_key: str, response) -> None:
+    if prediction_store is not None:
+        prediction_store.record(request.asteroid_id, cache_key, request, response)
+
+# Prediction stages and their per-stage memo, keyed by stage input hash and
+# the asset generation (a reload must not serve outputs of the old datasets)
+stage_cache = PredictionCache(
+    max_size=int(os.getenv("STAGE_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+)
+prediction_pipeline = Pipeline(memo=stage_cache, observe=observe_stage,
+                               generation=lambda: assets.generation)
+
+# Trained risk classifier (see risk_models.py); rule-based when unset.
+# Concurrent requests share one predict_proba call per micro-batch.
+risk_model = LazyAsset("risk_model", _load_risk_model, fallback=lambda: None)
+risk_batcher = MicroBatcher(
+    lambda rows: risk_model.get().predict_proba(rows),
+    max_batch=int(os.getenv("RISK_BATCH_SIZE", "256")),
+    max_delay=float(os.getenv("RISK_BATCH_DELAY_MS", "2")) / 1000
+)
+
+# What-if slider lookups (see scenario_sweep.py)
+sweep_table = LazyAsset("sweep_table", _load_sweep_table, fallback=scenario_sweep.build_sweep)
+
+# Deflection what-ifs (see deflection.py): nominal trajectories and their
+# delta-v response, propagated once per approach geometry
+deflection_cache = PredictionCache(
+    max_size=int(os.getenv("DEFLECTION_CACHE_SIZE", "32")),
+    ttl=float(os.getenv("DEFLECTION_CACHE_TTL", "86400"))
+)
+deflection_engine = deflection.DeflectionEngine(deflection_cache)
+
+# Datasets and models load in a background warm-up by default; /health/ready
+# turns 200 when done and prediction requests wait up to READY_TIMEOUT for it.
+# A dataset that fails to load is served by its built-in fallback ("degraded")
+# and retried, rather than failing readiness
+assets = Assets([
+    facility_registry,
+    impact_predictor.coastal_grid_asset,
+    impact_predictor.population_raster_asset,
+    evacuation_optimizer.routing_asset,
+    risk_model,
+    sweep_table,
+])
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", "30"))
+
+async def require_assets() -> None:
+    """503 (Retry-After) unless the warm-up finishes within READY_TIMEOUT"""
+    if not await assets.wait(READY_TIMEOUT):
+        failed = assets.failed
+        detail = f"Failed to load: {', '.join(failed)}" if failed else "Service warming up"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "5"})
 
 @app.get("/")
 async def root():
@@ -312,7 +786,21 @@ async def root():
         "version": "1.0.0",
         "endpoints": [
             "/predict",
+            "/predict/stream",
+            "/predict/batch",
+            "/predict/debris-grid",
+            "/predict/ensemble",
+            "/predict/sweep",
+            "/predict/sweep/lookup",
+            "/predict/sweep/table",
+            "/predict/history",
+            "/simulate",
+            "/deflect",
+            "/deflect/required",
             "/health",
+            "/health/live",
+            "/health/ready",
+            "/metrics",
             "/docs"
         ]
     }
@@ -322,127 +810,978 @@ async def health_check():
     """Detailed health check"""
     return {
         "status": "healthy",
+        "ready": assets.ready,
         "timestamp": datetime.now().isoformat(),
         "services": {
             "impact_predictor": "operational",
             "evacuation_optimizer": "operational"
-        }
+        },
+        "prediction_cache": prediction_cache.stats(),
+        "stage_cache": stage_cache.stats(),
+        "coalescer": coalescer.stats(),
+        "risk_model": {
+            "version": getattr(risk_model.peek(), "version", None),
+            "batching": risk_batcher.stats()
+        },
+        "executor": stage_executor.stats(),
+        "ensemble": ensemble_runner.stats(),
+        "hazard_routing": hazard_routing_stats() or None,
+        "facilities": facility_registry.peek().counts() if facility_registry.loaded else None,
+        "prediction_store": prediction_store.stats() if prediction_store is not None else None,
+        "startup": assets.status(),
+        # Which pre-forked worker answered (prefork.py); generation None = single process
+        "worker": {"pid": os.getpid(), "generation": os.getenv("PREFORK_GENERATION")}
     }
 
+@app.get("/health/live")
+async def liveness():
+    """Process is up and serving (container health check)"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """200 once datasets and models are loaded, 503 while warming up or after a failed load
+    
+    For routing traffic, not for restarts: assets with a fallback serve it
+    (status "degraded", still ready) and retry the load every retry_interval; the rest
+    are retried by the next request that needs them.
+    """
+    status = assets.status()
+    return Response(dumps_json(status), status_code=200 if status["ready"] else 503,
+                    media_type="application/json")
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of request, stage, cache and executor metrics"""
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+def assign_facilities(impact_location: Tuple[float, float], blast_radius: float,
+                      needs: dict) -> dict:
+    """Nearest facilities with capacity outside the blast radius, per resource"""
+    return {
+        field: [FacilityAssignment(**facility) for facility in facility_registry.get().nearest(
+            impact_location, count, (facility_type,), outside_km=blast_radius)]
+        for field, (facility_type, count) in needs.items()
+    }
+
+# Prediction stages: each declares the stages and request fields it reads
+# (see pipeline.py). Module-level so the process executor can pickle them.
+@prediction_pipeline.stage("blast_prediction", offload=False,
+                           request_fields=("asteroid_data.diameter", "asteroid_data.velocity",
+                                           "asteroid_data.density"))
+def predict_blast(request: PredictionRequest) -> BlastRadiusPrediction:
+    return impact_predictor.calculate_blast_radius(
+        request.asteroid_data.diameter,
+        request.asteroid_data.velocity,
+        request.asteroid_data.density
+    )
+
+@prediction_pipeline.stage("tsunami_prediction", inputs=("blast_prediction",), offload=False,
+                           request_fields=("asteroid_data.impact_location", "asteroid_data.diameter"))
+def predict_tsunami(request: PredictionRequest,
+                    blast_prediction: BlastRadiusPrediction) -> TsunamiPrediction:
+    return impact_predictor.assess_tsunami_risk(
+        request.asteroid_data.impact_location,
+        blast_prediction.blast_radius,
+        request.asteroid_data.diameter
+    )
+
+@prediction_pipeline.stage("debris_dispersion", inputs=("blast_prediction",), offload=False,
+                           request_fields=("asteroid_data.velocity", "asteroid_data.impact_location"))
+def predict_debris(request: PredictionRequest,
+                   blast_prediction: BlastRadiusPrediction) -> DebrisDispersion:
+    return impact_predictor.calculate_debris_dispersion(
+        blast_prediction.blast_radius,
+        request.asteroid_data.velocity,
+        request.asteroid_data.impact_location
+    )
+
+@prediction_pipeline.stage("evacuation_routes", inputs=("blast_prediction",),
+                           request_fields=("asteroid_data.impact_location", "user_location"))
+def plan_routes(request: PredictionRequest,
+                blast_prediction: BlastRadiusPrediction) -> List[EvacuationRoute]:
+    """Routes to the nearest destinations outside the blast radius"""
+    impact_location = request.asteroid_data.impact_location
+    start_location = request.user_location or impact_location
+    destinations = facility_registry.get().nearest(
+        start_location, ROUTE_DESTINATIONS, ROUTE_DESTINATION_TYPES,
+        outside_km=blast_prediction.blast_radius, avoid=impact_location
+    )
+    if not destinations:
+        # Nothing outside the blast radius: head for the closest ones regardless
+        destinations = facility_registry.get().nearest(start_location, ROUTE_DESTINATIONS,
+                                                       ROUTE_DESTINATION_TYPES)
+    return evacuation_optimizer.optimize_routes(
+        start_location,
+        [facility["location"] for facility in destinations],
+        blast_prediction.blast_radius,
+        impact_location=impact_location,
+        blast_prediction=blast_prediction,
+        destination_ids=[facility["id"] for facility in destinations]
+    )
+
+@prediction_pipeline.stage("risk_assessment",
+                           inputs=("blast_prediction", "tsunami_prediction"),
+                           request_fields=("asteroid_data.diameter", "asteroid_data.velocity",
+                                           "asteroid_data.density", "population_density"))
+async def assess_risk(request: PredictionRequest, blast_prediction: BlastRadiusPrediction,
+                      tsunami_prediction: TsunamiPrediction) -> RiskAssessment:
+    """Risk level from the trained model when loaded, thresholds otherwise"""
+    assessment = assess_risk_rules(request, blast_prediction, tsunami_prediction)
+    model = risk_model.peek() if risk_model.loaded else await asyncio.to_thread(risk_model.get)
+    if model is None:
+        return assessment
+    
+    asteroid = request.asteroid_data
+    features = risk_features(
+        asteroid.diameter, asteroid.velocity, asteroid.density,
+        blast_prediction.blast_radius, blast_prediction.thermal_radius,
+        blast_prediction.seismic_radius, tsunami_prediction.tsunami_risk,
+        tsunami_prediction.wave_height or 0.0,
+        request.population_density if request.population_density is not None else 0.0
+    )
+    probabilities = await risk_batcher.submit(features)
+    best = int(np.argmax(probabilities))
+    assessment.rule_risk_level = assessment.risk_level
+    assessment.risk_level = model.classes[best]
+    assessment.recommendations = impact_core.risk_recommendations(
+        assessment.risk_level, tsunami_prediction.tsunami_risk, asteroid.velocity
+    )
+    assessment.confidence_score = round(float(probabilities[best]), 3)
+    assessment.model_version = model.version
+    assessment.class_probabilities = {
+        level: round(float(p), 3) for level, p in zip(model.classes, probabilities)
+    }
+    return assessment
+
+def assess_risk_rules(request: PredictionRequest, blast_prediction: BlastRadiusPrediction,
+                      tsunami_prediction: TsunamiPrediction) -> RiskAssessment:
+    """Threshold rules; the model keeps their factors but not their recommendations"""
+    return RiskAssessment(**impact_core.risk_rules(
+        blast_prediction.blast_radius, tsunami_prediction.tsunami_risk, request.asteroid_data.velocity
+    ))
+
+@prediction_pipeline.stage("resource_allocation", inputs=("blast_prediction",),
+                           request_fields=("asteroid_data.impact_location", "population_density"))
+def allocate_resources(request: PredictionRequest,
+                       blast_prediction: BlastRadiusPrediction) -> ResourceAllocation:
+    """Everyone inside the blast radius evacuates"""
+    impact_location = request.asteroid_data.impact_location
+    exposure = impact_predictor.estimate_exposure(
+        impact_location, blast_prediction, request.population_density
+    )
+    needs = impact_core.resource_needs(blast_prediction.blast_radius,
+                                       exposure.blast_zone if exposure is not None else None,
+                                       measured=exposure is not None and exposure.source == "raster")
+    return ResourceAllocation(
+        **needs,
+        exposure=exposure,
+        **assign_facilities(impact_location, blast_prediction.blast_radius, {
+            "shelters": ("shelter", min(needs["shelters_needed"], MAX_ASSIGNED_SHELTERS)),
+            "hospitals": ("hospital", min(needs["hospitals_needed"], MAX_ASSIGNED_HOSPITALS)),
+            "evacuation_centers": ("evacuation_center", min(needs["evacuation_centers_needed"],
+                                                            MAX_ASSIGNED_EVACUATION_CENTERS)),
+        })
+    )
+
+def prediction_cache_key(request: PredictionRequest) -> str:
+    # asteroid_id is only a lookup label and impact_time is not read by any
+    # stage, so neither is a model input; streaming extras are not part of
+    # the cached PredictionResponse
+    fields = set(PredictionRequest.model_fields) - {"asteroid_id"}
+    return canonical_key(request.model_dump(mode="json", include=fields,
+                                            exclude={"asteroid_data": {"impact_time"}}))
+
+def respond(payload, accept: Optional[str]) -> Response:
+    """encode(payload), timed as the serialization stage"""
+    started = time.perf_counter()
+    response = encode(payload, accept)
+    stage_latency.observe(time.perf_counter() - started, "serialization")
+    return response
+
+def _rejection(e: Rejected) -> HTTPException:
+    """Map an executor rejection to 429/503 with a Retry-After hint"""
+    return HTTPException(status_code=e.status_code, detail=str(e),
+                         headers={"Retry-After": str(e.retry_after)})
+
+def _selected_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse the comma-separated fields= selector (None = every stage)"""
+    if not fields:
+        return None
+    selected = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in prediction_pipeline.stages]
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown fields {unknown}; choose from {list(prediction_pipeline.stages)}"
+        )
+    return selected
+
 @app.post("/predict", response_model=PredictionResponse)
-async def predict_impact(request: PredictionRequest):
-    """Generate AI predictions for asteroid impact"""
+async def predict_impact(request: PredictionRequest, http_request: Request,
+                         fields: Optional[str] = None):
+    """Generate AI predictions for asteroid impact
     
-    start_time = datetime.now()
+    fields= (comma-separated, e.g. blast_prediction,risk_assessment) runs only
+    those stages and their inputs and returns just those keys. The body is
+    MessagePack when the Accept header prefers application/msgpack.
+    processing_time is this request's, so cache hits report the lookup.
+    """
+    start_time = time.monotonic()
+    selected = _selected_fields(fields)
+    accept = http_request.headers.get("accept")
+    cache_key = prediction_cache_key(request)
+    cached = prediction_cache.get(cache_key)
+    if cached is not None:
+        if request.asteroid_id:
+            prediction_cache.add_alias(request.asteroid_id, cache_key)
+        record_prediction(request, cache_key, cached)
+        processing_time = round(time.monotonic() - start_time, 3)
+        if selected is None:
+            return respond(cached.model_copy(update={"processing_time": processing_time}), accept)
+        return respond({**{name: getattr(cached, name) for name in selected},
+                       "processing_time": processing_time}, accept)
     
+    await require_assets()
     try:
-        # Calculate blast radius
-        blast_prediction = impact_predictor.calculate_blast_radius(
-            request.asteroid_data.diameter,
-            request.asteroid_data.velocity,
-            request.asteroid_data.density
-        )
-        
-        # Assess tsunami risk
-        tsunami_prediction = impact_predictor.assess_tsunami_risk(
-            request.asteroid_data.impact_location,
-            blast_prediction.blast_radius,
-            request.asteroid_data.diameter
+        if selected is None:
+            response = await coalescer.submit(request)
+        else:
+            parts = await prediction_pipeline.run(request, selected, execute=stage_executor.run)
+    except Rejected as e:
+        raise _rejection(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+    
+    if selected is not None:
+        return respond({**{name: parts[name] for name in selected},
+                       "processing_time": round(time.monotonic() - start_time, 3)}, accept)
+    prediction_cache.put(cache_key, response, alias=request.asteroid_id)
+    record_prediction(request, cache_key, response)
+    return respond(response, accept)
+
+async def predict_coalesced(requests: List[PredictionRequest]) -> list:
+    """Coalescer batch handler: blast and debris as array passes, then the
+    remaining stages per request (concurrently, through the executor)"""
+    start_time = time.monotonic()
+    asteroids = [request.asteroid_data for request in requests]
+    started = time.perf_counter()
+    radii = impact_predictor.calculate_blast_radius_batch(
+        np.array([a.diameter for a in asteroids]),
+        np.array([a.velocity for a in asteroids]),
+        np.array([a.density for a in asteroids])
+    )
+    blasts = [BlastRadiusPrediction(**{name: float(values[i]) for name, values in radii.items()})
+              for i in range(len(requests))]
+    blast_seconds = time.perf_counter() - started
+    debris = impact_predictor.calculate_debris_dispersion_batch(
+        [blast.blast_radius for blast in blasts],
+        [a.velocity for a in asteroids],
+        [a.impact_location for a in asteroids]
+    )
+    debris_seconds = time.perf_counter() - started - blast_seconds
+    # Every request in the batch waited for the whole array pass
+    for _ in requests:
+        stage_latency.observe(blast_seconds, "blast_prediction")
+        stage_latency.observe(debris_seconds, "debris_dispersion")
+    
+    async def finish(request, blast_prediction, debris_dispersion):
+        parts = await prediction_pipeline.run(
+            request, execute=stage_executor.run,
+            known={"blast_prediction": blast_prediction, "debris_dispersion": debris_dispersion}
         )
-        
-        # Calculate debris dispersion
-        debris_dispersion = impact_predictor.calculate_debris_dispersion(
-            blast_prediction.blast_radius,
-            request.asteroid_data.velocity
+        return PredictionResponse(**parts, processing_time=round(time.monotonic() - start_time, 3))
+    
+    return await asyncio.gather(*(finish(*args) for args in zip(requests, blasts, debris)),
+                                return_exceptions=True)
+
+# Concurrent /predict calls within COALESCE_WINDOW_MS share one batch;
+# identical payloads (same cache key) are computed once
+coalescer = Coalescer(
+    predict_coalesced,
+    key=prediction_cache_key,
+    max_batch=int(os.getenv("COALESCE_MAX_BATCH", "64")),
+    max_delay=float(os.getenv("COALESCE_WINDOW_MS", "2")) / 1000
+)
+
+# Component stats, read when /metrics is scraped
+_caches = {"prediction": prediction_cache, "stage": stage_cache, "deflection": deflection_cache}
+metrics.gauge("cache_lookups_total", "Cache lookups", ("cache", "result"), lambda: {
+    (name, result): getattr(cache, field)
+    for name, cache in _caches.items()
+    for result, field in (("hit", "hits"), ("miss", "misses"))
+}, kind="counter")
+metrics.gauge("cache_hit_ratio", "Cache hit rate since start", ("cache",),
+              lambda: {(name,): cache.stats()["hit_rate"] for name, cache in _caches.items()})
+metrics.gauge("cache_entries", "Cached entries", ("cache",),
+              lambda: {(name,): cache.stats()["size"] for name, cache in _caches.items()})
+metrics.gauge("executor_queue_depth", "Stage executor jobs waiting for a worker", (),
+              lambda: {(): stage_executor.queue_depth})
+metrics.gauge("executor_in_flight", "Stage executor jobs running", (),
+              lambda: {(): min(stage_executor.pending, stage_executor.workers)})
+metrics.gauge("executor_workers", "Stage executor workers", (),
+              lambda: {(): stage_executor.workers})
+metrics.gauge("executor_jobs_total", "Stage executor jobs by outcome", ("outcome",), lambda: {
+    ("submitted",): stage_executor.submitted,
+    ("completed",): stage_executor.completed,
+    ("rejected",): stage_executor.rejected,
+}, kind="counter")
+metrics.gauge("coalescer_requests_total", "/predict requests through the coalescer", ("result",), lambda: {
+    ("computed",): coalescer.requests - coalescer.deduplicated,
+    ("deduplicated",): coalescer.deduplicated,
+}, kind="counter")
+metrics.gauge("batches_total", "Batches run", ("batcher",), lambda: {
+    ("coalescer",): coalescer.batches,
+    ("risk_model",): risk_batcher.batches,
+}, kind="counter")
+
+def hazard_routing_stats() -> dict:
+    """HazardRouter counters; empty until a road graph has been loaded"""
+    routing = evacuation_optimizer.routing_asset.peek()
+    router = routing[2] if routing is not None else None
+    return router.stats() if router is not None else {}
+
+def _hazard_routing_counts() -> dict:
+    stats = hazard_routing_stats()
+    return {(kind,): stats[field] for kind, field in (("full_tree", "full_computations"),
+                                                      ("incremental_repair", "incremental_repairs"),
+                                                      ("index_route", "index_routes")) if field in stats}
+
+metrics.gauge("hazard_routing_total", "Hazard-weighted trees (full or repaired) and indexed routes",
+              ("kind",), _hazard_routing_counts, kind="counter")
+
+STREAM_PROGRESS_INTERVAL = 0.5  # seconds between ensemble progress events
+
+async def _run_stream(request: StreamPredictionRequest, selected: Optional[List[str]],
+                      emit) -> None:
+    """Run the stages as soon as their inputs are ready, emitting each result"""
+    cache_key = prediction_cache_key(request)
+    cached = prediction_cache.get(cache_key)
+    if cached is not None:
+        for name in selected or prediction_pipeline.stages:
+            await emit(name, data=getattr(cached, name))
+    
+    started = time.monotonic()
+    
+    async def on_result(name, value):
+        await emit(name, data=value)
+    
+    async def on_error(name, e):
+        if isinstance(e, Rejected):
+            await emit(name, error=str(e), status=e.status_code, retry_after=e.retry_after)
+        else:
+            await emit(name, error=f"Prediction error: {str(e)}",
+                       status=getattr(e, "status_code", 500))
+    
+    async def stage(name, fn, *args):
+        try:
+            value = await stage_executor.run(fn, *args)
+        except Exception as e:
+            await on_error(name, e)
+            return
+        await emit(name, data=value)
+    
+    async def ensemble():
+        ensemble_request = EnsembleRequest(asteroid_data=request.asteroid_data,
+                                           samples=request.ensemble_samples)
+        spec, bounds = ensemble_spec(ensemble_request)
+        try:
+            job = ensemble_runner.create_job(ensemble_request.samples)
+        except Rejected as e:
+            await on_error("ensemble", e)
+            return
+        job.bounds = bounds
+        task = ensemble_runner.start(job, spec, ensemble_request.seed)
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=STREAM_PROGRESS_INTERVAL)
+                if not task.done():
+                    await emit("ensemble_progress", data=job.progress())
+        finally:
+            # Client went away: its ensemble stops too
+            ensemble_runner.cancel(job)
+        if job.status == "failed":
+            await emit("ensemble", error=f"Ensemble error: {job.error}", status=500)
+        elif job.status == "cancelled":
+            await emit("ensemble", error="Ensemble job was cancelled", status=503)
+        else:
+            await emit("ensemble", data=EnsembleStatus(**job.progress(), raster_bounds=bounds,
+                                                       **job.result))
+    
+    jobs = []
+    if cached is None:
+        # Inline stages (blast radii first) are emitted before anything queues
+        pipeline_run = asyncio.ensure_future(prediction_pipeline.run(
+            request, selected, execute=stage_executor.run, on_result=on_result, on_error=on_error
+        ))
+        jobs.append(pipeline_run)
+    if request.debris_grid_resolution:
+        grid_request = DebrisGridRequest(asteroid_data=request.asteroid_data,
+                                         resolution=request.debris_grid_resolution)
+        jobs.append(stage("debris_grid", debris_grid_payload, grid_request))
+    if request.ensemble_samples:
+        jobs.append(ensemble())
+    await asyncio.gather(*jobs)
+    
+    if cached is None and selected is None:
+        parts = pipeline_run.result()
+        if len(parts) == len(prediction_pipeline.stages):
+            response = PredictionResponse(**parts,
+                                          processing_time=round(time.monotonic() - started, 3))
+            prediction_cache.put(cache_key, response, alias=request.asteroid_id)
+    elif cached is not None and request.asteroid_id:
+        prediction_cache.add_alias(request.asteroid_id, cache_key)
+
+def _encode_event(event: dict, sse: bool) -> bytes:
+    payload = dumps_json(event)
+    if sse:
+        return b"event: " + event["stage"].encode() + b"\ndata: " + payload + b"\n\n"
+    return payload + b"\n"
+
+async def _stream_events(request: StreamPredictionRequest, selected: Optional[List[str]],
+                         sse: bool):
+    started = time.monotonic()
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def emit(stage, **fields):
+        await queue.put({"stage": stage, "elapsed": round(time.monotonic() - started, 4), **fields})
+    
+    producer = asyncio.ensure_future(_run_stream(request, selected, emit))
+    producer.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while (event := await queue.get()) is not None:
+            yield _encode_event(event, sse)
+        if producer.exception() is not None:
+            yield _encode_event({"stage": "error", "error": str(producer.exception()), "status": 500}, sse)
+        yield _encode_event({"stage": "complete", "elapsed": round(time.monotonic() - started, 4)}, sse)
+    finally:
+        # Client went away: stop waiting on the remaining stages
+        producer.cancel()
+
+@app.post("/predict/stream")
+async def predict_stream(request: StreamPredictionRequest, http_request: Request,
+                         fields: Optional[str] = None):
+    """Progressive prediction: every stage is sent as soon as it is ready
+    
+    Server-Sent Events when the client accepts text/event-stream, NDJSON
+    otherwise. Each event is {"stage", "elapsed", "data"} or, for a failed
+    stage, {"stage", "elapsed", "error", "status"}; the last one is
+    "complete". Blast radii arrive first; optional debris_grid and ensemble
+    stages (with ensemble_progress events) follow the core prediction.
+    fields= selects stages as for /predict.
+    """
+    selected = _selected_fields(fields)
+    await require_assets()
+    sse = "text/event-stream" in http_request.headers.get("accept", "")
+    return StreamingResponse(
+        _stream_events(request, selected, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _next_frame_event(frames, started: float, sse: bool) -> Optional[bytes]:
+    """Step the simulation to its next frame and encode it (worker thread)"""
+    frame = next(frames, None)
+    if frame is None:
+        return None
+    return _encode_event({"stage": "frame", "elapsed": round(time.monotonic() - started, 4),
+                          "data": frame}, sse)
+
+async def _simulation_events(setup: dict, frames, sse: bool):
+    started = time.monotonic()
+    yield _encode_event({"stage": "setup", "elapsed": 0.0, "data": setup}, sse)
+    # Each frame is computed from the previous state, off the event loop,
+    # and sent before the next one is started
+    while (event := await asyncio.to_thread(_next_frame_event, frames, started, sse)) is not None:
+        yield event
+    yield _encode_event({"stage": "complete", "elapsed": round(time.monotonic() - started, 4)}, sse)
+
+@app.post("/simulate")
+async def simulate(request: SimulationRequest, http_request: Request):
+    """Time-stepped impact evolution, streamed frame by frame
+    
+    A "setup" event (grid bounds, the cropped window, time step, final
+    radii) is followed by one "frame" event per frame_every steps with the
+    front radii and the requested layers (row 0 = north edge, cropped to
+    roi and thinned by stride), then "complete". SSE when the client
+    accepts text/event-stream, NDJSON otherwise.
+    """
+    asteroid = request.asteroid_data
+    if request.roi is not None and (request.roi[0] >= request.roi[2] or request.roi[1] >= request.roi[3]):
+        raise HTTPException(status_code=422, detail="roi must be (south, west, north, east) with south < north and west < east")
+    await require_assets()
+    
+    blast = impact_predictor.calculate_blast_radius(asteroid.diameter, asteroid.velocity, asteroid.density)
+    tsunami = impact_predictor.assess_tsunami_risk(asteroid.impact_location, blast.blast_radius,
+                                                   asteroid.diameter)
+    energy = float(impact_energy_kernel(asteroid.diameter, asteroid.velocity, asteroid.density))
+    simulation = await asyncio.to_thread(
+        ImpactSimulation, asteroid.impact_location, blast.model_dump(), energy, asteroid.diameter,
+        asteroid.velocity, tsunami.wave_height if tsunami.tsunami_risk else None, request.resolution,
+        impact_predictor.coastal_grid
+    )
+    rows, cols, window_bounds = simulation.window(request.roi)
+    if rows.start >= rows.stop or cols.start >= cols.stop:
+        raise HTTPException(status_code=422, detail=f"roi does not overlap the simulation grid {simulation.bounds}")
+    
+    duration = request.duration or simulation.default_duration()
+    dt = duration / request.steps
+    layers = [layer for layer in request.layers if layer != "wave" or simulation.wave is not None]
+    setup = {
+        "grid_bounds": simulation.bounds,
+        "grid_shape": [request.resolution, request.resolution],
+        "cell_km": round(simulation.cell_km, 6),
+        "window_bounds": window_bounds,
+        "window_offset": [rows.start, cols.start],  # grid row and column of the window's first cell
+        "stride": request.stride,
+        "layers": layers,
+        "duration": round(duration, 3),
+        "dt": round(dt, 6),
+        "steps": request.steps,
+        "frames": request.steps // request.frame_every + 1 + (request.steps % request.frame_every > 0),
+        "blast_prediction": blast,
+        "tsunami_prediction": tsunami,
+        "dispersion_radius": round(simulation.dispersion_radius, 2),
+        "thermal_pulse": round(simulation.thermal_pulse, 3),
+        "shock_time": round(simulation.shock_time, 3),
+    }
+    frames = run_frames(simulation, dt, request.steps, request.frame_every, layers, request.roi,
+                        request.stride)
+    sse = "text/event-stream" in http_request.headers.get("accept", "")
+    return StreamingResponse(
+        _simulation_events(setup, frames, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(request: BatchPredictionRequest, http_request: Request):
+    """Score a whole NEO catalog in one vectorized pass"""
+    
+    start_time = time.monotonic()
+    
+    count = len(request.asteroids)
+    if count > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {count} asteroids (max {MAX_BATCH_SIZE})"
         )
+    
+    try:
+        diameters = np.fromiter((a.diameter for a in request.asteroids), dtype=np.float64, count=count)
+        velocities = np.fromiter((a.velocity for a in request.asteroids), dtype=np.float64, count=count)
+        densities = np.fromiter((a.density for a in request.asteroids), dtype=np.float64, count=count)
         
-        # Optimize evacuation routes
-        safe_zones = [
-            (40.7589, -73.9851),  # Safe zone 1
-            (40.7829, -73.9654),  # Safe zone 2
-            (40.6782, -73.9442),  # Safe zone 3
-        ]
+        results = await stage_executor.run(blast_radius_batch, diameters, velocities, densities)
         
-        evacuation_routes = evacuation_optimizer.optimize_routes(
-            request.asteroid_data.impact_location,
-            safe_zones,
-            blast_prediction.blast_radius
-        )
+        processing_time = time.monotonic() - start_time
         
-        # Risk assessment
-        risk_level = "low"
-        risk_factors = []
-        recommendations = []
-        
-        if blast_prediction.blast_radius > 20:
-            risk_level = "high"
-            risk_factors.append("Large blast radius")
-            recommendations.append("Immediate evacuation required")
-        elif blast_prediction.blast_radius > 10:
-            risk_level = "medium"
-            risk_factors.append("Moderate blast radius")
-            recommendations.append("Prepare for evacuation")
-        
-        if tsunami_prediction.tsunami_risk:
-            risk_level = "high"
-            risk_factors.append("Tsunami risk")
-            recommendations.append("Evacuate to higher ground")
-        
-        if request.asteroid_data.velocity > 20:
-            risk_factors.append("High velocity impact")
-            recommendations.append("Seek immediate shelter")
-        
-        risk_assessment = RiskAssessment(
-            risk_level=risk_level,
-            risk_factors=risk_factors,
-            recommendations=recommendations,
-            confidence_score=0.85
-        )
+        # Arrays go to the encoder as-is (BatchPredictionResponse layout)
+        return respond({
+            "count": count,
+            "blast_predictions": results,
+            "processing_time": round(processing_time, 3)
+        }, http_request.headers.get("accept"))
         
-        # Resource allocation
-        estimated_evacuees = min(blast_prediction.blast_radius * 1000, 100000)
-        shelters_needed = max(1, int(estimated_evacuees / 500))
-        hospitals_needed = max(1, int(estimated_evacuees / 1000))
-        evacuation_centers_needed = max(1, int(estimated_evacuees / 2000))
-        
-        resource_shortage_risk = "low"
-        if shelters_needed > 50 or hospitals_needed > 25:
-            resource_shortage_risk = "high"
-        elif shelters_needed > 25 or hospitals_needed > 15:
-            resource_shortage_risk = "medium"
-        
-        resource_allocation = ResourceAllocation(
-            shelters_needed=shelters_needed,
-            hospitals_needed=hospitals_needed,
-            evacuation_centers_needed=evacuation_centers_needed,
-            estimated_evacuees=int(estimated_evacuees),
-            resource_shortage_risk=resource_shortage_risk
+    except Rejected as e:
+        raise _rejection(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch prediction error: {str(e)}")
+
+def blast_radius_batch(diameters: np.ndarray, velocities: np.ndarray, densities: np.ndarray) -> dict:
+    # Module-level: the process executor pickles only the arrays, not the
+    # predictor and its LazyAssets
+    return impact_predictor.calculate_blast_radius_batch(diameters, velocities, densities)
+
+def render_debris_grid(request: DebrisGridRequest) -> tuple:
+    """Build and encode a debris grid: (content, media type or None for JSON, headers)"""
+    asteroid = request.asteroid_data
+    blast_prediction = impact_predictor.calculate_blast_radius(
+        asteroid.diameter, asteroid.velocity, asteroid.density
+    )
+    # Unrounded, like calculate_debris_dispersion, so grid_bounds match /predict
+    dispersion_radius = blast_prediction.blast_radius * 2.5
+    dtype = np.float64 if request.format == "json" else np.float32
+    grid, bounds = impact_predictor.debris_probability_grid(
+        dispersion_radius, asteroid.velocity, asteroid.impact_location, request.resolution, dtype
+    )
+    
+    if request.format == "json":
+        return {
+            "dispersion_radius": round(dispersion_radius, 2),
+            "grid_bounds": bounds,
+            "impact_probability_map": np.round(grid, 3).tolist()
+        }, None, None
+    
+    if request.format == "float16":
+        grid = grid.astype(np.float16)
+    headers = {
+        "X-Grid-Shape": f"{grid.shape[0]},{grid.shape[1]}",
+        "X-Grid-Bounds": ",".join(str(b) for b in bounds),
+        "X-Grid-Dtype": str(grid.dtype),
+        "X-Dispersion-Radius": str(round(dispersion_radius, 2)),
+    }
+    if request.format == "npy":
+        buffer = io.BytesIO()
+        np.save(buffer, grid)
+        return buffer.getvalue(), "application/x-npy", headers
+    return grid.tobytes(), "application/octet-stream", headers
+
+def debris_grid_payload(request: DebrisGridRequest) -> dict:
+    """JSON debris grid body (module-level for the process executor)"""
+    return render_debris_grid(request)[0]
+
+@app.post("/predict/debris-grid")
+async def predict_debris_grid(request: DebrisGridRequest, http_request: Request):
+    """Dense debris probability grid as JSON or a compact binary buffer
+    
+    Binary formats (float32, float16 raw row-major buffers, or .npy) carry
+    shape, dtype and lat/lng bounds in X-Grid-* response headers.
+    """
+    if request.format == "json" and request.resolution > MAX_JSON_GRID_RESOLUTION:
+        raise HTTPException(
+            status_code=422,
+            detail=f"JSON grids are limited to {MAX_JSON_GRID_RESOLUTION}; use a binary format"
         )
-        
-        processing_time = (datetime.now() - start_time).total_seconds()
-        
-        return PredictionResponse(
-            blast_prediction=blast_prediction,
-            tsunami_prediction=tsunami_prediction,
-            debris_dispersion=debris_dispersion,
-            evacuation_routes=evacuation_routes,
-            risk_assessment=risk_assessment,
-            resource_allocation=resource_allocation,
-            processing_time=round(processing_time, 3)
+    
+    try:
+        content, media_type, headers = await stage_executor.run(render_debris_grid, request)
+    except Rejected as e:
+        raise _rejection(e)
+    if media_type is None:
+        return respond(content, http_request.headers.get("accept"))
+    return Response(content=content, media_type=media_type, headers=headers)
+
+@app.post("/predict/ensemble", response_model=EnsembleStatus)
+async def predict_ensemble(request: EnsembleRequest, http_request: Request):
+    """Monte Carlo uncertainty ensemble: percentile bands and probability rasters"""
+    
+    spec, bounds = ensemble_spec(request)
+    try:
+        job = ensemble_runner.create_job(request.samples)
+    except Rejected as e:
+        raise _rejection(e)
+    job.bounds = bounds
+    task = ensemble_runner.start(job, spec, request.seed)
+    if not request.wait:
+        return respond(EnsembleStatus(**job.progress(), raster_bounds=bounds),
+                      http_request.headers.get("accept"))
+    
+    try:
+        await asyncio.wait({task})
+    finally:
+        # Client went away: its ensemble stops too
+        ensemble_runner.cancel(job)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Ensemble error: {job.error}")
+    if job.status == "cancelled":
+        raise HTTPException(status_code=503, detail="Ensemble job was cancelled")
+    return respond(EnsembleStatus(**job.progress(), raster_bounds=bounds, **job.result),
+                  http_request.headers.get("accept"))
+
+def ensemble_spec(request: EnsembleRequest) -> tuple:
+    """Worker spec and raster bounds for an ensemble request"""
+    asteroid = request.asteroid_data
+    nominal = impact_predictor.calculate_blast_radius(
+        asteroid.diameter, asteroid.velocity, asteroid.density
+    )
+    # Cover the nominal seismic zone plus three sigma of impact-point scatter
+    half_width = max(2 * nominal.seismic_radius + 3 * request.impact_uncertainty_km, 1.0)
+    spec = {
+        "diameter": asteroid.diameter,
+        "velocity": asteroid.velocity,
+        "density": asteroid.density,
+        "diameter_uncertainty": request.diameter_uncertainty,
+        "density_uncertainty": request.density_uncertainty,
+        "velocity_uncertainty": request.velocity_uncertainty,
+        "impact_uncertainty_km": request.impact_uncertainty_km,
+        "raster_half_width": half_width,
+        "raster_resolution": request.raster_resolution,
+    }
+    return spec, grid_bounds(asteroid.impact_location, half_width)
+
+@app.get("/predict/ensemble/{job_id}", response_model=EnsembleStatus)
+async def get_ensemble_status(job_id: str, http_request: Request):
+    """Progress of an ensemble job, with results once completed"""
+    job = ensemble_runner.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ensemble job {job_id}")
+    return respond(EnsembleStatus(**job.progress(), raster_bounds=job.bounds, **(job.result or {})),
+                  http_request.headers.get("accept"))
+
+async def _sweep_table() -> "scenario_sweep.SweepTable":
+    return sweep_table.peek() if sweep_table.loaded else await asyncio.to_thread(sweep_table.get)
+
+def _sweep_headers(table: "scenario_sweep.SweepTable") -> dict:
+    meta = table.meta
+    return {
+        "X-Sweep-Shape": ",".join(str(n) for n in table.values.shape),
+        "X-Sweep-Dtype": meta["dtype"],
+        "X-Sweep-Axes": dumps_json(meta["axes"]).decode(),
+        "X-Sweep-Fields": ",".join(meta["fields"]),
+    }
+
+def _round(values, decimals: int):
+    """round() for a scalar or elementwise, with Python's correctly rounded halves"""
+    if np.ndim(values) == 0:
+        return round(float(values), decimals)
+    rounded = np.round(values, decimals)
+    for i in np.flatnonzero(_near_rounding_boundary(values, decimals)):
+        rounded[i] = round(float(values[i]), decimals)
+    return rounded
+
+def sweep_response(blast: dict, fields: dict, diameter, velocity, density, from_table) -> dict:
+    """Lookup body in /predict's units and rounding (scalars or columns)"""
+    return {
+        "diameter": diameter,
+        "velocity": velocity,
+        "density": density,
+        "blast_prediction": blast,
+        "energy_megatons": fields["energy_megatons"],
+        # Open-water estimate; /predict reports it only for coastal impacts
+        "wave_height": _round(np.minimum(diameter / 10, scenario_sweep.MAX_WAVE_HEIGHT), 1),
+        "dispersion_radius": _round(blast["blast_radius"] * 2.5, 2),
+        "from_table": from_table,
+    }
+
+def sweep_lookup_batch(diameter: np.ndarray, velocity: np.ndarray, density: np.ndarray) -> dict:
+    """Table lookups, with points outside the table computed by the model
+    
+    Radii within the table's interpolation error of a rounding boundary are
+    recomputed with the scalar formula, so every value matches POST /predict.
+    """
+    table = sweep_table.get()
+    fields, inside = table.lookup(diameter, velocity, density)
+    outside = ~inside
+    if outside.any():
+        exact = scenario_sweep.model_fields(diameter[outside], velocity[outside], density[outside])
+        for name in scenario_sweep.FIELDS:
+            fields[name][outside] = exact[name]
+    radii = scenario_sweep.FIELDS[:4]
+    blast = {name: np.round(fields[name], 2) for name in radii}
+    ambiguous = np.zeros(len(diameter), dtype=bool)
+    for name in radii:
+        ambiguous |= _near_rounding_boundary(fields[name], tolerance=table.rounding_tolerance(fields[name]))
+    for i in np.flatnonzero(ambiguous):
+        exact = impact_core.blast_radii(float(diameter[i]), float(velocity[i]), float(density[i]))
+        for name in radii:
+            blast[name][i] = exact[name]
+    return sweep_response(blast, fields, diameter, velocity, density, inside)
+
+@app.get("/predict/sweep")
+async def get_sweep_table_info():
+    """Axes, fields and size of the scenario sweep table"""
+    table = await _sweep_table()
+    return {
+        **table.meta,
+        "shape": list(table.values.shape),
+        "bytes": int(table.values.nbytes),
+        "path": table.path,
+    }
+
+@app.get("/predict/sweep/lookup")
+async def sweep_lookup(http_request: Request, diameter: float = Query(..., gt=0),
+                       velocity: float = Query(..., gt=0), density: float = Query(3000, gt=0)):
+    """Location-independent outputs for one (diameter, velocity, density) scenario"""
+    table = await _sweep_table()
+    fields = table.point(diameter, velocity, density)
+    from_table = fields is not None
+    if fields is None:
+        fields = {name: float(value) for name, value in
+                  scenario_sweep.model_fields(diameter, velocity, density).items()}
+    radii = scenario_sweep.FIELDS[:4]
+    if from_table and not any(_near_rounding_boundary(fields[name], tolerance=table.rounding_tolerance(fields[name]))
+                              for name in radii):
+        blast = {name: round(fields[name], 2) for name in radii}
+    else:
+        # Same formula (and last bits) as POST /predict
+        blast = impact_core.blast_radii(diameter, velocity, density)
+    return respond(sweep_response(blast, fields, diameter, velocity, density, from_table),
+                   http_request.headers.get("accept"))
+
+@app.post("/predict/sweep/lookup")
+async def sweep_lookup_many(request: SweepLookupRequest, http_request: Request):
+    """Columnar lookups for many scenarios (from_table is False where the model was used)"""
+    count = len(request.diameter)
+    if count > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Too many scenarios: {count} (max {MAX_BATCH_SIZE})")
+    density = request.density if request.density is not None else [3000.0] * count
+    if len(request.velocity) != count or len(density) != count:
+        raise HTTPException(status_code=422, detail="diameter, velocity and density must have equal lengths")
+    columns = [np.asarray(values, dtype=np.float64) for values in (request.diameter, request.velocity, density)]
+    if any((column <= 0).any() for column in columns):
+        raise HTTPException(status_code=422, detail="diameter, velocity and density must be positive")
+    
+    await _sweep_table()
+    try:
+        result = await stage_executor.run(sweep_lookup_batch, *columns)
+    except Rejected as e:
+        raise _rejection(e)
+    return respond({"count": count, **result}, http_request.headers.get("accept"))
+
+@app.get("/predict/sweep/table")
+async def export_sweep_table():
+    """The whole table as .npy (natural logs) for client-side interpolation
+    
+    Axes (log-spaced min, max, count), field order and dtype are in the
+    X-Sweep-* headers and GET /predict/sweep.
+    """
+    table = await _sweep_table()
+    headers = _sweep_headers(table)
+    if table.path is not None:
+        return FileResponse(os.path.join(table.path, "values.npy"), media_type="application/x-npy",
+                            headers=headers)
+    return Response(content=table.to_npy(), media_type="application/x-npy", headers=headers)
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    return (value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)).timestamp()
+
+@app.get("/predict/history")
+async def get_prediction_history(http_request: Request, asteroid_id: Optional[str] = None,
+                                 since: Optional[datetime] = None, until: Optional[datetime] = None,
+                                 limit: int = Query(1000, ge=1, le=MAX_QUERY_ROWS),
+                                 columns: Optional[str] = None):
+    """Recorded predictions as columns (oldest first), for charting
+    
+    Filter by asteroid_id and an ISO-8601 time range (UTC unless an offset
+    is given); limit keeps the newest matches. columns= is a comma-separated
+    subset of the history columns. Predictions appear after the store's
+    flush delay (PREDICTION_STORE_FLUSH_MS).
+    """
+    if prediction_store is None:
+        raise HTTPException(status_code=404, detail="Prediction history is disabled (set PREDICTION_STORE_PATH)")
+    selected = [name.strip() for name in columns.split(",") if name.strip()] if columns else None
+    unknown = set(selected or ()) - set(HISTORY_COLUMNS)
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown columns: {', '.join(sorted(unknown))}; choose from {', '.join(HISTORY_COLUMNS)}"
         )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+    history = await asyncio.to_thread(prediction_store.history, asteroid_id, _timestamp(since),
+                                      _timestamp(until), limit, selected)
+    return respond(history, http_request.headers.get("accept"))
+
+def _lead_times(request) -> np.ndarray:
+    """lead_time_days as an array, validated"""
+    count = len(request.lead_time_days)
+    if count > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Too many candidates: {count} (max {MAX_BATCH_SIZE})")
+    lead = np.asarray(request.lead_time_days, dtype=np.float64)
+    if ((lead < 0) | (lead > deflection_engine.max_lead_days) | ~np.isfinite(lead)).any():
+        raise HTTPException(status_code=422,
+                            detail=f"lead_time_days must be within 0..{deflection_engine.max_lead_days}")
+    return lead
 
-@app.get("/predict/{asteroid_id}")
-async def get_cached_predictions(asteroid_id: str):
-    """Get cached predictions for an asteroid"""
-    # In production, this would fetch from a cache/database
+def nominal_summary(trajectory: "deflection.NominalTrajectory", cached: bool) -> dict:
     return {
-        "asteroid_id": asteroid_id,
-        "message": "Cached predictions not implemented in demo",
-        "status": "use /predict endpoint for new predictions"
+        "v_infinity": round(trajectory.v_inf, 4),
+        "capture_radius": round(trajectory.capture_radius, 2),
+        "orbit": trajectory.elements,
+        "cached": cached,
     }
 
+def deflection_batch(asteroid: AsteroidData, azimuth: float, elevation: float,
+                     lead: np.ndarray, delta_v: np.ndarray) -> dict:
+    trajectory, cached = deflection_engine.nominal(asteroid.velocity, azimuth, elevation)
+    outcome = deflection.evaluate(trajectory, asteroid.impact_location, lead, delta_v,
+                                  asteroid.diameter, asteroid.density)
+    decimals = {"miss_distance": 2, "b_plane_xi": 2, "b_plane_zeta": 2, "arrival_shift": 3,
+                "impact_lat": 6, "impact_lng": 6, "impact_velocity": 4, "energy_megatons": 4,
+                "blast_radius": 2}
+    return {
+        "nominal": nominal_summary(trajectory, cached),
+        "hit": outcome["hit"],
+        **{name: np.round(outcome[name], places) for name, places in decimals.items()},
+    }
+
+def deflection_requirement(asteroid: AsteroidData, azimuth: float, elevation: float,
+                           lead: np.ndarray, direction: Tuple[float, float, float]) -> dict:
+    trajectory, cached = deflection_engine.nominal(asteroid.velocity, azimuth, elevation)
+    required = trajectory.required_delta_v(lead, direction)
+    return {
+        "nominal": nominal_summary(trajectory, cached),
+        "direction": direction,
+        "delta_v": np.round(np.where(np.isfinite(required), required, np.nan), 6),
+    }
+
+@app.post("/deflect")
+async def deflect(request: DeflectionRequest, http_request: Request):
+    """Outcome of many (lead time, delta-v) deflections of one impactor, as columns
+
+    Per candidate: hit, miss_distance (km past the capture radius; negative
+    for hits), b-plane offset (km), arrival_shift (s, positive = later) and,
+    for hits, the shifted impact point, impact velocity, energy and blast
+    radius (null for misses). The nominal trajectory is propagated on the
+    first request for an approach geometry and cached (nominal.cached).
+    """
+    count = len(request.lead_time_days)
+    lead = _lead_times(request)
+    components = [request.delta_v_radial, request.delta_v_transverse, request.delta_v_normal]
+    if any(column is not None and len(column) != count for column in components):
+        raise HTTPException(status_code=422, detail="lead_time_days and delta_v columns must have equal lengths")
+    delta_v = np.column_stack([np.asarray(column, dtype=np.float64) if column is not None else np.zeros(count)
+                               for column in components])
+    if not np.isfinite(delta_v).all():
+        raise HTTPException(status_code=422, detail="delta_v must be finite")
+
+    try:
+        result = await stage_executor.run(deflection_batch, request.asteroid_data, request.approach_azimuth,
+                                          request.approach_elevation, lead, delta_v)
+    except Rejected as e:
+        raise _rejection(e)
+    return respond({"count": count, "lead_time_days": lead, **result}, http_request.headers.get("accept"))
+
+@app.post("/deflect/required")
+async def deflect_required(request: DeflectionRequirementRequest, http_request: Request):
+    """Smallest delta-v (m/s) along direction (radial, transverse, normal) that
+    turns the impact into a miss, per lead time (null = no effect that way)"""
+    if not any(request.direction):
+        raise HTTPException(status_code=422, detail="direction must be non-zero")
+    lead = _lead_times(request)
+    try:
+        result = await stage_executor.run(deflection_requirement, request.asteroid_data, request.approach_azimuth,
+                                          request.approach_elevation, lead, request.direction)
+    except Rejected as e:
+        raise _rejection(e)
+    return respond({"count": len(lead), "lead_time_days": lead, **result}, http_request.headers.get("accept"))
+
+async def warm_up():
+    """Start the history writer and the asset warm-up (see lifespan)"""
+    if prediction_store is not None:
+        prediction_store.start()
+    await assets.start(os.getenv("WARMUP_MODE", "background"))
+
+def shutdown_workers():
+    """Stop the worker pools and flush the history writer (see lifespan)"""
+    stage_executor.shutdown()
+    ensemble_runner.shutdown()
+    if prediction_store is not None:
+        prediction_store.close()
+
+@app.get("/predict/{asteroid_id}", response_model=PredictionResponse)
+async def get_cached_predictions(asteroid_id: str, http_request: Request):
+    """Latest prediction for an asteroid: cached, else the newest one recorded
+
+    processing_time is that of the request that computed it.
+    """
+    accept = http_request.headers.get("accept")
+    cached = prediction_cache.get_by_alias(asteroid_id)
+    if cached is not None:
+        return respond(cached, accept)
+    stored = None
+    if prediction_store is not None:
+        stored = await asyncio.to_thread(prediction_store.latest, asteroid_id)
+    if stored is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No prediction recorded for {asteroid_id}; POST /predict with asteroid_id first"
+        )
+    return respond(json.loads(stored), accept)
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Serve through "python -m uvicorn": spawned ensemble workers re-import
+    # the __main__ script, which must not be this module and the whole app
+    os.execv(sys.executable, [sys.executable, "-m", "uvicorn", "main:app", "--host", "0.0.0.0",
+                              "--port", "8000", "--app-dir", os.path.dirname(os.path.abspath(__file__))])
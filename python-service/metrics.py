@@ -0,0 +1,245 @@
+"""
+AEGIS NET - Metrics
+Prometheus text-format metrics without the client library. Counters and
+histograms are updated on the hot path with a dict lookup and a bisect
+(from the event loop thread only); gauges read component stats() when
+/metrics is scraped, so idle components cost nothing. Durations come from
+time.perf_counter, which is monotonic.
+
+Optional per-request profiles (RequestProfiler) are written when a
+request carries the X-Profile header or is sampled: pyinstrument HTML
+when installed, cProfile .prof (pstats, snakeviz) otherwise.
+"""
+
+import asyncio
+import os
+import random
+import re
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; covers a cached lookup (~100 us) up to a saturated executor
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+INF = 'le="+Inf"'
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in self.values.items():
+            lines.append(f"{self.name}{_labels(self.labels, values)} {_number(total)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> per-bucket counts (last slot: above every bound), sum
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _labels(self.labels, values, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{_labels(self.labels, values, INF)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, values)} {_number(round(total, 9))}")
+            lines.append(f"{self.name}_count{_labels(self.labels, values)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Values read at scrape time: read() -> {label values: value}"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str],
+                 read: Callable[[], Dict[Tuple[str, ...], float]], kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.read = read
+        self.kind = kind  # "counter" for totals kept by the component itself
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in self.read().items():
+            lines.append(f"{self.name}{_labels(self.labels, values)} {_number(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self, namespace: str = "aegis"):
+        self.namespace = namespace
+        self.metrics: List = []
+
+    def _add(self, metric):
+        metric.name = f"{self.namespace}_{metric.name}"
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str],
+              read: Callable[[], Dict[Tuple[str, ...], float]], kind: str = "gauge") -> Gauge:
+        return self._add(Gauge(name, help, labels, read, kind))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class RequestProfiler:
+    """Writes one profile per selected request into directory
+
+    Selected: an X-Profile: 1 header, or a sample_rate fraction of requests.
+    One profile runs at a time (others are not profiled); cProfile also
+    records whatever else the event loop runs meanwhile.
+    """
+
+    def __init__(self, directory: str, sample_rate: float = 0.0):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.written = 0
+        self._active = False
+        os.makedirs(directory, exist_ok=True)
+        try:
+            import pyinstrument  # noqa: F401  optional, async-aware
+            self.kind = "pyinstrument"
+        except ImportError:
+            self.kind = "cprofile"
+
+    def wants(self, scope: dict) -> bool:
+        if self._active:
+            return False
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile":
+                return value.lower() in (b"1", b"true", b"yes")
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, scope: dict) -> Tuple[object, str]:
+        """(profiler, output path) for a request that wants() a profile"""
+        self._active = True
+        self.written += 1
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope.get("path", "")).strip("_")[:60] or "root"
+        extension = "html" if self.kind == "pyinstrument" else "prof"
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{self.written}-"
+                                            f"{scope.get('method', '')}-{slug}.{extension}")
+        if self.kind == "pyinstrument":
+            from pyinstrument import Profiler
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler, path
+
+    async def finish(self, profiler, path: str) -> None:
+        self._active = False
+        if self.kind == "pyinstrument":
+            profiler.stop()
+            html = profiler.output_html()
+            await asyncio.to_thread(_write, path, html)
+        else:
+            profiler.disable()
+            await asyncio.to_thread(profiler.dump_stats, path)
+
+
+def _write(path: str, text: str) -> None:
+    with open(path, "w") as f:
+        f.write(text)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: request count and latency per route template"""
+
+    def __init__(self, app, requests: Counter, latency: Histogram,
+                 profiler: Optional[RequestProfiler] = None):
+        self.app = app
+        self.requests = requests
+        self.latency = latency
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+        profile = self.profiler.start(scope) if self.profiler and self.profiler.wants(scope) else None
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile is not None:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-profile-path", os.path.basename(profile[1]).encode())
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            # The router stores the matched route in scope: label by template,
+            # not raw path, to keep cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.requests.inc(scope["method"], route, str(status))
+            self.latency.observe(time.perf_counter() - start, scope["method"], route)
+            if profile is not None:
+                await self.profiler.finish(*profile)
+
+
+def load_profiler(directory: Optional[str], sample_rate: float = 0.0) -> Optional[RequestProfiler]:
+    """Profiler writing to directory, or None when profiling is not configured"""
+    if not directory:
+        return None
+    return RequestProfiler(directory, sample_rate)
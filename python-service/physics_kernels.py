@@ -0,0 +1,45 @@
+"""
+AEGIS NET - Vectorized physics kernels
+NumPy versions of the AsteroidImpactPredictor formulas, kept free of
+FastAPI/model imports so process-pool workers can import them cheaply.
+"""
+
+import math
+from typing import Dict
+
+import numpy as np
+
+
+def blast_radius_kernel(diameter: np.ndarray, velocity: np.ndarray,
+                        density: np.ndarray) -> Dict[str, np.ndarray]:
+    """Unrounded blast/thermal/seismic radii and airburst height (km)
+
+    Mirrors AsteroidImpactPredictor.calculate_blast_radius step for step.
+    """
+    diameter_m = np.asarray(diameter, dtype=np.float64)
+    velocity_ms = np.asarray(velocity, dtype=np.float64) * 1000  # km/s to m/s
+    density = np.asarray(density, dtype=np.float64)
+
+    mass = (4/3) * math.pi * (diameter_m/2)**3 * density
+    kinetic_energy = 0.5 * mass * velocity_ms**2
+    tnt_equivalent = kinetic_energy / (4.184e9)
+    blast_radius = 0.1 * (tnt_equivalent ** (1/3))
+
+    return {
+        "blast_radius": blast_radius,
+        "thermal_radius": blast_radius * 1.5,
+        "seismic_radius": blast_radius * 2.0,
+        "airburst_height": np.maximum(0, diameter_m / 100),
+    }
+
+
+def impact_energy_kernel(diameter: np.ndarray, velocity: np.ndarray,
+                         density: np.ndarray) -> np.ndarray:
+    """Kinetic energy in megatons of TNT (calculate_blast_radius's energy step)"""
+    diameter_m = np.asarray(diameter, dtype=np.float64)
+    velocity_ms = np.asarray(velocity, dtype=np.float64) * 1000  # km/s to m/s
+    density = np.asarray(density, dtype=np.float64)
+
+    mass = (4/3) * math.pi * (diameter_m/2)**3 * density
+    kinetic_energy = 0.5 * mass * velocity_ms**2
+    return kinetic_energy / (4.184e9) / 1e6
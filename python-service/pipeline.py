@@ -0,0 +1,167 @@
+"""
+AEGIS NET - Prediction pipeline
+Registered stages that declare the stages and request fields they read.
+The scheduler runs only the stages needed for the requested outputs,
+starts each one as soon as its inputs are ready (independent stages run
+concurrently), and memoizes outputs by input hash.
+
+A stage's memo key hashes its name, the declared request fields and the
+keys of its input stages, so it is known before anything runs and a hit
+skips the stage and everything it would have waited on. Keys only cover
+what is declared: a stage must not read request fields it does not list.
+They also include generation() when given (e.g. Assets.generation), so
+outputs computed from datasets that have since been reloaded are not
+served again.
+
+An optional observe(stage name, seconds, memo hit) callback receives each
+stage's run time (perf_counter, excluding the wait for its inputs).
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+
+from prediction_cache import PredictionCache, canonical_key
+
+
+class StageFailed(Exception):
+    """Raised for a stage whose input stage failed"""
+
+    status_code = 424
+
+
+class Stage:
+    def __init__(self, name: str, fn: Callable, inputs: Sequence[str],
+                 request_fields: Sequence[str], offload: bool):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.request_fields = tuple(request_fields)
+        self.offload = offload  # run on the executor rather than the event loop
+        self.is_async = asyncio.iscoroutinefunction(fn)  # awaited on the event loop
+
+
+def _field(payload: dict, path: str) -> Any:
+    for part in path.split("."):
+        payload = payload.get(part) if isinstance(payload, dict) else None
+    return payload
+
+
+class Pipeline:
+    """Stage registry and dependency-driven scheduler"""
+
+    def __init__(self, memo: Optional[PredictionCache] = None,
+                 observe: Optional[Callable[[str, float, bool], None]] = None,
+                 generation: Optional[Callable[[], Any]] = None):
+        self.stages: Dict[str, Stage] = {}
+        self.memo = memo
+        self.observe = observe
+        self.generation = generation
+
+    def stage(self, name: str, inputs: Sequence[str] = (), request_fields: Sequence[str] = (),
+              offload: bool = True) -> Callable:
+        """Register fn(request, *input_values) as the producer of name
+
+        Coroutine functions are awaited on the event loop (e.g. to join a
+        micro-batch); offload has no effect on them.
+        """
+        def register(fn: Callable) -> Callable:
+            missing = [dep for dep in inputs if dep not in self.stages]
+            if missing:
+                raise ValueError(f"stage {name!r} depends on unregistered {missing}")
+            self.stages[name] = Stage(name, fn, inputs, request_fields, offload)
+            return fn
+        return register
+
+    def resolve(self, fields: Optional[Iterable[str]] = None) -> List[str]:
+        """Requested stages plus their dependencies, in registration (topological) order"""
+        if fields is None:
+            return list(self.stages)
+        needed = set()
+        pending = list(fields)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise KeyError(name)
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].inputs)
+        return [name for name in self.stages if name in needed]
+
+    def keys(self, request, order: List[str]) -> Dict[str, str]:
+        payload = request.model_dump(mode="json")
+        generation = self.generation() if self.generation is not None else None
+        keys: Dict[str, str] = {}
+        for name in order:
+            stage = self.stages[name]
+            keys[name] = canonical_key({
+                "stage": name,
+                "request": {path: _field(payload, path) for path in stage.request_fields},
+                "inputs": [keys[dep] for dep in stage.inputs],
+                "generation": generation,
+            })
+        return keys
+
+    async def run(self, request, fields: Optional[Iterable[str]] = None,
+                  execute: Optional[Callable[..., Awaitable]] = None,
+                  on_result: Optional[Callable[[str, Any], Awaitable]] = None,
+                  on_error: Optional[Callable[[str, Exception], Awaitable]] = None,
+                  known: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run the stages behind fields; returns {stage name: output}
+
+        Offloaded stages go through execute(fn, *args) (e.g. the stage
+        executor). Without on_error the first failure cancels the rest and
+        is raised; with it, failures are reported and dependents skipped.
+        known holds outputs the caller already computed (e.g. for a whole
+        batch at once); those stages are not run.
+        """
+        known = known or {}
+        order = self.resolve(fields)
+        keys = self.keys(request, order)
+        results: Dict[str, Any] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(stage: Stage) -> Any:
+            if stage.name in known:
+                value = results[stage.name] = known[stage.name]
+                if on_result is not None:
+                    await on_result(stage.name, value)
+                return value
+            try:
+                args = []
+                for dep in stage.inputs:
+                    try:
+                        args.append(await tasks[dep])
+                    except Exception:
+                        raise StageFailed(f"Input stage {dep} failed")
+                started = time.perf_counter()
+                value = self.memo.get(keys[stage.name]) if self.memo is not None else None
+                hit = value is not None
+                if value is None:
+                    if stage.is_async:
+                        value = await stage.fn(request, *args)
+                    elif stage.offload and execute is not None:
+                        value = await execute(stage.fn, request, *args)
+                    else:
+                        value = stage.fn(request, *args)
+                    if self.memo is not None:
+                        self.memo.put(keys[stage.name], value)
+                if self.observe is not None:
+                    self.observe(stage.name, time.perf_counter() - started, hit)
+            except Exception as e:
+                if on_error is not None:
+                    await on_error(stage.name, e)
+                raise
+            results[stage.name] = value
+            if on_result is not None:
+                await on_result(stage.name, value)
+            return value
+
+        for name in order:
+            tasks[name] = asyncio.ensure_future(run_stage(self.stages[name]))
+        try:
+            await asyncio.gather(*tasks.values(), return_exceptions=on_error is not None)
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        return results
@@ -0,0 +1,261 @@
+"""
+AEGIS NET - Population exposure
+Integrates a gridded population raster (people per cell) over the blast,
+thermal and seismic footprints of an impact.
+
+The raster is preprocessed into a pyramid of fixed-size .npy tiles: level 0
+is the source resolution and every further level sums 2x2 cells of the one
+below. Tiles are opened with mmap_mode="r" and read through windows, so
+only the pages under a footprint are ever touched and continental rasters
+never have to fit in memory. Each footprint is integrated on the finest
+level that keeps its window under max_window_cells, which bounds
+per-request latency without coarsening the small inner rings. All-zero
+tiles (oceans, deserts) are not written.
+
+Raster directory layout:
+  * L<level>/<tile_row>_<tile_col>.npy   float32 people per cell
+  * meta.json                            bounds, shape, tile size, levels
+
+Usage:
+  python population.py build worldpop.npy population_tiles --bounds 24 -125 50 -66
+  python population.py build worldpop.tif population_tiles   # needs rasterio
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+RASTER_VERSION = 1
+KM_PER_DEGREE = 111.195
+MAX_OPEN_TILES = 512
+
+
+def _tile_path(root: str, level: int, tile_row: int, tile_col: int) -> str:
+    return os.path.join(root, f"L{level}", f"{tile_row}_{tile_col}.npy")
+
+
+class PopulationRaster:
+    """Memory-mapped, tiled population pyramid with windowed reads"""
+
+    max_window_cells = 1 << 20
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != RASTER_VERSION:
+            raise ValueError(f"unsupported population raster version {meta.get('version')}")
+        self.path = path
+        self.bounds = tuple(meta["bounds"])
+        self.tile_size = meta["tile_size"]
+        self.shapes = [tuple(shape) for shape in meta["level_shapes"]]
+        south, west, north, east = self.bounds
+        rows, cols = self.shapes[0]
+        self.cell_lat = (north - south) / rows  # degrees, level 0
+        self.cell_lng = (east - west) / cols
+        self._tiles: "OrderedDict[Tuple[int, int, int], Optional[np.ndarray]]" = OrderedDict()
+        self._tiles_lock = threading.Lock()  # requests integrate on the stage executor's threads
+
+    @property
+    def levels(self) -> int:
+        return len(self.shapes)
+
+    def _tile(self, level: int, tile_row: int, tile_col: int) -> Optional[np.ndarray]:
+        key = (level, tile_row, tile_col)
+        with self._tiles_lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+        path = _tile_path(self.path, level, tile_row, tile_col)
+        tile = np.load(path, mmap_mode="r") if os.path.exists(path) else None
+        with self._tiles_lock:
+            self._tiles[key] = tile
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > MAX_OPEN_TILES:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def window(self, level: int, row0: int, row1: int, col0: int, col1: int) -> np.ndarray:
+        """Cells [row0:row1, col0:col1] of a level, reading only the tiles they cover"""
+        rows, cols = self.shapes[level]
+        row0, row1 = max(row0, 0), min(row1, rows)
+        col0, col1 = max(col0, 0), min(col1, cols)
+        out = np.zeros((max(row1 - row0, 0), max(col1 - col0, 0)), dtype=np.float32)
+        size = self.tile_size
+        for tile_row in range(row0 // size, (row1 - 1) // size + 1 if row1 > row0 else 0):
+            for tile_col in range(col0 // size, (col1 - 1) // size + 1 if col1 > col0 else 0):
+                tile = self._tile(level, tile_row, tile_col)
+                if tile is None:
+                    continue
+                r0, c0 = tile_row * size, tile_col * size
+                rs, re = max(row0, r0), min(row1, r0 + tile.shape[0])
+                cs, ce = max(col0, c0), min(col1, c0 + tile.shape[1])
+                out[rs - row0:re - row0, cs - col0:ce - col0] = tile[rs - r0:re - r0, cs - c0:ce - c0]
+        return out
+
+    def _level_for(self, lat: float, radius_km: float) -> int:
+        rows = 2 * radius_km / KM_PER_DEGREE / self.cell_lat
+        cols = rows * self.cell_lat / self.cell_lng / max(math.cos(math.radians(lat)), 1e-3)
+        cells = rows * cols
+        level = 0
+        while cells > self.max_window_cells and level < self.levels - 1:
+            cells /= 4
+            level += 1
+        return level
+
+    def exposure(self, center: Tuple[float, float], radii: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """People whose cell centre lies within each radius (km) of center
+
+        Every radius is integrated on its own finest affordable level, so a
+        large seismic footprint does not coarsen the blast ring. Returns
+        (population per radius, pyramid level used per radius).
+        """
+        radii = np.asarray(radii, dtype=np.float64)
+        levels = np.array([self._level_for(center[0], r) for r in radii], dtype=np.int64)
+        totals = np.zeros(len(radii))
+        for level in np.unique(levels).tolist():
+            group = np.flatnonzero(levels == level)
+            totals[group] = self._integrate(center, radii[group], level)
+        return totals, levels
+
+    def _integrate(self, center: Tuple[float, float], radii: np.ndarray, level: int) -> np.ndarray:
+        """People within each radius, read from one window of one level"""
+        lat0, lng0 = center
+        reach = float(radii.max(initial=0.0))
+        scale = 2 ** level
+        cell_lat, cell_lng = self.cell_lat * scale, self.cell_lng * scale
+        south, west, north, east = self.bounds
+
+        # Window: bounding box of the largest footprint
+        half_lat = reach / KM_PER_DEGREE
+        half_lng = half_lat / max(math.cos(math.radians(lat0)), 1e-3)
+        row0 = int(math.floor((north - (lat0 + half_lat)) / cell_lat))
+        row1 = int(math.ceil((north - (lat0 - half_lat)) / cell_lat))
+        col0 = int(math.floor((lng0 - half_lng - west) / cell_lng))
+        col1 = int(math.ceil((lng0 + half_lng - west) / cell_lng))
+        rows, cols = self.shapes[level]
+        row0, row1 = max(row0, 0), min(row1, rows)
+        col0, col1 = max(col0, 0), min(col1, cols)
+        if row0 >= row1 or col0 >= col1:
+            return np.zeros(len(radii))
+        people = self.window(level, row0, row1, col0, col1)
+
+        # Equirectangular distances are accurate well past seismic radii
+        lat = north - (np.arange(row0, row1) + 0.5) * cell_lat
+        lng = west + (np.arange(col0, col1) + 0.5) * cell_lng
+        dy = (lat - lat0) * KM_PER_DEGREE
+        dx = (lng - lng0) * KM_PER_DEGREE
+        distance = np.hypot(dy[:, None], dx[None, :] * np.cos(np.radians(lat))[:, None])
+
+        # One pass: ring index per cell, people per ring, cumulative per radius
+        order = np.argsort(radii)
+        ring = np.searchsorted(radii[order], distance.ravel(), side="left")
+        per_ring = np.bincount(ring, weights=people.ravel().astype(np.float64), minlength=len(radii) + 1)
+        totals = np.empty(len(radii))
+        totals[order] = np.cumsum(per_ring[:len(radii)])
+        return totals
+
+
+def _read_source(path: str):
+    """Source raster as an array-like supporting 2D slicing, plus bounds if known"""
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode="r"), None
+    import rasterio  # optional, only for GeoTIFF sources
+    from rasterio.windows import Window
+
+    src = rasterio.open(path)
+    b = src.bounds
+
+    class _Windowed:
+        shape = (src.height, src.width)
+
+        def __getitem__(self, index):
+            rows, cols = index
+            window = Window(cols.start, rows.start,
+                            cols.stop - cols.start, rows.stop - rows.start)
+            return src.read(1, window=window, masked=True).filled(0)
+
+    return _Windowed(), (b.bottom, b.left, b.top, b.right)
+
+
+def build_pyramid(source, bounds: Tuple[float, float, float, float], output_dir: str,
+                  tile_size: int = 1024, levels: int = 8) -> dict:
+    """Tile source (any 2D-sliceable array) into a summed pyramid under output_dir"""
+    shapes = [tuple(source.shape)]
+    while len(shapes) < levels and max(shapes[-1]) > tile_size:
+        rows, cols = shapes[-1]
+        shapes.append(((rows + 1) // 2, (cols + 1) // 2))
+
+    meta = {"version": RASTER_VERSION, "bounds": list(bounds), "tile_size": tile_size,
+            "level_shapes": [list(shape) for shape in shapes]}
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    total = 0.0
+    for level, (rows, cols) in enumerate(shapes):
+        os.makedirs(os.path.join(output_dir, f"L{level}"), exist_ok=True)
+        below = PopulationRaster(output_dir) if level else None
+        for tile_row in range(math.ceil(rows / tile_size)):
+            for tile_col in range(math.ceil(cols / tile_size)):
+                r0, c0 = tile_row * tile_size, tile_col * tile_size
+                r1, c1 = min(r0 + tile_size, rows), min(c0 + tile_size, cols)
+                if level == 0:
+                    tile = np.asarray(source[r0:r1, c0:c1], dtype=np.float32)
+                    tile = np.where(np.isfinite(tile) & (tile > 0), tile, 0).astype(np.float32)
+                    total += float(tile.sum(dtype=np.float64))
+                else:
+                    fine = below.window(level - 1, 2 * r0, 2 * r1, 2 * c0, 2 * c1)
+                    padded = np.zeros((2 * (r1 - r0), 2 * (c1 - c0)), dtype=np.float32)
+                    padded[:fine.shape[0], :fine.shape[1]] = fine
+                    tile = padded.reshape(r1 - r0, 2, c1 - c0, 2).sum(axis=(1, 3))
+                if tile.any():
+                    np.save(_tile_path(output_dir, level, tile_row, tile_col), tile)
+    meta["total_population"] = round(total)
+    with open(os.path.join(output_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def load_population_raster(path: Optional[str]) -> Optional[PopulationRaster]:
+    """Open the configured raster, or None when no dataset is available"""
+    if not path or not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    try:
+        return PopulationRaster(path)
+    except ValueError as e:
+        print(f"Ignoring population raster at {path}: {e}")
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AEGIS NET population raster tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = sub.add_parser("build", help="Tile a population raster into a summed pyramid")
+    build_cmd.add_argument("source", help=".npy (people per cell) or GeoTIFF via rasterio")
+    build_cmd.add_argument("output")
+    build_cmd.add_argument("--bounds", type=float, nargs=4, metavar=("SOUTH", "WEST", "NORTH", "EAST"),
+                           help="required for .npy sources")
+    build_cmd.add_argument("--tile-size", type=int, default=1024)
+    build_cmd.add_argument("--levels", type=int, default=8)
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+    source, bounds = _read_source(args.source)
+    bounds = tuple(args.bounds) if args.bounds else bounds
+    if bounds is None:
+        parser.error("--bounds is required for .npy sources")
+    meta = build_pyramid(source, bounds, args.output, args.tile_size, args.levels)
+    print(f"Wrote {args.output}: {len(meta['level_shapes'])} levels, "
+          f"{meta['total_population']} people in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
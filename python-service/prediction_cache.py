@@ -0,0 +1,99 @@
+"""
+AEGIS NET - Prediction cache
+Bounded LRU cache with per-entry TTL for /predict results
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def canonical_key(payload: dict) -> str:
+    """Content-addressed key: SHA-256 of the payload as canonical JSON"""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), allow_nan=True)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with TTL expiry and hit/miss/eviction counters"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl  # seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._aliases: Dict[str, str] = {}  # asteroid_id -> latest key
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on miss/expiry"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any, alias: Optional[str] = None) -> None:
+        """Store value under key, optionally reachable through an alias"""
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            if alias is not None:
+                self._aliases[alias] = key
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            if len(self._aliases) > self.max_size:
+                # Drop aliases whose entries are gone
+                self._aliases = {a: k for a, k in self._aliases.items() if k in self._entries}
+
+    def add_alias(self, alias: str, key: str) -> None:
+        """Point alias at an existing key without refreshing its TTL"""
+        with self._lock:
+            self._aliases[alias] = key
+
+    def get_by_alias(self, alias: str) -> Optional[Any]:
+        """Return the latest value stored under alias, if still cached"""
+        with self._lock:
+            key = self._aliases.get(alias)
+        if key is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return self.get(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._aliases.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,384 @@
+"""
+AEGIS NET - Prediction store
+Every /predict result, persisted to an embedded SQLite database (WAL mode)
+so predictions outlive the in-memory cache and the analytics page can chart
+how an asteroid's predictions evolved without recomputing them.
+
+  * predictions  append-only history: one row per prediction with the
+                 inputs and headline outputs as plain columns, indexed by
+                 (asteroid_id, created_at) and created_at
+  * responses    full response bodies (zlib-compressed JSON), one per
+                 distinct request; history rows reference them by key
+
+Writes never touch the request path: record() queues the response objects
+and a writer thread encodes and commits them in batches (one transaction
+per batch). Reads use their own connections; WAL lets them run while the
+writer commits. Retention (age and row count) runs on the writer thread,
+then freed pages are returned with an incremental vacuum.
+
+Usage (from python-service/):
+  python prediction_store.py stats predictions.db
+  python prediction_store.py compact predictions.db --retention-days 30 --max-rows 1000000
+"""
+
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# History columns besides id, created_at, asteroid_id and request_key
+HISTORY_COLUMNS = {
+    "diameter": "REAL",
+    "velocity": "REAL",
+    "density": "REAL",
+    "lat": "REAL",
+    "lng": "REAL",
+    "blast_radius": "REAL",
+    "thermal_radius": "REAL",
+    "seismic_radius": "REAL",
+    "dispersion_radius": "REAL",
+    "tsunami_risk": "INTEGER",
+    "wave_height": "REAL",
+    "risk_level": "TEXT",
+    "confidence_score": "REAL",
+    "exposed_population": "INTEGER",
+    "processing_time": "REAL",
+}
+MAX_QUERY_ROWS = 100000
+_STOP = object()
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    asteroid_id TEXT,
+    request_key TEXT NOT NULL,
+    {", ".join(f"{name} {kind}" for name, kind in HISTORY_COLUMNS.items())}
+);
+CREATE INDEX IF NOT EXISTS predictions_asteroid ON predictions (asteroid_id, created_at);
+CREATE INDEX IF NOT EXISTS predictions_time ON predictions (created_at);
+CREATE INDEX IF NOT EXISTS predictions_key ON predictions (request_key);
+CREATE TABLE IF NOT EXISTS responses (
+    request_key TEXT PRIMARY KEY,
+    body BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=10)
+    # Must precede journal_mode, which initializes a new file; no-op on existing ones
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; WAL keeps it consistent
+    return conn
+
+
+def create_schema(conn: sqlite3.Connection) -> None:
+    conn.executescript(SCHEMA)
+
+
+def apply_retention(conn: sqlite3.Connection, retention_days: Optional[float] = None,
+                    max_rows: Optional[int] = None) -> int:
+    """Delete history past the age and row limits and bodies nothing references
+
+    Returns the number of history rows deleted.
+    """
+    deleted = 0
+    with conn:
+        if retention_days:
+            deleted += conn.execute("DELETE FROM predictions WHERE created_at < ?",
+                                    (time.time() - retention_days * 86400,)).rowcount
+        if max_rows:
+            deleted += conn.execute(
+                "DELETE FROM predictions WHERE id <= "
+                "(SELECT id FROM predictions ORDER BY id DESC LIMIT 1 OFFSET ?)", (max_rows,)
+            ).rowcount
+        if deleted:
+            conn.execute("DELETE FROM responses WHERE NOT EXISTS "
+                         "(SELECT 1 FROM predictions p WHERE p.request_key = responses.request_key)")
+    if deleted:
+        # executescript steps the pragma to completion (execute frees one page)
+        conn.executescript("PRAGMA incremental_vacuum;")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    return deleted
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class PredictionStore:
+    """Batched asynchronous writer and query helpers over one SQLite file
+
+    flatten(request, response) returns HISTORY_COLUMNS values and
+    encode(response) the body bytes; both run on the writer thread. The
+    same request recorded again for the same asteroid within
+    dedupe_window seconds (e.g. a cache hit) adds no row.
+    """
+
+    def __init__(self, path: str, flatten: Callable[[Any, Any], dict],
+                 encode: Callable[[Any], bytes], retention_days: Optional[float] = None,
+                 max_rows: Optional[int] = None, max_batch: int = 512, max_delay: float = 0.1,
+                 max_queue: int = 10000, maintenance_interval: float = 60.0,
+                 dedupe_window: float = 0.0):
+        self.path = path
+        self.flatten = flatten
+        self.encode = encode
+        self.retention_days = retention_days
+        self.max_rows = max_rows
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay  # seconds a batch waits to fill
+        self.maintenance_interval = maintenance_interval  # seconds between retention passes
+        self.dedupe_window = dedupe_window  # seconds
+        self._recent: "OrderedDict[tuple, float]" = OrderedDict()  # (asteroid_id, key) -> time
+        self._queue: "queue.Queue" = queue.Queue(max_queue)
+        self._readers = threading.local()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.dropped = 0  # queue full, or a batch failed to commit
+        self.batches = 0
+        self.largest_batch = 0
+        self.expired = 0
+        self.duplicates = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        """Create the schema and start the writer thread"""
+        if self._thread is not None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = connect(self.path)
+        try:
+            create_schema(conn)
+        finally:
+            conn.close()
+        self._thread = threading.Thread(target=self._write_loop, name="aegis-prediction-store",
+                                        daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush queued predictions and stop the writer"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def record(self, asteroid_id: Optional[str], request_key: str, request: Any, response: Any) -> None:
+        """Queue one prediction (never blocks; dropped when the queue is full)"""
+        now = time.time()
+        if self.dedupe_window > 0:
+            recent = (asteroid_id, request_key)
+            if now - self._recent.get(recent, -self.dedupe_window) < self.dedupe_window:
+                self.duplicates += 1
+                return
+            self._recent[recent] = now
+            self._recent.move_to_end(recent)
+            if len(self._recent) > 4096:
+                self._recent.popitem(last=False)
+        try:
+            self._queue.put_nowait((now, asteroid_id, request_key, request, response))
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self) -> None:
+        conn = connect(self.path)
+        next_maintenance = time.monotonic()
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.maintenance_interval)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                stopping = True
+            elif item is not None:
+                batch.append(item)
+                deadline = time.monotonic() + self.max_delay
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+            if stopping:
+                # Drain whatever is left before exiting
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+            if batch:
+                self._commit(conn, batch)
+            if stopping or time.monotonic() >= next_maintenance:
+                try:
+                    self.expired += apply_retention(conn, self.retention_days, self.max_rows)
+                except sqlite3.Error as e:
+                    self.last_error = f"retention: {e}"
+                next_maintenance = time.monotonic() + self.maintenance_interval
+        conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, batch: list) -> None:
+        columns = ["created_at", "asteroid_id", "request_key", *HISTORY_COLUMNS]
+        rows, bodies = [], {}
+        for created_at, asteroid_id, request_key, request, response in batch:
+            try:
+                values = self.flatten(request, response)
+                if request_key not in bodies:
+                    bodies[request_key] = zlib.compress(self.encode(response))
+            except Exception as e:
+                self.dropped += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                continue
+            rows.append((created_at, asteroid_id, request_key,
+                         *(values.get(name) for name in HISTORY_COLUMNS)))
+        try:
+            with conn:
+                conn.executemany(
+                    f"INSERT INTO predictions ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})", rows
+                )
+                conn.executemany("INSERT OR REPLACE INTO responses VALUES (?, ?)", bodies.items())
+        except sqlite3.Error as e:
+            self.dropped += len(rows)
+            self.last_error = f"{type(e).__name__}: {e}"
+            return
+        self.written += len(rows)
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(rows))
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = self._readers.conn = connect(self.path)
+        return conn
+
+    def latest(self, asteroid_id: str) -> Optional[bytes]:
+        """Body (JSON bytes) of the newest prediction recorded for asteroid_id"""
+        row = self._reader().execute(
+            "SELECT r.body FROM predictions p JOIN responses r ON r.request_key = p.request_key "
+            "WHERE p.asteroid_id = ? ORDER BY p.created_at DESC LIMIT 1", (asteroid_id,)
+        ).fetchone()
+        return zlib.decompress(row[0]) if row is not None else None
+
+    def history(self, asteroid_id: Optional[str] = None, since: Optional[float] = None,
+                until: Optional[float] = None, limit: int = 1000,
+                columns: Optional[List[str]] = None) -> Dict[str, list]:
+        """Columnar history (oldest first) of the newest limit matching predictions
+
+        since/until are Unix timestamps; columns defaults to HISTORY_COLUMNS.
+        """
+        columns = list(columns or HISTORY_COLUMNS)
+        unknown = set(columns) - set(HISTORY_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown history columns: {', '.join(sorted(unknown))}")
+        conditions, params = [], []
+        if asteroid_id is not None:
+            conditions.append("asteroid_id = ?")
+            params.append(asteroid_id)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("created_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._reader().execute(
+            f"SELECT created_at, asteroid_id, {', '.join(columns)} FROM predictions {where} "
+            f"ORDER BY created_at DESC LIMIT ?", (*params, min(limit, MAX_QUERY_ROWS))
+        ).fetchall()
+        rows.reverse()
+        result = {"count": len(rows),
+                  "created_at": [_iso(row[0]) for row in rows],
+                  "asteroid_id": [row[1] for row in rows]}
+        for n, name in enumerate(columns, start=2):
+            result[name] = [row[n] for row in rows]
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "largest_batch": self.largest_batch,
+            "expired": self.expired,
+            "duplicates": self.duplicates,
+            "last_error": self.last_error,
+            "bytes": sum(os.path.getsize(self.path + suffix) for suffix in ("", "-wal")
+                         if os.path.exists(self.path + suffix)),
+        }
+
+
+def load_prediction_store(path: Optional[str], flatten: Callable[[Any, Any], dict],
+                          encode: Callable[[Any], bytes], **options) -> Optional[PredictionStore]:
+    """PredictionStore for path, or None when persistence is disabled"""
+    if not path:
+        return None
+    return PredictionStore(path, flatten, encode, **options)
+
+
+def file_stats(path: str) -> dict:
+    conn = connect(path)
+    try:
+        rows, asteroids, oldest, newest = conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT asteroid_id), MIN(created_at), MAX(created_at) FROM predictions"
+        ).fetchone()
+        bodies = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        page_size, pages, free = (conn.execute(f"PRAGMA {name}").fetchone()[0]
+                                  for name in ("page_size", "page_count", "freelist_count"))
+    finally:
+        conn.close()
+    return {
+        "predictions": rows,
+        "asteroids": asteroids,
+        "responses": bodies,
+        "oldest": _iso(oldest) if oldest is not None else None,
+        "newest": _iso(newest) if newest is not None else None,
+        "bytes": page_size * pages,
+        "free_bytes": page_size * free,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AEGIS NET prediction store maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    stats_cmd = sub.add_parser("stats", help="Row counts, time span and file size")
+    stats_cmd.add_argument("path")
+
+    compact_cmd = sub.add_parser("compact", help="Apply retention, then VACUUM the file")
+    compact_cmd.add_argument("path")
+    compact_cmd.add_argument("--retention-days", type=float)
+    compact_cmd.add_argument("--max-rows", type=int)
+
+    args = parser.parse_args()
+    if args.command == "compact":
+        conn = connect(args.path)
+        try:
+            deleted = apply_retention(conn, args.retention_days, args.max_rows)
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+        print(f"Deleted {deleted} predictions")
+    print(json.dumps(file_stats(args.path), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+AEGIS NET - Pre-fork server
+One uvicorn worker per core sharing a single copy of the large datasets.
+
+The parent imports main, loads the read-only assets (road graph and route
+index, coastline, population pyramid, facilities, sweep table) and forks
+workers that inherit them copy-on-write. Their NumPy buffers are never
+written, so those pages stay shared between all workers; memory-mapped
+files (sweep table, route index) share the page cache as well.
+gc.freeze() before each fork keeps the collector from writing to the
+inherited objects, which would give every worker private copies of them.
+
+Hot reload (SIGHUP, or `prefork.py reload`):
+  1. the parent builds every shared asset afresh; if any loader fails the
+     current generation keeps serving and nothing changes
+  2. a new generation of workers is forked on the same listening socket
+     and waits for its warm-up (/health/ready)
+  3. the old generation stops gracefully: in-flight requests finish, new
+     connections go to the new generation
+
+The socket never stops accepting and each request is served by a worker of
+exactly one generation. Assets not in PREFORK_ASSETS (by default the risk
+model, whose native thread pools do not survive a fork) load in each
+worker's own warm-up. Workers that die are replaced. SIGTERM/SIGINT stop
+the server gracefully. Each worker has its own caches and /metrics.
+
+Usage (from python-service/):
+  python prefork.py serve --port 8000 --workers 0 --pid-file /tmp/aegis.pid
+  python prefork.py reload --pid-file /tmp/aegis.pid
+  python prefork.py memory --pid-file /tmp/aegis.pid   # shared vs private MB per process
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import select
+import signal
+import socket
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_ASSETS = ("facilities", "coastal_grid", "population_raster", "road_network", "sweep_table")
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+RESPAWN_DELAY = 1.0  # seconds between restarts of a worker that keeps dying
+
+
+def _listen(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class PreforkServer:
+    """Parent process: shared assets, worker generations and their replacement"""
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 8000, workers: int = 0,
+                 shared_assets=DEFAULT_ASSETS, backlog: int = 2048, start_timeout: float = 120.0,
+                 graceful_timeout: float = 30.0, log_level: str = "info"):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.shared_assets = list(shared_assets)
+        self.backlog = backlog
+        self.start_timeout = start_timeout  # seconds for a new generation to become ready
+        self.graceful_timeout = graceful_timeout  # seconds before retiring workers are killed
+        self.log_level = log_level
+        self.generation = 0
+        self.current: Dict[int, float] = {}  # pid -> start time, serving generation
+        self.retiring: Dict[int, float] = {}  # pid -> SIGTERM time, previous generations
+        self._signals: List[int] = []
+        self._stopping = False
+        self.service = None
+        self.sock: Optional[socket.socket] = None
+
+    def log(self, message: str) -> None:
+        print(f"[prefork {os.getpid()}] {message}", flush=True)
+
+    def load(self) -> Dict[str, float]:
+        """(Re)build the shared assets in the parent; raises without swapping on failure"""
+        gc.unfreeze()
+        seconds = self.service.assets.reload(self.shared_assets)
+        gc.collect()  # the previous generation's values, before the next fork
+        return seconds
+
+    def _worker(self, ready_fd: int) -> None:
+        """Child: serve on the shared socket until told to stop"""
+        import uvicorn
+
+        for signum in (*STOP_SIGNALS, signal.SIGHUP, signal.SIGCHLD):
+            signal.signal(signum, signal.SIG_DFL)
+        signal.set_wakeup_fd(-1)
+        os.environ["PREFORK_GENERATION"] = str(self.generation)
+        self.service.after_fork()
+        server = uvicorn.Server(uvicorn.Config(
+            self.service.app, lifespan="on", log_level=self.log_level,
+            timeout_graceful_shutdown=int(self.graceful_timeout)
+        ))
+
+        async def serve() -> None:
+            task = asyncio.ensure_future(server.serve(sockets=[self.sock]))
+            while not server.started and not task.done():
+                await asyncio.sleep(0.05)
+            try:
+                if server.started and await self.service.assets.wait(self.start_timeout):
+                    os.write(ready_fd, b"1")
+            except BrokenPipeError:
+                pass  # a replacement worker: nobody waits for it
+            os.close(ready_fd)
+            await task
+
+        try:
+            asyncio.run(serve())
+        finally:
+            os._exit(0)
+
+    def spawn(self) -> tuple:
+        """Fork one worker of the current generation; (pid, ready pipe)"""
+        read_fd, write_fd = os.pipe()
+        gc.freeze()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            try:
+                self._worker(write_fd)
+            finally:
+                os._exit(1)
+        os.close(write_fd)
+        return pid, read_fd
+
+    def start_generation(self) -> Optional[Dict[int, float]]:
+        """Fork a full generation and wait until every worker is ready
+
+        Returns {pid: start time}, or None (with the new workers stopped)
+        when any of them failed to start within start_timeout.
+        """
+        self.generation += 1
+        pending = dict(self.spawn() for _ in range(self.workers))
+        started = {pid: time.monotonic() for pid in pending}
+        ready = set()
+        deadline = time.monotonic() + self.start_timeout
+        fds = {fd: pid for pid, fd in pending.items()}
+        while fds and time.monotonic() < deadline:
+            readable, _, _ = select.select(list(fds), [], [], max(deadline - time.monotonic(), 0))
+            for fd in readable:
+                if os.read(fd, 1) == b"1":
+                    ready.add(fds[fd])
+                os.close(fd)
+                del fds[fd]
+        for fd in fds:
+            os.close(fd)
+        if len(ready) == len(pending):
+            return started
+        self.log(f"Generation {self.generation}: {len(ready)}/{len(pending)} workers ready, stopping it")
+        self.retire(list(pending))
+        self.generation -= 1
+        return None
+
+    def retire(self, pids: List[int]) -> None:
+        now = time.monotonic()
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                continue
+            self.retiring[pid] = now
+
+    def reload(self) -> bool:
+        """Swap in freshly loaded assets under a new generation of workers"""
+        self.log(f"Reloading {', '.join(self.shared_assets)}")
+        try:
+            seconds = self.load()
+        except Exception as e:
+            self.log(f"Reload failed, generation {self.generation} keeps serving: {type(e).__name__}: {e}")
+            return False
+        generation = self.start_generation()
+        if generation is None:
+            # The parent holds the new assets now; replacements of dead old workers use them
+            return False
+        previous, self.current = list(self.current), generation
+        self.retire(previous)
+        self.log(f"Generation {self.generation} serving ({self.workers} workers), assets loaded in {seconds}")
+        return True
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.retiring.pop(pid, None)
+            started = self.current.pop(pid, None)
+            if started is None or self._stopping:
+                continue
+            self.log(f"Worker {pid} exited (status {status}), replacing it")
+            if time.monotonic() - started < RESPAWN_DELAY:
+                time.sleep(RESPAWN_DELAY)
+            new_pid, ready_fd = self.spawn()
+            os.close(ready_fd)
+            self.current[new_pid] = time.monotonic()
+
+    def _kill_overdue(self) -> None:
+        now = time.monotonic()
+        for pid, since in list(self.retiring.items()):
+            if now - since > self.graceful_timeout + 5:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def serve(self, pid_file: Optional[str] = None) -> None:
+        start = time.perf_counter()
+        import main as service
+
+        self.service = service
+        unknown = set(self.shared_assets) - set(service.assets.assets)
+        if unknown:
+            raise SystemExit(f"Unknown assets: {', '.join(sorted(unknown))}; "
+                             f"choose from {', '.join(service.assets.assets)}")
+        seconds = self.load()
+        self.log(f"Shared assets loaded in {time.perf_counter() - start:.2f} s: {seconds}")
+        self.sock = _listen(self.host, self.port, self.backlog)
+        if pid_file:
+            with open(pid_file, "w") as f:
+                f.write(str(os.getpid()))
+
+        wake_read, wake_write = os.pipe()
+        os.set_blocking(wake_read, False)
+        os.set_blocking(wake_write, False)
+        signal.set_wakeup_fd(wake_write)
+        for signum in (*STOP_SIGNALS, signal.SIGHUP, signal.SIGCHLD):
+            signal.signal(signum, lambda signum, _: self._signals.append(signum))
+
+        generation = self.start_generation()
+        if generation is None:
+            raise SystemExit("Workers failed to start")
+        self.current = generation
+        self.log(f"Serving http://{self.host}:{self.port} with {self.workers} workers")
+        try:
+            while not self._stopping:
+                select.select([wake_read], [], [], 1.0)
+                try:
+                    os.read(wake_read, 1024)
+                except BlockingIOError:
+                    pass
+                while self._signals:
+                    signum = self._signals.pop(0)
+                    if signum in STOP_SIGNALS:
+                        self._stopping = True
+                    elif signum == signal.SIGHUP:
+                        self.reload()
+                self._reap()
+                self._kill_overdue()
+        finally:
+            self._stopping = True
+            self.log("Stopping workers")
+            self.retire(list(self.current) + list(self.retiring))
+            deadline = time.monotonic() + self.graceful_timeout
+            while self.retiring and time.monotonic() < deadline:
+                time.sleep(0.1)
+                self._reap()
+            for pid in self.retiring:
+                os.kill(pid, signal.SIGKILL)
+            if pid_file and os.path.exists(pid_file):
+                os.remove(pid_file)
+
+
+def memory_report(pid: int) -> dict:
+    """Resident, proportional, shared and private MB of a process and its children (Linux)"""
+    def rollup(process: int) -> dict:
+        fields = {}
+        with open(f"/proc/{process}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+        return {
+            "rss": round(fields.get("Rss", 0), 1),
+            "pss": round(fields.get("Pss", 0), 1),
+            "shared": round(fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0), 1),
+            "private": round(fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0), 1),
+        }
+
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        children = [int(child) for child in f.read().split()]
+    processes = {"parent": rollup(pid), **{str(child): rollup(child) for child in children}}
+    return {
+        "processes": processes,
+        # What the whole server really costs: proportional shares add up
+        "total_pss": round(sum(p["pss"] for p in processes.values()), 1),
+        "total_rss": round(sum(p["rss"] for p in processes.values()), 1),
+    }
+
+
+def _read_pid(pid_file: str) -> int:
+    with open(pid_file) as f:
+        return int(f.read().strip())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AEGIS NET pre-fork server")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_cmd = sub.add_parser("serve", help="Load shared assets, then fork workers")
+    serve_cmd.add_argument("--host", default="0.0.0.0")
+    serve_cmd.add_argument("--port", type=int, default=8000)
+    serve_cmd.add_argument("--workers", type=int, default=int(os.getenv("PREFORK_WORKERS", "0")),
+                           help="0 = one per CPU core")
+    serve_cmd.add_argument("--assets", default=os.getenv("PREFORK_ASSETS", ",".join(DEFAULT_ASSETS)),
+                           help="comma-separated assets loaded once in the parent")
+    serve_cmd.add_argument("--backlog", type=int, default=2048)
+    serve_cmd.add_argument("--start-timeout", type=float, default=120.0)
+    serve_cmd.add_argument("--graceful-timeout", type=float, default=30.0)
+    serve_cmd.add_argument("--log-level", default="info")
+    serve_cmd.add_argument("--pid-file")
+
+    for name, help_text in (("reload", "Reload the shared assets (SIGHUP to the parent)"),
+                            ("memory", "Shared and private memory of the parent and workers")):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument("--pid-file", required=True)
+
+    args = parser.parse_args()
+    if args.command == "reload":
+        os.kill(_read_pid(args.pid_file), signal.SIGHUP)
+        return
+    if args.command == "memory":
+        print(json.dumps(memory_report(_read_pid(args.pid_file)), indent=2))
+        return
+
+    shared = [name.strip() for name in args.assets.split(",") if name.strip()]
+    PreforkServer(args.host, args.port, args.workers, shared, args.backlog, args.start_timeout,
+                  args.graceful_timeout, args.log_level).serve(args.pid_file)
+
+
+if __name__ == "__main__":
+    main()
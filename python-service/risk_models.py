@@ -0,0 +1,230 @@
+"""
+AEGIS NET - Risk model registry
+Versioned, pre-trained scikit-learn classifiers for the risk_assessment
+stage, with an offline training/export CLI.
+
+Registry layout:
+  <root>/<model name>/<version>/model.joblib   fitted estimator
+  <root>/<model name>/<version>/meta.json      features, classes, metrics
+
+The default risk model is gradient boosting over impact features wrapped
+in isotonic calibration, so predict_proba is a calibrated confidence.
+Training data are synthetic scenarios evaluated with
+AsteroidImpactPredictor; the label is the low/medium/high band of a noisy
+severity score driven by the population exposed inside the blast radius,
+tsunami risk and velocity. Retrain when the physics or the bands change.
+
+Usage:
+  python risk_models.py train --output models --version v1 --samples 200000
+  python risk_models.py list --root models
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+RISK_MODEL_NAME = "risk"
+RISK_CLASSES = ("low", "medium", "high")
+FEATURE_NAMES = (
+    "log_diameter", "velocity", "density", "blast_radius", "thermal_radius",
+    "seismic_radius", "tsunami_risk", "wave_height", "log_population_density",
+)
+# Severity bands: log10 of people exposed in the blast zone, plus hazards
+SEVERITY_BANDS = (4.0, 5.5)
+
+
+def risk_features(diameter, velocity, density, blast_radius, thermal_radius, seismic_radius,
+                  tsunami_risk, wave_height, population_density) -> np.ndarray:
+    """Feature matrix (n, len(FEATURE_NAMES)) from scalars or arrays"""
+    columns = [
+        np.log10(np.maximum(np.asarray(diameter, dtype=np.float64), 1e-3)),
+        velocity, density, blast_radius, thermal_radius, seismic_radius,
+        np.asarray(tsunami_risk, dtype=np.float64),
+        np.nan_to_num(np.asarray(wave_height, dtype=np.float64)),
+        np.log10(np.maximum(np.asarray(population_density, dtype=np.float64), 1e-3)),
+    ]
+    return np.column_stack([np.atleast_1d(np.asarray(c, dtype=np.float64)) for c in columns])
+
+
+def synthetic_scenarios(predictor, samples: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """Random impacts evaluated through predictor, with severity-band labels"""
+    diameter = 10 ** rng.uniform(1.0, 3.3, samples)  # 10 m - 2 km
+    velocity = rng.uniform(11.0, 72.0, samples)  # km/s
+    density = rng.uniform(1000.0, 8000.0, samples)  # kg/m³
+    population_density = 10 ** rng.uniform(0.0, 4.3, samples)  # people/km²
+    # A third of impacts near the demo coastlines so tsunamis are represented
+    coastal = rng.random(samples) < 0.3
+    lat = np.where(coastal, rng.uniform(25.0, 41.0, samples), rng.uniform(-60.0, 70.0, samples))
+    lng = np.where(coastal, rng.uniform(-85.0, -73.5, samples), rng.uniform(-180.0, 180.0, samples))
+
+    radii = predictor.calculate_blast_radius_batch(diameter, velocity, density)
+    tsunami = [predictor.assess_tsunami_risk((a, b), r, d)
+               for a, b, r, d in zip(lat, lng, radii["blast_radius"], diameter)]
+    tsunami_risk = np.array([t.tsunami_risk for t in tsunami], dtype=np.float64)
+    wave_height = np.array([t.wave_height or 0.0 for t in tsunami])
+
+    exposed = population_density * np.pi * radii["blast_radius"] ** 2
+    severity = (np.log10(np.maximum(exposed, 1.0)) + 1.0 * tsunami_risk
+                + 0.01 * (velocity - 20.0) + rng.normal(0.0, 0.35, samples))
+    labels = np.digitize(severity, SEVERITY_BANDS)
+
+    features = risk_features(diameter, velocity, density, radii["blast_radius"],
+                             radii["thermal_radius"], radii["seismic_radius"],
+                             tsunami_risk, wave_height, population_density)
+    return {"features": features, "labels": labels}
+
+
+def train_risk_model(features: np.ndarray, labels: np.ndarray, seed: int = 0):
+    """Calibrated gradient boosting plus holdout metrics"""
+    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    from sklearn.metrics import accuracy_score, log_loss
+    from sklearn.model_selection import train_test_split
+
+    x_train, x_test, y_train, y_test = train_test_split(
+        features, labels, test_size=0.2, random_state=seed, stratify=labels
+    )
+    booster = HistGradientBoostingClassifier(max_iter=200, learning_rate=0.1, random_state=seed)
+    model = CalibratedClassifierCV(booster, method="isotonic", cv=3)
+    model.fit(x_train, y_train)
+
+    proba = model.predict_proba(x_test)
+    predicted = proba.argmax(axis=1)
+    confidence = proba.max(axis=1)
+    # Expected calibration error over 10 confidence bins
+    bins = np.minimum((confidence * 10).astype(int), 9)
+    ece = sum(abs(np.mean(predicted[bins == b] == y_test[bins == b]) - confidence[bins == b].mean())
+              * np.mean(bins == b) for b in range(10) if np.any(bins == b))
+    metrics = {
+        "accuracy": round(float(accuracy_score(y_test, predicted)), 4),
+        "log_loss": round(float(log_loss(y_test, proba, labels=list(range(len(RISK_CLASSES))))), 4),
+        "expected_calibration_error": round(float(ece), 4),
+        "train_rows": int(len(y_train)),
+        "test_rows": int(len(y_test)),
+    }
+    return model, metrics
+
+
+def export_model(model, metrics: dict, root: str, name: str, version: str) -> str:
+    import joblib
+    import sklearn
+
+    path = os.path.join(root, name, version)
+    os.makedirs(path, exist_ok=True)
+    joblib.dump(model, os.path.join(path, "model.joblib"))
+    meta = {
+        "name": name,
+        "version": version,
+        "features": list(FEATURE_NAMES),
+        "classes": list(RISK_CLASSES),
+        "metrics": metrics,
+        "sklearn_version": sklearn.__version__,
+        "created": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return path
+
+
+class RiskModel:
+    """A loaded model version"""
+
+    def __init__(self, path: str):
+        import joblib
+
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if tuple(self.meta["features"]) != FEATURE_NAMES:
+            raise ValueError(f"model {path} was trained on different features")
+        self.version = self.meta["version"]
+        self.classes = tuple(self.meta["classes"])
+        self.estimator = joblib.load(os.path.join(path, "model.joblib"))
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        return self.estimator.predict_proba(features)
+
+    def prewarm(self) -> float:
+        """One throwaway prediction so first requests skip lazy initialisation"""
+        start = time.perf_counter()
+        self.predict_proba(np.zeros((1, len(FEATURE_NAMES))))
+        return time.perf_counter() - start
+
+
+class ModelRegistry:
+    """Versioned models under a root directory"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def versions(self, name: str) -> List[dict]:
+        """Metadata of every version of name, oldest first"""
+        base = os.path.join(self.root, name)
+        found = []
+        if os.path.isdir(base):
+            for version in os.listdir(base):
+                meta_path = os.path.join(base, version, "meta.json")
+                if os.path.exists(meta_path):
+                    with open(meta_path) as f:
+                        found.append(json.load(f))
+        return sorted(found, key=lambda meta: meta["created"])
+
+    def load(self, name: str, version: Optional[str] = None) -> Optional[RiskModel]:
+        """The given version, or the newest one; None if there is none"""
+        versions = self.versions(name)
+        if version:
+            versions = [meta for meta in versions if meta["version"] == version]
+        if not versions:
+            return None
+        return RiskModel(os.path.join(self.root, name, versions[-1]["version"]))
+
+
+def load_risk_model(root: Optional[str], version: Optional[str] = None,
+                    prewarm: bool = True) -> Optional[RiskModel]:
+    """Open the configured risk model, or None to keep the rule-based assessment"""
+    if not root or not os.path.isdir(root):
+        return None
+    try:
+        model = ModelRegistry(root).load(RISK_MODEL_NAME, version)
+    except (ImportError, ValueError) as e:
+        print(f"Ignoring risk model in {root}: {e}")
+        return None
+    if model is not None and prewarm:
+        model.prewarm()
+    return model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AEGIS NET risk model tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train_cmd = sub.add_parser("train", help="Train and export a risk model on synthetic scenarios")
+    train_cmd.add_argument("--output", required=True, help="registry root")
+    train_cmd.add_argument("--version", required=True)
+    train_cmd.add_argument("--samples", type=int, default=200000)
+    train_cmd.add_argument("--seed", type=int, default=0)
+
+    list_cmd = sub.add_parser("list", help="List registered versions")
+    list_cmd.add_argument("--root", required=True)
+
+    args = parser.parse_args()
+    if args.command == "list":
+        for meta in ModelRegistry(args.root).versions(RISK_MODEL_NAME):
+            print(f"{meta['version']}  {meta['created']}  {json.dumps(meta['metrics'])}")
+        return
+
+    from main import AsteroidImpactPredictor
+
+    start = time.perf_counter()
+    data = synthetic_scenarios(AsteroidImpactPredictor(), args.samples, np.random.default_rng(args.seed))
+    model, metrics = train_risk_model(data["features"], data["labels"], args.seed)
+    path = export_model(model, metrics, args.output, RISK_MODEL_NAME, args.version)
+    print(f"Wrote {path} in {time.perf_counter() - start:.1f}s: {json.dumps(metrics)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+AEGIS NET - Road network
+Compact array-backed (CSR) road graph, loaded once at startup and shared
+by every request. Shortest paths run in scipy's compiled Dijkstra.
+
+Input formats:
+  * <dir>/nodes.csv (id, lat, lng) + <dir>/edges.csv
+    (source, target, length_km, speed_limit, capacity[, oneway]),
+    e.g. exported from OpenStreetMap
+  * a compiled .npz produced by `python road_network.py compile`
+"""
+
+import argparse
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0
+REFERENCE_CAPACITY = 500.0  # vehicles/hour; smaller roads cost proportionally more
+MIN_EDGE_COST = 1e-6  # csgraph ignores zero-weight edges
+
+
+def edge_travel_cost(length_km: np.ndarray, speed_limit: np.ndarray,
+                     capacity: np.ndarray) -> np.ndarray:
+    """Edge weight in minutes: free-flow time inflated on low-capacity roads"""
+    free_flow = length_km / np.maximum(speed_limit, 1.0) * 60
+    cost = free_flow * (1 + REFERENCE_CAPACITY / np.maximum(capacity, 1.0))
+    return np.maximum(cost, MIN_EDGE_COST)
+
+
+def unit_vectors(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Lat/lng in degrees to 3D unit vectors (chord distance is monotonic in arc)"""
+    lat_r = np.radians(lat)
+    lng_r = np.radians(lng)
+    cos_lat = np.cos(lat_r)
+    return np.column_stack((cos_lat * np.cos(lng_r), cos_lat * np.sin(lng_r), np.sin(lat_r)))
+
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+class RoadGraph:
+    """Directed road graph in CSR form with per-edge length, speed and capacity"""
+
+    def __init__(self, node_lat: np.ndarray, node_lng: np.ndarray,
+                 indptr: np.ndarray, indices: np.ndarray,
+                 length_km: np.ndarray, speed_limit: np.ndarray, capacity: np.ndarray):
+        self.node_lat = np.asarray(node_lat, dtype=np.float64)
+        self.node_lng = np.asarray(node_lng, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int32)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.length_km = np.asarray(length_km, dtype=np.float32)
+        self.speed_limit = np.asarray(speed_limit, dtype=np.float32)
+        self.capacity = np.asarray(capacity, dtype=np.float32)
+
+        # Free-flow minutes per edge and the routing weight derived from it
+        self.travel_minutes = (self.length_km / np.maximum(self.speed_limit, 1.0) * 60).astype(np.float32)
+        self.weights = edge_travel_cost(
+            self.length_km.astype(np.float64), self.speed_limit, self.capacity
+        )
+        n = self.num_nodes
+        self.matrix = csr_matrix((self.weights, self.indices, self.indptr), shape=(n, n))
+        self._tree = cKDTree(unit_vectors(self.node_lat, self.node_lng))
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_lat)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    @classmethod
+    def from_edges(cls, node_lat: np.ndarray, node_lng: np.ndarray,
+                   source: np.ndarray, target: np.ndarray, length_km: np.ndarray,
+                   speed_limit: np.ndarray, capacity: np.ndarray,
+                   oneway: Optional[np.ndarray] = None) -> "RoadGraph":
+        """Build CSR arrays from an edge list, mirroring two-way edges"""
+        source = np.asarray(source, dtype=np.int64)
+        target = np.asarray(target, dtype=np.int64)
+        length_km = np.asarray(length_km, dtype=np.float64)
+        speed_limit = np.asarray(speed_limit, dtype=np.float64)
+        capacity = np.asarray(capacity, dtype=np.float64)
+
+        if oneway is None:
+            oneway = np.zeros(len(source), dtype=bool)
+        two_way = ~np.asarray(oneway, dtype=bool)
+        src = np.concatenate((source, target[two_way]))
+        dst = np.concatenate((target, source[two_way]))
+        length_km = np.concatenate((length_km, length_km[two_way]))
+        speed_limit = np.concatenate((speed_limit, speed_limit[two_way]))
+        capacity = np.concatenate((capacity, capacity[two_way]))
+
+        # Drop self loops, keep only the cheapest of parallel edges
+        keep = src != dst
+        src, dst = src[keep], dst[keep]
+        length_km, speed_limit, capacity = length_km[keep], speed_limit[keep], capacity[keep]
+        cost = edge_travel_cost(length_km, speed_limit, capacity)
+        order = np.lexsort((cost, dst, src))
+        src, dst = src[order], dst[order]
+        first = np.ones(len(src), dtype=bool)
+        first[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+        order = order[first]
+        src, dst = src[first], dst[first]
+
+        n = len(node_lat)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        return cls(node_lat, node_lng, indptr, dst,
+                   length_km[order], speed_limit[order], capacity[order])
+
+    @classmethod
+    def from_csv(cls, nodes_path: str, edges_path: str) -> "RoadGraph":
+        """Load an OSM-style node/edge CSV export"""
+        import pandas as pd
+
+        nodes = pd.read_csv(nodes_path)
+        edges = pd.read_csv(edges_path)
+
+        # Remap arbitrary (e.g. OSM) node ids to dense 0..n-1
+        node_ids = nodes["id"].to_numpy()
+        order = np.argsort(node_ids)
+        sorted_ids = node_ids[order]
+
+        def dense(ids: np.ndarray) -> np.ndarray:
+            pos = np.searchsorted(sorted_ids, ids)
+            pos = np.clip(pos, 0, len(sorted_ids) - 1)
+            if not np.array_equal(sorted_ids[pos], ids):
+                raise ValueError("edges reference node ids missing from nodes file")
+            return order[pos]
+
+        oneway = edges["oneway"].to_numpy(dtype=bool) if "oneway" in edges else None
+        return cls.from_edges(
+            nodes["lat"].to_numpy(), nodes["lng"].to_numpy(),
+            dense(edges["source"].to_numpy()), dense(edges["target"].to_numpy()),
+            edges["length_km"].to_numpy(), edges["speed_limit"].to_numpy(),
+            edges["capacity"].to_numpy(), oneway
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "RoadGraph":
+        """Load a compiled .npz graph or a directory holding nodes.csv/edges.csv"""
+        if os.path.isdir(path):
+            return cls.from_csv(os.path.join(path, "nodes.csv"), os.path.join(path, "edges.csv"))
+        with np.load(path) as data:
+            return cls(data["node_lat"], data["node_lng"], data["indptr"], data["indices"],
+                       data["length_km"], data["speed_limit"], data["capacity"])
+
+    def save(self, path: str) -> None:
+        np.savez(path, node_lat=self.node_lat, node_lng=self.node_lng,
+                 indptr=self.indptr, indices=self.indices, length_km=self.length_km,
+                 speed_limit=self.speed_limit, capacity=self.capacity)
+
+    @classmethod
+    def synthetic_grid(cls, center: Tuple[float, float], rows: int, cols: int,
+                       spacing_km: float = 0.2, seed: int = 0) -> "RoadGraph":
+        """Street grid with an arterial every 10th line (demos and benchmarks)"""
+        rng = np.random.default_rng(seed)
+        lat0, lng0 = center
+        dlat = spacing_km / 111.32
+        dlng = spacing_km / (111.32 * np.cos(np.radians(lat0)))
+        r, c = np.meshgrid(np.arange(rows), np.arange(cols), indexing="ij")
+        node_lat = (lat0 + (r - rows / 2) * dlat).ravel()
+        node_lng = (lng0 + (c - cols / 2) * dlng).ravel()
+        ids = np.arange(rows * cols).reshape(rows, cols)
+
+        horizontal = (ids[:, :-1].ravel(), ids[:, 1:].ravel(), np.repeat(np.arange(rows), cols - 1))
+        vertical = (ids[:-1, :].ravel(), ids[1:, :].ravel(), np.tile(np.arange(cols), rows - 1))
+        source = np.concatenate((horizontal[0], vertical[0]))
+        target = np.concatenate((horizontal[1], vertical[1]))
+        arterial = np.concatenate((horizontal[2], vertical[2])) % 10 == 0
+
+        length_km = spacing_km * rng.uniform(0.95, 1.3, len(source))
+        speed_limit = np.where(arterial, 80.0, 40.0)
+        capacity = np.where(arterial, 2000.0, 400.0)
+        return cls.from_edges(node_lat, node_lng, source, target, length_km, speed_limit, capacity)
+
+    def nearest_nodes(self, points: List[Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Snap (lat, lng) points to their nearest graph node; returns (nodes, km)"""
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        chord, nodes = self._tree.query(unit_vectors(pts[:, 0], pts[:, 1]))
+        return nodes.astype(np.int64), chord_to_km(chord)
+
+    def shortest_path_tree(self, source: int, limit: float = np.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """Single-source Dijkstra over routing weights; returns (cost, predecessors)"""
+        cost, predecessors = dijkstra(self.matrix, directed=True, indices=source,
+                                      return_predecessors=True, limit=limit)
+        return cost, predecessors
+
+    def path_nodes(self, predecessors: np.ndarray, source: int, target: int) -> Optional[List[int]]:
+        """Walk the predecessor array back from target; None if unreachable"""
+        if source == target:
+            return [source]
+        if predecessors[target] < 0:
+            return None
+        path = [target]
+        node = target
+        while node != source:
+            node = int(predecessors[node])
+            path.append(node)
+        path.reverse()
+        return path
+
+    def path_edges(self, path: List[int]) -> np.ndarray:
+        """CSR edge positions used by consecutive nodes of path"""
+        edges = np.empty(len(path) - 1, dtype=np.int64)
+        for k in range(len(path) - 1):
+            start, end = self.indptr[path[k]], self.indptr[path[k] + 1]
+            row = self.indices[start:end]
+            hits = np.flatnonzero(row == path[k + 1])
+            edges[k] = start + hits[0]
+        return edges
+
+
+def load_road_graph(path: Optional[str]) -> Optional[RoadGraph]:
+    """Load the configured road graph, or None when no dataset is available"""
+    if not path or not os.path.exists(path):
+        return None
+    return RoadGraph.load(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AEGIS NET road network tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    compile_cmd = sub.add_parser("compile", help="Compile nodes.csv/edges.csv into .npz")
+    compile_cmd.add_argument("source_dir")
+    compile_cmd.add_argument("output")
+
+    synth_cmd = sub.add_parser("synthetic", help="Write a synthetic street grid .npz")
+    synth_cmd.add_argument("output")
+    synth_cmd.add_argument("--center", type=float, nargs=2, default=(40.7128, -74.0060))
+    synth_cmd.add_argument("--rows", type=int, default=500)
+    synth_cmd.add_argument("--cols", type=int, default=500)
+    synth_cmd.add_argument("--spacing-km", type=float, default=0.2)
+
+    args = parser.parse_args()
+    if args.command == "compile":
+        graph = RoadGraph.load(args.source_dir)
+    else:
+        graph = RoadGraph.synthetic_grid(tuple(args.center), args.rows, args.cols, args.spacing_km)
+    graph.save(args.output)
+    print(f"Wrote {args.output}: {graph.num_nodes} nodes, {graph.num_edges} edges")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+AEGIS NET - Landmark (ALT) route index
+Offline preprocessing over a RoadGraph so repeated evacuation queries from
+many user locations skip the full Dijkstra.
+
+For every landmark L the index stores, per node v:
+  * dist_to[v, L]   shortest cost v -> L
+  * dist_from[v, L] shortest cost L -> v
+  * next_hop[v, L]  first node after v on the shortest path v -> L
+Anchors are always landmarks, so a route to one is a walk along next_hop
+(O(path length), typically well under a millisecond). Anchors are the
+--safe-zone points plus, with --facilities, the registered facilities of
+--facility-type (the FACILITIES_PATH layout, see facilities.py), since
+those are the evacuation destinations. Each anchor adds three columns per
+node, so the facility types are limited to the ones routed to. Other
+targets fall back to A* with the ALT lower bound; in pure Python that is
+slower than scipy's compiled Dijkstra for one-off targets, which is why
+evacuation routing only consults the index for landmark targets, one
+target at a time (see HazardRouter.exit_paths). Destinations that are not
+anchors, e.g. facilities added after the build, get the hazard-weighted
+tree instead.
+Arrays are .npy files opened with mmap_mode="r", so every worker shares
+them through the page cache.
+
+Usage:
+  python route_index.py build --graph roads.npz --output route_index \\
+      --safe-zone 40.7589 -73.9851 --safe-zone 40.7829 -73.9654 --landmarks 8
+  python route_index.py build --graph roads.npz --output route_index \
+      --facilities facilities.csv --facility-type safe_zone --facility-type shelter
+  python route_index.py benchmark --graph roads.npz --index route_index
+"""
+
+import argparse
+import heapq
+import json
+import os
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+from road_network import RoadGraph
+
+INDEX_VERSION = 1
+NO_HOP = -1
+
+
+def graph_fingerprint(graph: RoadGraph) -> dict:
+    """Identify the graph an index was built for"""
+    return {
+        "num_nodes": graph.num_nodes,
+        "num_edges": graph.num_edges,
+        "weights_crc32": zlib.crc32(np.ascontiguousarray(graph.weights).tobytes()),
+    }
+
+
+def build_index(graph: RoadGraph, output_dir: str,
+                safe_zones: List[Tuple[float, float]], extra_landmarks: int = 8) -> dict:
+    """Build landmark distance/next-hop tables and write them to output_dir"""
+    anchors = []
+    if safe_zones:
+        nodes, _ = graph.nearest_nodes(safe_zones)
+        anchors = list(dict.fromkeys(int(n) for n in nodes))
+
+    reverse = graph.matrix.T.tocsr()
+    n = graph.num_nodes
+    k = len(anchors) + extra_landmarks
+    dist_to = np.full((n, k), np.inf, dtype=np.float32)
+    dist_from = np.full((n, k), np.inf, dtype=np.float32)
+    next_hop = np.full((n, k), NO_HOP, dtype=np.int32)
+
+    landmarks: List[int] = []
+    nearest_landmark = np.full(n, np.inf)
+    candidate = anchors[0] if anchors else 0
+    for col in range(k):
+        landmark = anchors[col] if col < len(anchors) else candidate
+        landmarks.append(landmark)
+
+        # Reverse-graph tree: predecessor of v is its next hop toward the landmark
+        cost_to, pred = dijkstra(reverse, directed=True, indices=landmark, return_predecessors=True)
+        cost_from = dijkstra(graph.matrix, directed=True, indices=landmark)
+        dist_to[:, col] = cost_to
+        dist_from[:, col] = cost_from
+        next_hop[:, col] = np.where(pred >= 0, pred, NO_HOP)
+
+        # Farthest-point selection for the generic landmarks
+        nearest_landmark = np.minimum(nearest_landmark, cost_from)
+        reachable = np.where(np.isfinite(nearest_landmark), nearest_landmark, -1.0)
+        candidate = int(np.argmax(reachable))
+
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, "dist_to.npy"), dist_to)
+    np.save(os.path.join(output_dir, "dist_from.npy"), dist_from)
+    np.save(os.path.join(output_dir, "next_hop.npy"), next_hop)
+    meta = {
+        "version": INDEX_VERSION,
+        "graph": graph_fingerprint(graph),
+        "landmarks": landmarks,
+        "safe_zone_landmarks": len(anchors),
+    }
+    with open(os.path.join(output_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def facility_anchors(path: str, types: List[str]) -> List[Tuple[float, float]]:
+    """Locations of the registered facilities of the given types"""
+    from facilities import FacilityRegistry
+
+    registry = FacilityRegistry.load(path)
+    keep = np.isin(registry.types, types)
+    return list(zip(registry.lat[keep].tolist(), registry.lng[keep].tolist()))
+
+
+class RouteIndex:
+    """Memory-mapped ALT index bound to the RoadGraph it was built from"""
+
+    def __init__(self, path: str, graph: RoadGraph):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"unsupported route index version {meta.get('version')}")
+        if meta["graph"] != graph_fingerprint(graph):
+            raise ValueError("route index was built for a different road graph")
+
+        self.graph = graph
+        self.landmarks = meta["landmarks"]
+        self._column = {node: col for col, node in enumerate(self.landmarks)}
+        self.dist_to = np.load(os.path.join(path, "dist_to.npy"), mmap_mode="r")
+        self.dist_from = np.load(os.path.join(path, "dist_from.npy"), mmap_mode="r")
+        self.next_hop = np.load(os.path.join(path, "next_hop.npy"), mmap_mode="r")
+
+    def is_landmark(self, node: int) -> bool:
+        return node in self._column
+
+    def costs_to(self, nodes: np.ndarray, target: int) -> np.ndarray:
+        """Shortest cost from each node to a landmark target"""
+        return np.asarray(self.dist_to[nodes, self._column[target]], dtype=np.float64)
+
+    def path(self, source: int, target: int) -> Optional[List[int]]:
+        """Shortest node path source -> target, or None if unreachable"""
+        col = self._column.get(target)
+        if col is not None:
+            return self._tree_path(source, target, col)
+        return self._alt_path(source, target)
+
+    def _tree_path(self, source: int, target: int, col: int) -> Optional[List[int]]:
+        path = [source]
+        node = source
+        limit = self.graph.num_nodes
+        while node != target:
+            node = int(self.next_hop[node, col])
+            if node == NO_HOP or len(path) > limit:
+                return None
+            path.append(node)
+        return path
+
+    def lower_bounds(self, nodes: np.ndarray, target: int) -> np.ndarray:
+        """ALT bounds on cost node -> target from the triangle inequality"""
+        to_v, to_t = self.dist_to[nodes], self.dist_to[target]
+        from_v, from_t = self.dist_from[nodes], self.dist_from[target]
+        with np.errstate(invalid="ignore"):
+            bound = np.maximum(to_v - to_t, from_t - from_v)
+        bound = np.where(np.isfinite(bound), bound, 0.0).max(axis=1)
+        # float32 storage: shave a hair off so the bound stays admissible
+        return np.maximum(bound, 0.0) * (1 - 1e-6)
+
+    def _alt_path(self, source: int, target: int) -> Optional[List[int]]:
+        graph = self.graph
+        indptr, indices, weights = graph.indptr, graph.indices, graph.weights
+        best = {source: 0.0}
+        parent = {source: -1}
+        closed = set()
+        heap = [(float(self.lower_bounds(np.array([source]), target)[0]), source)]
+        while heap:
+            _, node = heapq.heappop(heap)
+            if node in closed:
+                continue
+            if node == target:
+                path = [node]
+                while parent[node] != -1:
+                    node = parent[node]
+                    path.append(node)
+                path.reverse()
+                return path
+            closed.add(node)
+            cost = best[node]
+            start, end = indptr[node], indptr[node + 1]
+            improved = []
+            for nbr, w in zip(indices[start:end].tolist(), weights[start:end].tolist()):
+                new_cost = cost + w
+                if new_cost < best.get(nbr, np.inf):
+                    best[nbr] = new_cost
+                    parent[nbr] = node
+                    improved.append(nbr)
+            if improved:
+                bounds = self.lower_bounds(np.array(improved), target).tolist()
+                for nbr, bound in zip(improved, bounds):
+                    heapq.heappush(heap, (best[nbr] + bound, nbr))
+        return None
+
+
+def load_route_index(path: Optional[str], graph: Optional[RoadGraph]) -> Optional[RouteIndex]:
+    """Open the configured index, or None when absent or built for another graph"""
+    if not path or graph is None or not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    try:
+        return RouteIndex(path, graph)
+    except ValueError as e:
+        print(f"Ignoring route index at {path}: {e}")
+        return None
+
+
+def _path_cost(graph: RoadGraph, path: List[int]) -> float:
+    return float(graph.weights[graph.path_edges(path)].sum()) if len(path) > 1 else 0.0
+
+
+def run_benchmark(graph: RoadGraph, index: RouteIndex, queries: int, seed: int = 0) -> dict:
+    """Time index queries against plain Dijkstra on the same (source, target) pairs"""
+    rng = np.random.default_rng(seed)
+    sources = rng.integers(0, graph.num_nodes, queries)
+    landmark_targets = rng.choice(index.landmarks, queries)
+    random_targets = rng.integers(0, graph.num_nodes, max(1, queries // 10))
+
+    def timed(fn, pairs):
+        times, costs = [], []
+        for s, t in pairs:
+            start = time.perf_counter()
+            path = fn(int(s), int(t))
+            times.append(time.perf_counter() - start)
+            costs.append(_path_cost(graph, path) if path else np.inf)
+        return np.array(times), np.array(costs)
+
+    def plain_dijkstra(s, t):
+        _, pred = graph.shortest_path_tree(s)
+        return graph.path_nodes(pred, s, t)
+
+    report = {"graph": {"nodes": graph.num_nodes, "edges": graph.num_edges}}
+    for name, pairs in (("safe_zone_targets", list(zip(sources, landmark_targets))),
+                        ("arbitrary_targets", list(zip(sources, random_targets)))):
+        t_index, c_index = timed(index.path, pairs)
+        t_plain, c_plain = timed(plain_dijkstra, pairs)
+        both = np.isfinite(c_plain)
+        report[name] = {
+            "queries": len(pairs),
+            "index_ms_p50": round(float(np.median(t_index)) * 1000, 3),
+            "index_ms_p99": round(float(np.percentile(t_index, 99)) * 1000, 3),
+            "dijkstra_ms_p50": round(float(np.median(t_plain)) * 1000, 3),
+            "dijkstra_ms_p99": round(float(np.percentile(t_plain, 99)) * 1000, 3),
+            "max_cost_error": float(np.max(np.abs(c_index[both] - c_plain[both]), initial=0.0)),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AEGIS NET landmark route index")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = sub.add_parser("build", help="Precompute the index for a road graph")
+    build_cmd.add_argument("--graph", required=True)
+    build_cmd.add_argument("--output", required=True)
+    build_cmd.add_argument("--safe-zone", type=float, nargs=2, action="append", default=[],
+                           metavar=("LAT", "LNG"))
+    build_cmd.add_argument("--facilities", help="facility CSV/GeoJSON whose facilities become landmarks")
+    build_cmd.add_argument("--facility-type", action="append", default=None,
+                           help="facility types to index (default: safe_zone, evacuation_center)")
+    build_cmd.add_argument("--landmarks", type=int, default=8,
+                           help="generic landmarks in addition to the safe zones and facilities")
+
+    bench_cmd = sub.add_parser("benchmark", help="Compare index queries with plain Dijkstra")
+    bench_cmd.add_argument("--graph", required=True)
+    bench_cmd.add_argument("--index", required=True)
+    bench_cmd.add_argument("--queries", type=int, default=200)
+
+    args = parser.parse_args()
+    graph = RoadGraph.load(args.graph)
+    if args.command == "build":
+        start = time.perf_counter()
+        anchors = [tuple(z) for z in args.safe_zone]
+        if args.facilities:
+            anchors += facility_anchors(args.facilities, args.facility_type or ["safe_zone", "evacuation_center"])
+        meta = build_index(graph, args.output, anchors, args.landmarks)
+        print(f"Built {len(meta['landmarks'])} landmarks for {graph.num_nodes} nodes "
+              f"in {time.perf_counter() - start:.1f}s -> {args.output}")
+    else:
+        print(json.dumps(run_benchmark(graph, RouteIndex(args.index, graph), args.queries), indent=2))
+
+
+if __name__ == "__main__":
+    main()
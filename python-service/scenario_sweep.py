@@ -0,0 +1,259 @@
+"""
+AEGIS NET - Scenario sweep tables
+Location-independent impact outputs precomputed over a dense (diameter,
+velocity, density) grid, so what-if sliders are answered by a table
+lookup instead of a /predict per move, and clients can download the whole
+table and interpolate locally.
+
+Axes are log-spaced and values are stored as natural logs. Every output
+is a power law of the inputs (radii ~ d·ρ^⅓·v^⅔), so trilinear
+interpolation in log space reproduces the model to the precision of the
+stored dtype (the 50 m wave-height cap is applied after interpolation).
+Lookups recompute radii that lie within that precision of a rounding
+boundary, so a float32 table (half the size) answers the same values but
+sends roughly a quarter of lookups to the formula.
+
+Table directory layout (opened with mmap_mode="r", shared by workers):
+  * values.npy  float64 or float32 (diameter, velocity, density, field),
+                natural logs
+  * meta.json   version, axes (min, max, count; log-spaced), field names
+
+Usage:
+  python scenario_sweep.py build sweep_table --diameter 1 10000 129
+  python scenario_sweep.py build sweep_f32 --dtype float32   # half the size, slower lookups
+  python scenario_sweep.py verify sweep_table --samples 100000
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from physics_kernels import blast_radius_kernel, impact_energy_kernel
+
+TABLE_VERSION = 1
+AXES = ("diameter", "velocity", "density")  # m, km/s, kg/m³
+FIELDS = ("blast_radius", "thermal_radius", "seismic_radius", "airburst_height",
+          "energy_megatons", "wave_height")
+# (min, max, count) per axis
+DEFAULT_AXES = {
+    "diameter": (1.0, 10000.0, 129),
+    "velocity": (11.0, 72.0, 33),
+    "density": (500.0, 8000.0, 33),
+}
+MAX_WAVE_HEIGHT = 50.0  # m
+# (diameter, velocity, density) index offsets of a cell's eight corners
+CORNERS = np.array([[(corner >> axis) & 1 for axis in range(3)] for corner in range(8)])
+
+
+def evaluate(diameter: np.ndarray, velocity: np.ndarray, density: np.ndarray) -> np.ndarray:
+    """Unrounded FIELDS for broadcastable inputs, stacked on the last axis
+
+    wave_height is the uncapped open-water estimate (d / 10) so that every
+    field stays a power law; lookups apply MAX_WAVE_HEIGHT.
+    """
+    shape = np.broadcast_shapes(np.shape(diameter), np.shape(velocity), np.shape(density))
+    radii = blast_radius_kernel(diameter, velocity, density)
+    columns = [radii[name] for name in FIELDS[:4]] + [
+        impact_energy_kernel(diameter, velocity, density),
+        np.asarray(diameter, dtype=np.float64) / 10,  # open-water wave height, m
+    ]
+    return np.stack([np.broadcast_to(column, shape) for column in columns], axis=-1)
+
+
+def model_fields(diameter, velocity, density) -> Dict[str, np.ndarray]:
+    """FIELDS straight from the model, as lookup() returns them"""
+    values = evaluate(diameter, velocity, density)
+    fields = {name: values[..., n] for n, name in enumerate(FIELDS)}
+    fields["wave_height"] = np.minimum(fields["wave_height"], MAX_WAVE_HEIGHT)
+    return fields
+
+
+class SweepTable:
+    """Log-space lookup table over AXES with trilinear interpolation"""
+
+    def __init__(self, values: np.ndarray, axes: Dict[str, Tuple[float, float, int]],
+                 path: Optional[str] = None):
+        self.values = values  # log values, (diameter, velocity, density, field)
+        self.axes = {name: (float(lo), float(hi), int(count)) for name, (lo, hi, count) in axes.items()}
+        self.path = path
+        self._npy: Optional[bytes] = None
+        self._log_min = np.log([self.axes[name][0] for name in AXES])
+        self._log_max = np.log([self.axes[name][1] for name in AXES])
+        self._steps = np.array([self.axes[name][2] - 1 for name in AXES])
+        # Flat row of every cell corner: origin row + offset
+        self._flat = values.reshape(-1, values.shape[-1])
+        strides = np.array([values.shape[1] * values.shape[2], values.shape[2], 1])
+        self._corner_rows = CORNERS @ strides
+        self._strides = strides
+
+    @property
+    def meta(self) -> dict:
+        return {
+            "version": TABLE_VERSION,
+            "axes": {name: {"min": lo, "max": hi, "count": count, "scale": "log"}
+                     for name, (lo, hi, count) in self.axes.items()},
+            "fields": list(FIELDS),
+            "dtype": str(self.values.dtype),
+            "values": "natural log, (diameter, velocity, density, field)",
+        }
+
+    def lookup(self, diameter, velocity, density) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """Interpolated FIELDS for arrays of points, and which points lie inside the table
+
+        Points outside are clamped to the table edge; callers should compute
+        those with the model instead.
+        """
+        points = np.stack(np.broadcast_arrays(
+            np.asarray(diameter, dtype=np.float64), np.asarray(velocity, dtype=np.float64),
+            np.asarray(density, dtype=np.float64)
+        ), axis=-1).reshape(-1, 3)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            position = (np.log(points) - self._log_min) / (self._log_max - self._log_min) * self._steps
+        inside = np.all((position >= 0) & (position <= self._steps), axis=1)
+        position = np.clip(np.nan_to_num(position), 0, self._steps)
+        base = np.minimum(position.astype(np.int64), self._steps - 1)
+        frac = position - base
+
+        origin = base @ self._strides
+        weights = np.where(CORNERS[:, None, :], frac, 1 - frac).prod(axis=2)  # (corner, point)
+        result = np.zeros((len(points), self._flat.shape[1]))
+        for corner, offset in enumerate(self._corner_rows):
+            result += weights[corner][:, None] * self._flat[origin + offset]
+        result = np.exp(result)
+        fields = {name: result[:, n] for n, name in enumerate(FIELDS)}
+        fields["wave_height"] = np.minimum(fields["wave_height"], MAX_WAVE_HEIGHT)
+        return fields, inside
+
+    def rounding_tolerance(self, values) -> np.ndarray:
+        """Relative error bound of interpolated values, for rounding checks
+
+        Stored logs carry the dtype's rounding error (absolute, so relative
+        in the exponentiated value, and proportional to |log value|).
+        """
+        eps = float(np.finfo(self.values.dtype).eps)
+        return np.maximum(1e-9, eps * (1 + np.abs(np.log(values))))
+
+    def point(self, diameter: float, velocity: float, density: float) -> Optional[Dict[str, float]]:
+        """lookup() for one point (a slider move), or None outside the table"""
+        bases, fracs = [], []
+        for name, value in zip(AXES, (diameter, velocity, density)):
+            lo, hi, count = self.axes[name]
+            if not lo <= value <= hi:
+                return None
+            position = (math.log(value) - math.log(lo)) / (math.log(hi) - math.log(lo)) * (count - 1)
+            bases.append(min(int(position), count - 2))
+            fracs.append(position - bases[-1])
+        i, j, k = bases
+        cell = np.asarray(self.values[i:i + 2, j:j + 2, k:k + 2], dtype=np.float64)  # (2, 2, 2, field)
+        for frac in fracs:
+            cell = cell[0] * (1 - frac) + cell[1] * frac
+        fields = dict(zip(FIELDS, np.exp(cell).tolist()))
+        fields["wave_height"] = min(fields["wave_height"], MAX_WAVE_HEIGHT)
+        return fields
+
+    def to_npy(self) -> bytes:
+        """values as an .npy file (built once)"""
+        if self._npy is None:
+            buffer = io.BytesIO()
+            np.save(buffer, np.ascontiguousarray(self.values))
+            self._npy = buffer.getvalue()
+        return self._npy
+
+
+def build_sweep(axes: Optional[Dict[str, Tuple[float, float, int]]] = None,
+                dtype=np.float64) -> SweepTable:
+    """Evaluate the model on every grid point (in memory)"""
+    axes = {**DEFAULT_AXES, **(axes or {})}
+    grids = [np.geomspace(*axes[name]) for name in AXES]
+    values = evaluate(grids[0][:, None, None], grids[1][None, :, None], grids[2][None, None, :])
+    return SweepTable(np.log(values).astype(dtype), axes)
+
+
+def save_sweep(table: SweepTable, output_dir: str) -> dict:
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, "values.npy"), table.values)
+    meta = table.meta
+    with open(os.path.join(output_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def open_sweep(path: str) -> SweepTable:
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("version") != TABLE_VERSION or meta.get("fields") != list(FIELDS):
+        raise ValueError(f"unsupported sweep table version {meta.get('version')}")
+    axes = {name: (axis["min"], axis["max"], axis["count"]) for name, axis in meta["axes"].items()}
+    values = np.load(os.path.join(path, "values.npy"), mmap_mode="r")
+    if values.shape != tuple(axes[name][2] for name in AXES) + (len(FIELDS),):
+        raise ValueError(f"values.npy shape {values.shape} does not match meta.json")
+    return SweepTable(values, axes, path)
+
+
+def load_sweep_table(path: Optional[str]) -> Optional[SweepTable]:
+    """Open the configured table, or None when no table is available"""
+    if not path or not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    try:
+        return open_sweep(path)
+    except ValueError as e:
+        print(f"Ignoring sweep table at {path}: {e}")
+        return None
+
+
+def verify(table: SweepTable, samples: int, seed: int = 0) -> dict:
+    """Largest relative error per field against the model at random in-range points"""
+    rng = np.random.default_rng(seed)
+    points = [np.exp(rng.uniform(np.log(table.axes[name][0]), np.log(table.axes[name][1]), samples))
+              for name in AXES]
+    found, _ = table.lookup(*points)
+    exact = model_fields(*points)
+    errors = {name: float(np.max(np.abs(found[name] / exact[name] - 1))) for name in FIELDS}
+    # Share of points whose rounded blast radius (as served) differs
+    errors["blast_radius_rounding_mismatch"] = float(np.mean(
+        np.round(found["blast_radius"], 2) != np.round(exact["blast_radius"], 2)
+    ))
+    return errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AEGIS NET scenario sweep tables")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = sub.add_parser("build", help="Evaluate the model over a parameter grid")
+    build_cmd.add_argument("output")
+    for name, (lo, hi, count) in DEFAULT_AXES.items():
+        build_cmd.add_argument(f"--{name}", type=float, nargs=3, default=(lo, hi, count),
+                               metavar=("MIN", "MAX", "COUNT"))
+    build_cmd.add_argument("--dtype", choices=("float64", "float32"), default="float64",
+                           help="float32 halves the size; more lookups fall back to the model")
+
+    verify_cmd = sub.add_parser("verify", help="Interpolation error against the model")
+    verify_cmd.add_argument("table")
+    verify_cmd.add_argument("--samples", type=int, default=100000)
+    verify_cmd.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "verify":
+        print(json.dumps(verify(open_sweep(args.table), args.samples, args.seed), indent=2))
+        return
+
+    start = time.perf_counter()
+    axes = {name: (lo, hi, int(count)) for name, (lo, hi, count) in
+            ((name, getattr(args, name)) for name in AXES)}
+    if any(lo <= 0 or hi <= lo or count < 2 for lo, hi, count in axes.values()):
+        raise SystemExit("axes need 0 < MIN < MAX and COUNT >= 2")
+    table = build_sweep(axes, np.dtype(args.dtype))
+    save_sweep(table, args.output)
+    print(f"Wrote {args.output}: {'x'.join(str(n) for n in table.values.shape)} "
+          f"({table.values.nbytes / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
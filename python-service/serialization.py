@@ -0,0 +1,98 @@
+"""
+AEGIS NET - Response serialization
+Encodes response bodies straight to bytes. Endpoints return these
+Responses instead of models so FastAPI does not re-validate objects the
+service built itself against response_model (kept on the routes for the
+OpenAPI schema) nor walk them again with jsonable_encoder.
+
+  * Pydantic models   pydantic's compiled serializer (model_dump_json)
+  * everything else   orjson, with models and NumPy arrays inline;
+                      stdlib json when orjson is not installed
+  * MessagePack       when the Accept header prefers application/msgpack
+                      (or application/x-msgpack) and msgpack is installed
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any, Optional
+
+import numpy as np
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional, stdlib json fallback
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional, JSON only without it
+    msgpack = None
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPE = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK_TYPE, "application/x-msgpack")
+
+
+def _default(obj: Any) -> Any:
+    """Types the encoders do not handle natively"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+def dumps_json(payload: Any) -> bytes:
+    if isinstance(payload, BaseModel):
+        return payload.model_dump_json().encode()
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode()
+
+
+def dumps_msgpack(payload: Any) -> bytes:
+    return msgpack.packb(payload, default=_default, use_bin_type=True)
+
+
+def _quality(accept: str, media_types) -> float:
+    """Best q the Accept header gives media_types; wildcard matches rank just
+    below an explicit range of the same q"""
+    best = 0.0
+    for part in accept.split(","):
+        media_range, *params = [item.strip() for item in part.split(";")]
+        media_range = media_range.lower()
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_range in media_types:
+            best = max(best, q)
+        elif media_range in ("*/*", "application/*"):
+            best = max(best, q - 1e-3)
+    return best
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """Whether the client prefers MessagePack over JSON (JSON wins ties)"""
+    if not accept or msgpack is None:
+        return False
+    packed = _quality(accept, MSGPACK_TYPES)
+    return packed > 0 and packed > _quality(accept, (JSON_TYPE,))
+
+
+def encode(payload: Any, accept: Optional[str] = None) -> Response:
+    """payload as a JSON or MessagePack response, as negotiated by accept"""
+    headers = {"Vary": "Accept"}
+    if wants_msgpack(accept):
+        return Response(dumps_msgpack(payload), media_type=MSGPACK_TYPE, headers=headers)
+    return Response(dumps_json(payload), media_type=JSON_TYPE, headers=headers)
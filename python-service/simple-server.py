@@ -2,176 +2,306 @@
 """
 Simple HTTP server for AEGIS NET AI predictions (Fallback)
 This runs without FastAPI dependencies for quick testing
+
+Predictions come from impact_core.py, the formulas main.py uses, so
+POST /predict returns the same values as the full service when main.py
+runs without optional datasets (COASTLINE_PATH, POPULATION_RASTER_PATH,
+ROAD_GRAPH_PATH, FACILITIES_PATH, RISK_MODEL_PATH).
+
+Connections are HTTP/1.1 keep-alive, served by a bounded worker pool: a
+connection holds a worker until it goes idle for --keepalive seconds,
+up to --backlog more wait for one, and beyond that new connections get
+an immediate 503 instead of queueing without limit.
 """
 
+import argparse
 import json
-import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse, parse_qs
-import sys
+from urllib.parse import urlparse
+
+import impact_core
+
+ROUTE_DESTINATIONS = 3
+DEBRIS_GRID_SIZE = 20
+SAFE_ZONE_IDS = [f"safe_zone_{i + 1}" for i in range(len(impact_core.SAFE_ZONES))]
+
+BUSY_BODY = b'{"detail":"Server busy"}'
+BUSY_RESPONSE = (b"HTTP/1.1 503 Service Unavailable\r\n"
+                 b"Content-Type: application/json\r\n"
+                 b"Content-Length: " + str(len(BUSY_BODY)).encode() + b"\r\n"
+                 b"Retry-After: 1\r\n"
+                 b"Connection: close\r\n\r\n" + BUSY_BODY)
+
+
+class InvalidRequest(ValueError):
+    """Request body that main.py's PredictionRequest would reject (422)"""
+
+
+def _number(value, name: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise InvalidRequest(f"{name}: expected a number")
+    return float(value)
+
+
+def _location(value, name: str):
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise InvalidRequest(f"{name}: expected [lat, lng]")
+    return (_number(value[0], name), _number(value[1], name))
+
+
+def parse_request(data) -> dict:
+    """Inputs of a /predict body, with PredictionRequest's defaults"""
+    if not isinstance(data, dict) or not isinstance(data.get("asteroid_data"), dict):
+        raise InvalidRequest("asteroid_data: field required")
+    asteroid = data["asteroid_data"]
+    for field in ("diameter", "velocity", "impact_location", "impact_time"):
+        if field not in asteroid:
+            raise InvalidRequest(f"asteroid_data.{field}: field required")
+    if not isinstance(asteroid["impact_time"], str):
+        raise InvalidRequest("asteroid_data.impact_time: expected a string")
+    density = asteroid.get("density", 3000)
+    population_density = data.get("population_density", 1000)
+    user_location = data.get("user_location")
+    return {
+        "diameter": _number(asteroid["diameter"], "asteroid_data.diameter"),
+        "velocity": _number(asteroid["velocity"], "asteroid_data.velocity"),
+        "density": _number(density, "asteroid_data.density") if density is not None else None,
+        "impact_location": _location(asteroid["impact_location"], "asteroid_data.impact_location"),
+        "user_location": _location(user_location, "user_location") if user_location is not None else None,
+        "population_density": (_number(population_density, "population_density")
+                               if population_density is not None else None),
+    }
+
+
+def plan_routes(start, impact_location, blast) -> list:
+    """main.plan_routes against the built-in safe zones"""
+    radii = (blast["blast_radius"], blast["thermal_radius"], blast["seismic_radius"])
+    chosen = impact_core.nearest_zones(start, impact_core.SAFE_ZONES, ROUTE_DESTINATIONS,
+                                       outside_km=blast["blast_radius"], avoid=impact_location)
+    if not chosen:
+        # Nothing outside the blast radius: head for the closest ones regardless
+        chosen = impact_core.nearest_zones(start, impact_core.SAFE_ZONES, ROUTE_DESTINATIONS)
+    return impact_core.rank_routes([
+        impact_core.straight_line_route(i, start, impact_core.SAFE_ZONES[zone], impact_location,
+                                        radii, SAFE_ZONE_IDS[zone])
+        for i, zone in enumerate(chosen)
+    ])
+
+
+def generate_predictions(request: dict) -> dict:
+    """PredictionResponse fields for a parsed /predict body"""
+    start_time = time.monotonic()
+    diameter, velocity = request["diameter"], request["velocity"]
+    impact_location = request["impact_location"]
+    lat, lng = impact_location
+
+    blast = impact_core.blast_radii(diameter, velocity, request["density"])
+    tsunami = {"tsunami_risk": False, "wave_height": None, "coastal_impact_radius": None,
+               "distance_to_coast": None, "water_depth": None}
+    tsunami.update(impact_core.fallback_tsunami(lat, lng, blast["blast_radius"], diameter))
+
+    dispersion_radius = blast["blast_radius"] * 2.5
+    _, half_width = impact_core.debris_extent(dispersion_radius, velocity)
+
+    exposure = None
+    if request["population_density"] is not None:
+        people = impact_core.density_exposure(
+            request["population_density"],
+            (blast["blast_radius"], blast["thermal_radius"], blast["seismic_radius"])
+        )
+        exposure = {"blast_zone": int(people[0]), "thermal_zone": int(people[1]),
+                    "seismic_zone": int(people[2]), "source": "density"}
+
+    return {
+        "blast_prediction": blast,
+        "tsunami_prediction": tsunami,
+        "debris_dispersion": {
+            "dispersion_radius": round(dispersion_radius, 2),
+            "debris_size_distribution": dict(impact_core.DEBRIS_SIZE_DISTRIBUTION),
+            "impact_probability_map": impact_core.debris_grid(dispersion_radius, velocity,
+                                                              DEBRIS_GRID_SIZE),
+            "grid_bounds": impact_core.grid_bounds(impact_location, half_width),
+        },
+        "evacuation_routes": plan_routes(request["user_location"] or impact_location,
+                                         impact_location, blast),
+        "risk_assessment": {
+            **impact_core.risk_rules(blast["blast_radius"], tsunami["tsunami_risk"], velocity),
+            "model_version": None,
+            "class_probabilities": None,
+            "rule_risk_level": None,
+        },
+        "resource_allocation": {
+            **impact_core.resource_needs(blast["blast_radius"],
+                                         exposure["blast_zone"] if exposure is not None else None),
+            "exposure": exposure,
+            # Facility assignments need FACILITIES_PATH (main.py)
+            "shelters": [],
+            "hospitals": [],
+            "evacuation_centers": [],
+        },
+        "processing_time": round(time.monotonic() - start_time, 3),
+    }
+
 
 class AIRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive; every response sets Content-Length
+    timeout = 5.0  # idle seconds before a keep-alive connection is closed
+    max_body = 64 * 1024  # bytes
+    disable_nagle_algorithm = True  # headers and body are separate writes
+
+    def send_json(self, status: int, payload, close: bool = False):
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if close:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
     def do_GET(self):
-        if self.path == '/health':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
-            response = {
+        path = urlparse(self.path).path
+        if path == '/health':
+            self.send_json(200, {
                 "status": "healthy",
                 "timestamp": datetime.now().isoformat(),
                 "service": "AEGIS AI Service (Simple)",
                 "version": "1.0.0"
-            }
-            self.wfile.write(json.dumps(response).encode())
-            
-        elif self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
-            response = {
+            })
+        elif path == '/':
+            self.send_json(200, {
                 "message": "AEGIS NET AI Service",
                 "status": "operational",
                 "version": "1.0.0",
                 "endpoints": ["/predict", "/health", "/"]
-            }
-            self.wfile.write(json.dumps(response).encode())
+            })
         else:
-            self.send_response(404)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": "Not found"}).encode())
+            self.send_json(404, {"detail": "Not Found"})
+
+    def read_body(self):
+        """Request body, or None after answering a 4xx for it"""
+        if self.headers.get('Transfer-Encoding'):
+            self.send_json(411, {"detail": "Chunked bodies are not supported"}, close=True)
+            return None
+        length = self.headers.get('Content-Length')
+        if length is None:
+            self.send_json(411, {"detail": "Content-Length required"}, close=True)
+            return None
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_json(400, {"detail": "Invalid Content-Length"}, close=True)
+            return None
+        if length > self.max_body:
+            # The body stays unread, so the connection cannot be reused
+            self.send_json(413, {"detail": f"Body exceeds {self.max_body} bytes"}, close=True)
+            return None
+        return self.rfile.read(length)
 
     def do_POST(self):
-        if self.path == '/predict':
-            # Read request body
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            try:
-                data = json.loads(post_data.decode('utf-8'))
-                
-                # Generate mock predictions
-                predictions = self.generate_predictions(data)
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                
-                self.wfile.write(json.dumps(predictions).encode())
-                
-            except Exception as e:
-                self.send_response(500)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({"error": str(e)}).encode())
-        else:
-            self.send_response(404)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": "Not found"}).encode())
-
-    def generate_predictions(self, data):
-        """Generate mock AI predictions"""
-        asteroid_data = data.get('asteroid_data', {})
-        
-        diameter = asteroid_data.get('diameter', 150)
-        velocity = asteroid_data.get('velocity', 15.2)
-        
-        # Calculate blast radius (simplified)
-        blast_radius = math.sqrt(diameter * velocity) * 0.5
-        
-        # Determine risk level
-        risk_level = "low"
-        if blast_radius > 20:
-            risk_level = "high"
-        elif blast_radius > 10:
-            risk_level = "medium"
-        
-        return {
-            "blast_prediction": {
-                "blast_radius": round(blast_radius, 2),
-                "thermal_radius": round(blast_radius * 1.5, 2),
-                "seismic_radius": round(blast_radius * 2.0, 2),
-                "airburst_height": round(max(0, diameter / 100), 2)
-            },
-            "tsunami_prediction": {
-                "tsunami_risk": blast_radius > 15,
-                "wave_height": round(min(diameter / 10, 50), 1) if blast_radius > 15 else None,
-                "coastal_impact_radius": round(blast_radius * 3, 1) if blast_radius > 15 else None
-            },
-            "debris_dispersion": {
-                "dispersion_radius": round(blast_radius * 2.5, 2),
-                "debris_size_distribution": {
-                    "large": 0.1,
-                    "medium": 0.3,
-                    "small": 0.6
-                },
-                "impact_probability_map": [[0.8, 0.6, 0.4, 0.2], [0.6, 0.9, 0.7, 0.3], [0.4, 0.7, 1.0, 0.5], [0.2, 0.3, 0.5, 0.3]]
-            },
-            "evacuation_routes": [
-                {
-                    "route_id": "route_1",
-                    "name": "Primary Evacuation Route",
-                    "waypoints": [[40.7128, -74.0060], [40.7589, -73.9851]],
-                    "distance": 15.2,
-                    "estimated_time": 25.0,
-                    "traffic_level": "light",
-                    "safety_score": 0.9,
-                    "capacity": 1000
-                },
-                {
-                    "route_id": "route_2", 
-                    "name": "Secondary Evacuation Route",
-                    "waypoints": [[40.7128, -74.0060], [40.7829, -73.9654]],
-                    "distance": 18.7,
-                    "estimated_time": 35.0,
-                    "traffic_level": "medium",
-                    "safety_score": 0.7,
-                    "capacity": 800
-                }
-            ],
-            "risk_assessment": {
-                "risk_level": risk_level,
-                "risk_factors": ["Large blast radius"] if blast_radius > 20 else ["Moderate blast radius"] if blast_radius > 10 else ["Small blast radius"],
-                "recommendations": ["Immediate evacuation required"] if risk_level == "high" else ["Prepare for evacuation"] if risk_level == "medium" else ["Monitor situation"],
-                "confidence_score": 0.85
-            },
-            "resource_allocation": {
-                "shelters_needed": max(1, int(blast_radius * 20)),
-                "hospitals_needed": max(1, int(blast_radius * 10)),
-                "evacuation_centers_needed": max(1, int(blast_radius * 5)),
-                "estimated_evacuees": int(min(blast_radius * 1000, 100000)),
-                "resource_shortage_risk": "high" if blast_radius > 25 else "medium" if blast_radius > 15 else "low"
-            },
-            "processing_time": 0.1
-        }
+        if urlparse(self.path).path != '/predict':
+            self.send_json(404, {"detail": "Not Found"}, close=True)
+            return
+        body = self.read_body()
+        if body is None:
+            return
+        try:
+            request = parse_request(json.loads(body))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            self.send_json(400, {"detail": "Invalid JSON body"})
+            return
+        except InvalidRequest as e:
+            self.send_json(422, {"detail": str(e)})
+            return
+        try:
+            predictions = generate_predictions(request)
+        except Exception as e:
+            self.send_json(500, {"detail": f"Prediction error: {str(e)}"})
+            return
+        self.send_json(200, predictions)
 
     def log_message(self, format, *args):
         """Override to reduce log noise"""
         pass
 
-def run_server(port=8000):
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer handing connections to a fixed thread pool
+
+    At most workers connections are served at once and backlog more wait
+    for a free worker; the rest are refused with 503 straight away.
+    """
+
+    def __init__(self, server_address, handler_class, workers: int = 32, backlog: int = 64):
+        self.request_queue_size = max(backlog, 5)  # listen() backlog
+        super().__init__(server_address, handler_class)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aegis-simple")
+        self._slots = threading.BoundedSemaphore(workers + backlog)
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            try:
+                request.sendall(BUSY_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        self._pool.submit(self._serve, request, client_address)
+
+    def _serve(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_server(port=8000, host='', workers=32, backlog=64, max_body=64 * 1024, keepalive=5.0):
     """Run the simple HTTP server"""
-    server_address = ('', port)
-    httpd = HTTPServer(server_address, AIRequestHandler)
+    handler = type("ConfiguredHandler", (AIRequestHandler,),
+                   {"timeout": keepalive, "max_body": max_body})
+    httpd = PooledHTTPServer((host, port), handler, workers=workers, backlog=backlog)
     print(f"🚀 AEGIS AI Service (Simple) running on http://localhost:{port}")
     print(f"📊 Health check: http://localhost:{port}/health")
     print(f"🤖 Predictions: http://localhost:{port}/predict")
+    print(f"🧵 {workers} workers, {backlog} queued connections, {keepalive:g}s keep-alive")
     print("Press Ctrl+C to stop")
-    
+
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
         print("\n🛑 Server stopped")
+    finally:
         httpd.server_close()
 
+
+def main():
+    parser = argparse.ArgumentParser(description="AEGIS NET fallback AI service (no FastAPI)")
+    parser.add_argument("port", type=int, nargs="?", default=8000)
+    parser.add_argument("--host", default="", help="bind address (default: all interfaces)")
+    parser.add_argument("--workers", type=int, default=32, help="connections served at once")
+    parser.add_argument("--backlog", type=int, default=64,
+                        help="connections waiting for a worker before 503s")
+    parser.add_argument("--max-body", type=int, default=64 * 1024, help="largest request body (bytes)")
+    parser.add_argument("--keepalive", type=float, default=5.0,
+                        help="idle seconds before closing a keep-alive connection")
+    args = parser.parse_args()
+    run_server(args.port, args.host, args.workers, args.backlog, args.max_body, args.keepalive)
+
+
 if __name__ == "__main__":
-    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
-    run_server(port)
+    main()
@@ -0,0 +1,233 @@
+"""
+AEGIS NET - Impact evolution simulator
+Time-stepped frames of an impact unfolding, for the time-travel and
+mitigation simulators: blast shock, thermal pulse and seismic wave
+spreading out to the radii /predict reports, debris fall-out building up
+towards the debris probability map, and a tsunami crossing the ocean.
+
+The state lives on a square km grid centred on the impact (row 0 = north
+edge, the layout of /predict/debris-grid) and every step updates it in
+place from the previous step:
+
+  * zones   hazard code per cell (impact_core OUTSIDE..BLAST), raised as
+            the shock front, the accumulated thermal fluence and the
+            seismic front pass it
+  * debris  deposited fraction of the final debris probability; a cell
+            starts settling once the ballistic ejecta curtain reaches it
+  * wave    sea-surface height (m): linear long-wave equation, 5-point
+            Laplacian stencil with leapfrog time steps (CFL-limited
+            sub-steps), dry land cells and an absorbing edge
+
+Front kinematics (km, s) are deliberately simple:
+  * shock    Sedov-Taylor r ~ t^0.4 until the blast radius, then sound speed
+  * thermal  fireball pulse of ~0.42 W^0.44 s (W in kt); fluence ~ 1/r²
+  * seismic  P waves at 6 km/s
+  * debris   45° ballistic ejecta, flight time sqrt(2r/g)
+"""
+
+import math
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+import impact_core
+from impact_core import BLAST, KM_PER_DEGREE_GRID, OUTSIDE, SEISMIC, THERMAL
+
+LAYERS = ("zones", "debris", "wave")
+SOUND_SPEED = 0.343  # km/s
+SEISMIC_SPEED = 6.0  # km/s
+GRAVITY = 9.81e-3  # km/s²
+DEBRIS_SETTLE = 30.0  # s, e-folding time of fall-out once the curtain has passed
+DEFAULT_OCEAN_DEPTH = 4000.0  # m, where no bathymetry is available
+MAX_DURATION = 3600.0  # s
+MAX_STEPS = 2000
+SPONGE_CELLS = 8  # absorbing border of the wave grid
+
+
+class ImpactSimulation:
+    """Incrementally stepped impact state on a resolution x resolution grid
+
+    blast holds the /predict radii (km); tsunami_height (m) enables the
+    wave layer. coastal_grid (coastline.CoastalGrid) masks land and
+    supplies depths; without it the whole grid is open ocean.
+    """
+
+    def __init__(self, impact_location: Tuple[float, float], blast: Dict[str, float],
+                 energy_megatons: float, diameter: float, velocity: float,
+                 tsunami_height: Optional[float] = None, resolution: int = 128,
+                 coastal_grid=None):
+        self.impact_location = impact_location
+        self.blast_radius = blast["blast_radius"]
+        self.thermal_radius = blast["thermal_radius"]
+        self.seismic_radius = blast["seismic_radius"]
+        self.dispersion_radius = self.blast_radius * 2.5
+        self.reach, debris_half_width = impact_core.debris_extent(self.dispersion_radius, velocity)
+
+        half_width = max(self.seismic_radius, debris_half_width, 1.0)
+        if tsunami_height:
+            half_width = max(half_width, self.blast_radius * 3)  # coastal impact radius
+        self.half_width = half_width
+        self.resolution = resolution
+        self.cell_km = 2 * half_width / resolution
+        self.bounds = impact_core.grid_bounds(impact_location, half_width)
+        offsets = ((np.arange(resolution) + 0.5) / resolution * 2 - 1) * half_width
+        squares = np.square(offsets)
+        self.distance = np.sqrt(squares[:, None] + squares[None, :])
+        self._north = offsets[::-1]  # row centres, km north of the impact
+        self._east = offsets
+
+        self.time = 0.0
+        self.steps = 0
+        self.zones = np.full((resolution, resolution), OUTSIDE, dtype=np.int8)
+
+        # Thermal: fluence in units of the ignition threshold at thermal_radius
+        energy_kt = max(energy_megatons * 1000, 1e-9)
+        self.thermal_pulse = min(max(0.42 * energy_kt ** 0.44, 0.1), 120.0)
+        self._fluence = np.zeros((resolution, resolution))
+        self._exposure = np.square(self.thermal_radius / np.maximum(self.distance, self.cell_km / 2))
+        # Shock: Sedov-Taylor to the blast radius, continuous speed into sound
+        self.shock_time = 0.4 * self.blast_radius / SOUND_SPEED
+
+        self.debris = np.zeros((resolution, resolution))
+        self._debris_final = np.clip(1 - self.distance / self.reach, 0, 1)
+        self._debris_arrival = np.sqrt(2 * self.distance / GRAVITY)
+
+        self.wave = None
+        if tsunami_height:
+            self._init_wave(tsunami_height, diameter, coastal_grid)
+
+    def _init_wave(self, height: float, diameter: float, coastal_grid) -> None:
+        size = (self.resolution, self.resolution)
+        depth = np.full(size, DEFAULT_OCEAN_DEPTH)
+        wet = np.ones(size, dtype=bool)
+        if coastal_grid is not None:
+            lat0, lng0 = self.impact_location
+            lat = lat0 + self._north / KM_PER_DEGREE_GRID
+            lng = lng0 + self._east / (KM_PER_DEGREE_GRID * max(math.cos(math.radians(lat0)), 1e-6))
+            sample = coastal_grid.sample(np.repeat(lat, self.resolution), np.tile(lng, self.resolution))
+            # Cells outside the dataset stay open ocean
+            wet = (sample["ocean"] | ~sample["valid"]).reshape(size)
+            sampled = sample["depth_m"].reshape(size)
+            depth = np.where(np.isfinite(sampled) & (sampled > 0), sampled, DEFAULT_OCEAN_DEPTH)
+        speed_squared = np.where(wet, GRAVITY * depth / 1000, 0.0)  # km²/s²
+        self._wave_step = 0.5 * self.cell_km / math.sqrt(max(float(speed_squared.max()), 1e-12))
+        self._speed_squared = speed_squared
+        self.wave_speed = float(np.sqrt(speed_squared[wet]).mean()) if wet.any() else 0.0
+
+        # Water column displaced by the impact, released at rest
+        width = max(2 * self.cell_km, diameter / 100)  # km
+        self.wave = np.where(wet, height * np.exp(-np.square(self.distance / width)), 0.0)
+        self._wave_previous = self.wave.copy()
+        self.wave_source_height = height
+        edge = np.minimum(np.arange(self.resolution), np.arange(self.resolution)[::-1])
+        taper = np.clip(edge / SPONGE_CELLS, 0, 1)
+        taper = 0.9 + 0.1 * taper  # per sub-step damping in the border band
+        self._sponge = np.minimum(taper[:, None], taper[None, :])
+
+    def default_duration(self) -> float:
+        """Seconds until every process has (nearly) finished, capped at MAX_DURATION"""
+        finished = [
+            self.shock_time + (self.half_width - self.blast_radius) / SOUND_SPEED,
+            self.thermal_pulse,
+            self.seismic_radius / SEISMIC_SPEED,
+            math.sqrt(2 * self.reach / GRAVITY) + 5 * DEBRIS_SETTLE,
+        ]
+        if self.wave is not None and self.wave_speed > 0:
+            finished.append(self.half_width / self.wave_speed)
+        return min(max(finished), MAX_DURATION)
+
+    def fronts(self) -> Dict[str, Optional[float]]:
+        """Current front radii in km (capped at the grid corners)"""
+        t = self.time
+        extent = self.half_width * math.sqrt(2)
+        fronts = {
+            "shock": self.shock_radius(t),
+            "thermal": self.thermal_radius * math.sqrt(min(t / self.thermal_pulse, 1.0)),
+            "seismic": SEISMIC_SPEED * t,
+            "debris": min(GRAVITY * t * t / 2, self.reach),
+            "tsunami": self.wave_speed * t if self.wave is not None else None,
+        }
+        return {name: round(min(radius, extent), 3) if radius is not None else None
+                for name, radius in fronts.items()}
+
+    def shock_radius(self, t: float) -> float:
+        if t <= self.shock_time:
+            return self.blast_radius * (t / self.shock_time) ** 0.4 if self.shock_time > 0 else 0.0
+        return self.blast_radius + SOUND_SPEED * (t - self.shock_time)
+
+    def step(self, dt: float) -> None:
+        """Advance the state by dt seconds"""
+        previous, t = self.time, self.time + dt
+        zones, distance = self.zones, self.distance
+
+        seismic = distance <= min(SEISMIC_SPEED * t, self.seismic_radius)
+        zones[seismic & (zones < SEISMIC)] = SEISMIC
+        pulse = min(t / self.thermal_pulse, 1.0) - min(previous / self.thermal_pulse, 1.0)
+        if pulse > 0:
+            self._fluence += self._exposure * pulse
+        zones[(self._fluence >= 1 - 1e-12) & (zones < THERMAL)] = THERMAL
+        shocked = distance <= min(self.shock_radius(t), self.blast_radius)
+        zones[shocked & (zones < BLAST)] = BLAST
+
+        # Cells the curtain has reached relax towards their final deposit
+        settling = (self._debris_arrival <= t) * (1 - math.exp(-dt / DEBRIS_SETTLE))
+        self.debris += (self._debris_final - self.debris) * settling
+
+        if self.wave is not None:
+            substeps = max(1, math.ceil(dt / self._wave_step))
+            coefficient = self._speed_squared * (dt / substeps / self.cell_km) ** 2
+            eta, eta_previous = self.wave, self._wave_previous
+            laplacian = np.zeros_like(eta)
+            for _ in range(substeps):
+                laplacian[1:-1, 1:-1] = (eta[:-2, 1:-1] + eta[2:, 1:-1] + eta[1:-1, :-2]
+                                         + eta[1:-1, 2:] - 4 * eta[1:-1, 1:-1])
+                eta_next = 2 * eta - eta_previous + coefficient * laplacian
+                eta_next *= self._sponge
+                eta_previous, eta = eta * self._sponge, eta_next
+            self.wave, self._wave_previous = eta, eta_previous
+
+        self.time = t
+        self.steps += 1
+
+    def window(self, roi: Optional[Tuple[float, float, float, float]] = None):
+        """(row slice, col slice, bounds) of the cells inside roi (south, west, north, east)"""
+        rows, cols = slice(0, self.resolution), slice(0, self.resolution)
+        if roi is None:
+            return rows, cols, self.bounds
+        south, west, north, east = self.bounds
+        lat_step = (north - south) / self.resolution
+        lng_step = (east - west) / self.resolution
+        first_row = int(np.clip(math.floor((north - roi[2]) / lat_step), 0, self.resolution))
+        last_row = int(np.clip(math.ceil((north - roi[0]) / lat_step), 0, self.resolution))
+        first_col = int(np.clip(math.floor((roi[1] - west) / lng_step), 0, self.resolution))
+        last_col = int(np.clip(math.ceil((roi[3] - west) / lng_step), 0, self.resolution))
+        rows, cols = slice(first_row, last_row), slice(first_col, last_col)
+        return rows, cols, (round(north - last_row * lat_step, 6), round(west + first_col * lng_step, 6),
+                            round(north - first_row * lat_step, 6), round(west + last_col * lng_step, 6))
+
+    def frame(self, layers=LAYERS, rows: slice = slice(None), cols: slice = slice(None),
+              stride: int = 1) -> dict:
+        """Current state: time, fronts and the requested layers (rounded arrays)"""
+        frame = {"step": self.steps, "time": round(self.time, 3), "fronts": self.fronts()}
+        if "zones" in layers:
+            frame["zones"] = self.zones[rows, cols][::stride, ::stride]
+        if "debris" in layers:
+            frame["debris"] = np.round(self.debris[rows, cols][::stride, ::stride], 3)
+        if "wave" in layers and self.wave is not None:
+            frame["wave"] = np.round(self.wave[rows, cols][::stride, ::stride], 2)
+        return frame
+
+
+def run_frames(simulation: ImpactSimulation, dt: float, steps: int, frame_every: int = 1,
+               layers=LAYERS, roi: Optional[Tuple[float, float, float, float]] = None,
+               stride: int = 1) -> Iterator[dict]:
+    """Step the simulation, yielding the initial state and every frame_every-th step
+
+    The last step is always yielded.
+    """
+    rows, cols, _ = simulation.window(roi)
+    yield simulation.frame(layers, rows, cols, stride)
+    for step in range(1, steps + 1):
+        simulation.step(dt)
+        if step % frame_every == 0 or step == steps:
+            yield simulation.frame(layers, rows, cols, stride)
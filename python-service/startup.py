@@ -0,0 +1,359 @@
+"""
+AEGIS NET - Startup
+Lazy datasets and models, the background warm-up that loads them, and the
+tools that keep cold start inside the container's health-check window.
+
+Datasets (road graph, rasters, coastline, facilities) and the risk model
+are LazyAssets: loaded once on first use, or earlier by Assets.start():
+
+  * background  serve at once (liveness); load in a worker thread and
+                report ready when done. Prediction requests wait for it
+  * eager       load before the server accepts connections
+  * lazy        no warm-up; each asset loads on the first request using it
+
+A dataset that fails to load is served by its built-in fallback and
+retried, so one bad optional file degrades the API instead of failing
+readiness; assets without a fallback are retried by Assets.wait().
+
+Modules that pull in SciPy, pandas, scikit-learn etc. are imported by the
+loaders, not at import time, so `import main` stays cheap.
+
+Usage (from python-service/):
+  python startup.py imports --top 15          # -X importtime report
+  python startup.py coldstart --runs 3 --target 5
+
+prefork.py loads the assets once in a parent process instead, and forks
+workers that share them.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# main.py imports this module first: the reference point for startup timings
+PROCESS_STARTED = time.monotonic()
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+WARMUP_MODES = ("background", "eager", "lazy")
+DEFAULT_TARGET = 5.0  # seconds: the Dockerfile HEALTHCHECK start-period
+
+
+class LazyAsset:
+    """A value built by loader() once, on first get(); thread-safe
+
+    A failed load is recorded. With a fallback (the built-in behaviour an
+    optional dataset replaces) the asset is "degraded": get() serves
+    fallback() and retries the loader every retry_interval seconds.
+    Without one, get() raises and retries on the next call.
+    """
+
+    retry_interval = 30.0  # seconds between retries of a failed loader
+
+    def __init__(self, name: str, loader: Callable[[], Any],
+                 fallback: Optional[Callable[[], Any]] = None):
+        self.name = name
+        self._loader = loader
+        self._fallback = fallback
+        self._lock = threading.Lock()
+        self._value = None
+        self.state = "pending"  # pending, loading, ready, degraded, failed
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self.generation = 0  # bumped whenever a new value is stored
+        self.retry_at = 0.0  # time.monotonic() of the next retry after a failure
+
+    @property
+    def loaded(self) -> bool:
+        return self.state == "ready"
+
+    @property
+    def available(self) -> bool:
+        """Whether get() returns without loading: the dataset or its fallback"""
+        return self.state in ("ready", "degraded")
+
+    def get(self) -> Any:
+        if self.state == "ready":
+            return self._value
+        if self.state == "degraded":
+            # Keep serving the fallback; one caller retries once it is due
+            if time.monotonic() < self.retry_at or not self._lock.acquire(blocking=False):
+                return self._value
+            try:
+                return self._load()
+            finally:
+                self._lock.release()
+        with self._lock:
+            if self.available:
+                return self._value
+            self.state = "loading"
+            return self._load()
+
+    def _load(self) -> Any:
+        """Run the loader (lock held); on failure degrade to the fallback or raise"""
+        start = time.perf_counter()
+        try:
+            value = self._loader()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.retry_at = time.monotonic() + self.retry_interval
+            if self._fallback is None:
+                self.state = "failed"
+                raise
+            logger.warning("%s failed to load, using the built-in fallback: %s", self.name, self.error)
+            if self.state != "degraded":
+                self._value = self._fallback()
+                self.generation += 1
+                self.state = "degraded"
+            return self._value
+        self._value, self.error = value, None
+        self.seconds = round(time.perf_counter() - start, 3)
+        self.generation += 1
+        self.state = "ready"
+        return self._value
+
+    def peek(self, default: Any = None) -> Any:
+        """The value (or fallback) if already loaded, without triggering a load"""
+        return self._value if self.available else default
+
+    def build(self) -> Any:
+        """A fresh value from the loader, without storing it (see swap)"""
+        return self._loader()
+
+    def swap(self, value: Any, seconds: Optional[float] = None) -> None:
+        """Replace the value; get() returns the old one or the new one, never neither"""
+        with self._lock:
+            self._value, self.error = value, None
+            self.seconds = seconds
+            self.generation += 1
+            self.state = "ready"
+
+    def status(self) -> dict:
+        return {"state": self.state, "seconds": self.seconds, "error": self.error}
+
+
+class Assets:
+    """Named LazyAssets and their warm-up"""
+
+    def __init__(self, assets: Iterable[LazyAsset]):
+        self.assets: Dict[str, LazyAsset] = {asset.name: asset for asset in assets}
+        self.mode = "lazy"
+        self._warmup: Optional[asyncio.Future] = None
+        self.ready_after: Optional[float] = None  # seconds since PROCESS_STARTED
+        self._retrying = threading.Lock()
+
+    @property
+    def failed(self) -> List[str]:
+        return [name for name, asset in self.assets.items() if asset.state == "failed"]
+
+    @property
+    def generation(self) -> int:
+        """Changes whenever any asset gets a new value (load, swap or reload)"""
+        return sum(asset.generation for asset in self.assets.values())
+
+    @property
+    def degraded(self) -> List[str]:
+        return [name for name, asset in self.assets.items() if asset.state == "degraded"]
+
+    @property
+    def ready(self) -> bool:
+        if self.mode == "lazy":
+            return not self.failed
+        return all(asset.available for asset in self.assets.values())
+
+    def warm(self) -> bool:
+        """Load every asset in registration order; failures stay recorded"""
+        for asset in self.assets.values():
+            try:
+                asset.get()
+            except Exception as e:
+                logger.error("Warm-up: %s failed: %s", asset.name, e)
+        if self.ready:
+            self.ready_after = round(time.monotonic() - PROCESS_STARTED, 3)
+        return self.ready
+
+    def retry(self) -> bool:
+        """Retry failed assets whose retry is due (one caller at a time); whether ready"""
+        now = time.monotonic()
+        due = [name for name in self.failed if self.assets[name].retry_at <= now]
+        if due and self._retrying.acquire(blocking=False):
+            try:
+                for name in due:
+                    try:
+                        self.assets[name].get()
+                    except Exception as e:
+                        logger.error("Retry: %s failed: %s", name, e)
+            finally:
+                self._retrying.release()
+        return self.ready
+
+    def reload(self, names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Rebuild the named assets (default all), then swap them in together
+
+        Nothing is replaced if any loader fails. Returns seconds per asset.
+        """
+        names = list(self.assets) if names is None else list(names)
+        fresh, seconds = {}, {}
+        for name in names:
+            start = time.perf_counter()
+            fresh[name] = self.assets[name].build()
+            seconds[name] = round(time.perf_counter() - start, 3)
+        for name, value in fresh.items():
+            self.assets[name].swap(value, seconds[name])
+        return seconds
+
+    async def start(self, mode: str = "background") -> None:
+        """Begin the warm-up (call from the app's startup hook)"""
+        if mode not in WARMUP_MODES:
+            raise ValueError(f"WARMUP_MODE must be one of {', '.join(WARMUP_MODES)}")
+        self.mode = mode
+        if mode == "eager":
+            await asyncio.to_thread(self.warm)
+        elif mode == "background":
+            self._warmup = asyncio.ensure_future(asyncio.to_thread(self.warm))
+        else:
+            self.ready_after = round(time.monotonic() - PROCESS_STARTED, 3)
+
+    async def wait(self, timeout: float) -> bool:
+        """Whether assets are ready, waiting up to timeout for the warm-up"""
+        if self._warmup is not None and not self._warmup.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self._warmup), timeout)
+            except asyncio.TimeoutError:
+                return False
+        if self.failed:
+            return await asyncio.to_thread(self.retry)
+        return self.ready
+
+    def status(self) -> dict:
+        return {
+            "mode": self.mode,
+            "ready": self.ready,
+            "uptime": round(time.monotonic() - PROCESS_STARTED, 3),
+            "ready_after": self.ready_after,
+            "assets": {name: asset.status() for name, asset in self.assets.items()},
+        }
+
+
+def import_profile(module: str = "main", env: Optional[dict] = None) -> dict:
+    """`python -X importtime -c "import module"` in a fresh interpreter
+
+    Returns total seconds, every module's (self, cumulative) seconds and the
+    self time summed per top-level package.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=SERVICE_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({"module": name.strip(), "self": int(self_us) / 1e6,
+                        "cumulative": int(cumulative_us) / 1e6, "depth": (len(name) - len(name.lstrip())) // 2})
+    packages = defaultdict(float)
+    for entry in modules:
+        packages[entry["module"].split(".")[0]] += entry["self"]
+    total = next((m["cumulative"] for m in reversed(modules) if m["module"] == module), None)
+    return {"module": module, "total": total, "modules": modules,
+            "packages": dict(sorted(packages.items(), key=lambda item: -item[1]))}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _status(port: int, path: str) -> Optional[int]:
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=1) as conn:
+            conn.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+            line = conn.makefile("rb").readline().split()
+            return int(line[1]) if len(line) > 1 else None
+    except OSError:
+        return None
+
+
+def cold_start(timeout: float = 60.0, env: Optional[dict] = None) -> dict:
+    """Seconds from spawning `uvicorn main:app` to live and to ready"""
+    port = _free_port()
+    start = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    timings = {"live": None, "ready": None}
+    try:
+        while time.monotonic() - start < timeout and process.poll() is None:
+            for key, path in (("live", "/health/live"), ("ready", "/health/ready")):
+                if timings[key] is None and _status(port, path) == 200:
+                    timings[key] = round(time.monotonic() - start, 3)
+            if timings["ready"] is not None:
+                break
+            time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AEGIS NET startup profiling")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imports_cmd = sub.add_parser("imports", help="Import-time profile of a module")
+    imports_cmd.add_argument("--module", default="main")
+    imports_cmd.add_argument("--top", type=int, default=15)
+    imports_cmd.add_argument("--json", action="store_true", help="print the full profile as JSON")
+
+    cold_cmd = sub.add_parser("coldstart", help="Time uvicorn main:app to /health/live and /health/ready")
+    cold_cmd.add_argument("--runs", type=int, default=3)
+    cold_cmd.add_argument("--mode", choices=WARMUP_MODES, help="WARMUP_MODE for the runs")
+    cold_cmd.add_argument("--target", type=float, default=DEFAULT_TARGET,
+                          help="median seconds to live and to ready (exit 1 when exceeded)")
+    cold_cmd.add_argument("--timeout", type=float, default=60.0)
+
+    args = parser.parse_args()
+    if args.command == "imports":
+        profile = import_profile(args.module)
+        if args.json:
+            print(json.dumps(profile, indent=2))
+            return
+        print(f"import {profile['module']}: {profile['total']:.3f} s")
+        print("\nSelf time by top-level package")
+        for package, seconds in list(profile["packages"].items())[:args.top]:
+            print(f"  {seconds * 1000:8.1f} ms  {package}")
+        print("\nSlowest modules (cumulative)")
+        for entry in sorted(profile["modules"], key=lambda m: -m["cumulative"])[:args.top]:
+            print(f"  {entry['cumulative'] * 1000:8.1f} ms  {entry['module']}")
+        return
+
+    env = dict(os.environ)
+    if args.mode:
+        env["WARMUP_MODE"] = args.mode
+    runs = [cold_start(args.timeout, env) for _ in range(args.runs)]
+    summary = {}
+    for key in ("live", "ready"):
+        values = [run[key] for run in runs if run[key] is not None]
+        summary[key] = round(statistics.median(values), 3) if len(values) == len(runs) else None
+    print(json.dumps({"target": args.target, "runs": runs, "median": summary}, indent=2))
+    missed = [key for key, value in summary.items() if value is None or value > args.target]
+    if missed:
+        print(f"Cold start over the {args.target:g} s target: {', '.join(missed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+# No history database or optional datasets: the built-in fallbacks
+for name in ("PREDICTION_STORE_PATH", "ROAD_GRAPH_PATH", "ROUTE_INDEX_PATH", "COASTLINE_PATH",
+             "POPULATION_RASTER_PATH", "FACILITIES_PATH", "RISK_MODEL_PATH", "SWEEP_TABLE_PATH"):
+    os.environ.pop(name, None)
+os.environ.setdefault("WARMUP_MODE", "eager")
+
+
+def asteroid(diameter=150.0, velocity=20.0, density=3000.0, location=(40.7128, -74.0060)) -> dict:
+    return {"diameter": diameter, "velocity": velocity, "density": density,
+            "impact_location": list(location), "impact_time": "2030-01-01T00:00:00Z"}
+
+
+@pytest.fixture(scope="session")
+def main_module():
+    import main
+    return main
+
+
+@pytest.fixture(scope="session")
+def client(main_module):
+    from fastapi.testclient import TestClient
+
+    with TestClient(main_module.app) as test_client:
+        yield test_client
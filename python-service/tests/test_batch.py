@@ -0,0 +1,163 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from batching import Coalescer, MicroBatcher
+from conftest import asteroid
+
+
+@pytest.fixture(params=["thread", "process"])
+def executor_kind(request, main_module, monkeypatch):
+    """main.stage_executor replaced by a fresh pool of the given kind"""
+    executor = main_module.StageExecutor(kind=request.param, workers=2,
+                                         before_fork=lambda: main_module.assets.wait(30))
+    monkeypatch.setattr(main_module, "stage_executor", executor)
+    yield request.param
+    executor.shutdown()
+
+
+def test_predict_batch_under_each_executor(client, executor_kind):
+    asteroids = [asteroid(d, v, rho) for d, v, rho in ((50, 12, 1500), (150, 20, 3000), (1000, 30, 7800))]
+    response = client.post("/predict/batch", json={"asteroids": asteroids})
+    assert response.status_code == 200, response.text
+    batch = response.json()["blast_predictions"]
+    for i, data in enumerate(asteroids):
+        single = client.post("/predict", params={"fields": "blast_prediction"},
+                             json={"asteroid_data": data}).json()["blast_prediction"]
+        assert {name: values[i] for name, values in batch.items()} == single
+    # The pool still serves pipeline stages afterwards
+    routes = client.post("/predict", params={"fields": "evacuation_routes"},
+                         json={"asteroid_data": asteroids[1]})
+    assert routes.status_code == 200, routes.text
+
+
+def _random_asteroids(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    diameters = np.exp(rng.uniform(np.log(1), np.log(20000), count))
+    velocities = rng.uniform(11, 72, count)
+    densities = rng.uniform(500, 8000, count)
+    return diameters, velocities, densities
+
+
+def test_blast_batch_matches_scalar(main_module):
+    predictor = main_module.impact_predictor
+    diameters, velocities, densities = _random_asteroids(50000)
+    # Round inputs too: they hit rounding boundaries more often
+    diameters[:5000] = np.round(diameters[:5000])
+    batch = predictor.calculate_blast_radius_batch(diameters, velocities, densities)
+    for i in range(len(diameters)):
+        scalar = predictor.calculate_blast_radius(float(diameters[i]), float(velocities[i]),
+                                                  float(densities[i]))
+        for name, values in batch.items():
+            assert values[i] == getattr(scalar, name), (name, diameters[i], velocities[i], densities[i])
+
+
+def test_debris_batch_matches_scalar(main_module):
+    predictor = main_module.impact_predictor
+    diameters, velocities, densities = _random_asteroids(300, seed=1)
+    rng = np.random.default_rng(2)
+    locations = [(float(lat), float(lng)) for lat, lng in
+                 zip(rng.uniform(-80, 80, 300), rng.uniform(-180, 180, 300))]
+    blast = predictor.calculate_blast_radius_batch(diameters, velocities, densities)["blast_radius"]
+    batch = predictor.calculate_debris_dispersion_batch(blast.tolist(), velocities.tolist(), locations)
+    for i, debris in enumerate(batch):
+        scalar = predictor.calculate_debris_dispersion(float(blast[i]), float(velocities[i]), locations[i])
+        assert debris.model_dump() == scalar.model_dump()
+
+
+def test_predict_batch_endpoint_matches_predict(client):
+    diameters, velocities, densities = _random_asteroids(200, seed=3)
+    asteroids = [asteroid(float(d), float(v), float(rho)) for d, v, rho in zip(diameters, velocities, densities)]
+    batch = client.post("/predict/batch", json={"asteroids": asteroids}).json()["blast_predictions"]
+    for i in range(0, 200, 20):
+        single = client.post("/predict", params={"fields": "blast_prediction"},
+                             json={"asteroid_data": asteroids[i]}).json()["blast_prediction"]
+        assert {name: values[i] for name, values in batch.items()} == single
+
+
+class _Handler:
+    """Coalescer handler recording its batches; fails items listed in failing"""
+
+    def __init__(self, failing=(), error=None):
+        self.batches = []
+        self.failing = set(failing)
+        self.error = error
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        await asyncio.sleep(0.05)
+        if self.error is not None:
+            raise self.error
+        return [ValueError(item) if item in self.failing else item * 10 for item in items]
+
+
+def test_coalescer_shares_identical_requests():
+    async def run():
+        handler = _Handler()
+        coalescer = Coalescer(handler, key=str, max_batch=8, max_delay=0.005)
+        first = await asyncio.gather(*(coalescer.submit(n % 3) for n in range(6)))
+        # Arrives while 1 is in flight: shares it instead of a new batch
+        in_flight = asyncio.ensure_future(coalescer.submit(1))
+        await asyncio.sleep(0.02)
+        again = asyncio.ensure_future(coalescer.submit(1))
+        return first, await in_flight, await again, handler, coalescer
+
+    first, in_flight, again, handler, coalescer = asyncio.run(run())
+    assert first == [0, 10, 20, 0, 10, 20]
+    assert handler.batches[0] == [0, 1, 2]
+    assert in_flight == again == 10
+    assert handler.batches[1:] == [[1]]
+    assert coalescer.stats()["deduplicated"] == 4
+
+
+def test_coalescer_errors_reach_every_waiter():
+    async def run(handler):
+        coalescer = Coalescer(handler, key=str, max_delay=0.005)
+        return await asyncio.gather(*(coalescer.submit(n) for n in (1, 2, 1, 3)), return_exceptions=True)
+
+    results = asyncio.run(run(_Handler(failing={1})))
+    assert isinstance(results[0], ValueError) and results[0] is results[2]
+    assert results[1] == 20 and results[3] == 30
+
+    failure = RuntimeError("handler crashed")
+    assert asyncio.run(run(_Handler(error=failure))) == [failure] * 4
+
+
+def test_micro_batcher_flushes_on_size_and_delay():
+    calls = []
+
+    def fn(rows):
+        calls.append(len(rows))
+        return rows.sum(axis=1)
+
+    async def run():
+        batcher = MicroBatcher(fn, max_batch=4, max_delay=0.05)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        full = await asyncio.gather(*(batcher.submit(np.array([[n, 1.0]])) for n in range(4)))
+        size_flush = loop.time() - started
+        started = loop.time()
+        partial = await asyncio.gather(*(batcher.submit(np.array([[n, 1.0]])) for n in range(3)))
+        return full, size_flush, partial, loop.time() - started, batcher
+
+    full, size_flush, partial, delay_flush, batcher = asyncio.run(run())
+    assert [float(x) for x in full] == [1.0, 2.0, 3.0, 4.0]
+    assert [float(x) for x in partial] == [1.0, 2.0, 3.0]
+    assert calls == [4, 3]
+    assert size_flush < 0.05 <= delay_flush  # a full batch does not wait for the timer
+    assert batcher.stats()["largest_batch"] == 4
+
+
+def test_micro_batcher_errors_reach_every_waiter():
+    failure = RuntimeError("model failed")
+
+    def fn(rows):
+        raise failure
+
+    async def run():
+        batcher = MicroBatcher(fn, max_batch=8, max_delay=0.005)
+        return await asyncio.gather(*(batcher.submit(np.zeros((1, 2))) for _ in range(3)),
+                                    return_exceptions=True)
+
+    assert asyncio.run(run()) == [failure] * 3
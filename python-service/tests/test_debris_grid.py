@@ -0,0 +1,14 @@
+import pytest
+from conftest import asteroid
+
+
+@pytest.mark.parametrize("diameter,velocity", [(150.0, 20.0), (37.3, 11.7), (812.0, 33.1)])
+def test_debris_grid_bounds_match_predict(client, diameter, velocity):
+    data = asteroid(diameter=diameter, velocity=velocity)
+    predicted = client.post("/predict", json={"asteroid_data": data})
+    grid = client.post("/predict/debris-grid", json={"asteroid_data": data, "resolution": 16})
+    assert predicted.status_code == 200 and grid.status_code == 200
+
+    debris = predicted.json()["debris_dispersion"]
+    assert grid.json()["grid_bounds"] == debris["grid_bounds"]
+    assert grid.json()["dispersion_radius"] == debris["dispersion_radius"]
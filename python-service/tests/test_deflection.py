@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from conftest import asteroid
+
+import deflection
+
+IMPACT = (40.7128, -74.0060)
+DAYS = 1200
+
+
+@pytest.fixture(scope="module", params=[(20.0, 90.0, 10.0), (30.0, 200.0, 30.0)])
+def trajectory(request):
+    speed, azimuth, elevation = request.param
+    return deflection.NominalTrajectory(deflection.v_infinity(speed), azimuth, elevation, DAYS)
+
+
+def test_required_delta_v_falls_with_lead_time(trajectory):
+    # Strictly over the first weeks; beyond that the push's place on the
+    # eccentric orbit matters, but one more orbit of lead always helps
+    assert (np.diff(trajectory.required_delta_v(np.arange(1, 61.0))) < 0).all()
+    period = trajectory.elements["period_days"]
+    lead = np.arange(1, DAYS - period, 1.0)
+    assert (trajectory.required_delta_v(lead + period) < trajectory.required_delta_v(lead)).all()
+    assert np.isinf(trajectory.required_delta_v(np.array([0.0]))).all()
+
+
+def test_zero_delta_v_hits_the_nominal_point(trajectory):
+    lead = np.array([0.0, 10.0, 365.0, 1000.5])
+    outcome = deflection.evaluate(trajectory, IMPACT, lead, np.zeros((len(lead), 3)), 150.0, 3000.0)
+    assert outcome["hit"].all()
+    np.testing.assert_allclose(outcome["impact_lat"], IMPACT[0], atol=1e-9)
+    np.testing.assert_allclose(outcome["impact_lng"], IMPACT[1], atol=1e-9)
+    np.testing.assert_allclose(outcome["arrival_shift"], 0.0, atol=1e-9)
+    np.testing.assert_allclose(outcome["miss_distance"], -trajectory.capture_radius)
+
+
+@pytest.mark.parametrize("direction", [(0.0, 1.0, 0.0), (1.0, 0.0, 0.0), (0.3, -1.0, 0.5)])
+def test_required_delta_v_is_the_miss_threshold(trajectory, direction):
+    lead = np.array([5.0, 90.0, 400.0, 1100.0])
+    required = trajectory.required_delta_v(lead, direction)
+    unit = np.asarray(direction) / np.linalg.norm(direction)
+    for scale, hit in ((0.99, True), (1.01, False)):
+        delta_v = (scale * required)[:, None] * unit
+        outcome = deflection.evaluate(trajectory, IMPACT, lead, delta_v, 150.0, 3000.0)
+        assert (outcome["hit"] == hit).all()
+        assert np.isnan(outcome["impact_lat"]).all() != hit
+
+
+def _deflect(client, **columns):
+    return client.post("/deflect", json={"asteroid_data": asteroid(), **columns})
+
+
+def test_deflect_rejects_mismatched_columns(client):
+    response = _deflect(client, lead_time_days=[10.0, 20.0], delta_v_transverse=[0.1])
+    assert response.status_code == 422
+    assert "equal lengths" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("lead", [-1.0, deflection.MAX_LEAD_DAYS + 1.0])
+def test_deflect_rejects_out_of_range_lead_times(client, lead):
+    assert _deflect(client, lead_time_days=[10.0, lead]).status_code == 422
+    response = client.post("/deflect/required", json={"asteroid_data": asteroid(), "lead_time_days": [lead]})
+    assert response.status_code == 422
+
+
+def test_deflect_without_delta_v_hits(client):
+    response = _deflect(client, lead_time_days=[30.0, 300.0])
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["hit"] == [True, True]
+    assert body["impact_lat"] == pytest.approx([IMPACT[0]] * 2)
+    assert body["impact_lng"] == pytest.approx([IMPACT[1]] * 2)
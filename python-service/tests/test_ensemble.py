@@ -0,0 +1,70 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from conftest import asteroid
+
+import ensemble
+from ensemble import CHUNK_SIZE, EnsembleRunner
+from executor import Overloaded, QueueFull
+
+SPEC = {
+    "diameter": 150.0, "velocity": 20.0, "density": 3000.0,
+    "diameter_uncertainty": 0.1, "density_uncertainty": 0.1, "velocity_uncertainty": 0.05,
+    "impact_uncertainty_km": 5.0, "raster_half_width": 30.0, "raster_resolution": 8,
+}
+
+
+def _runner(**kwargs) -> EnsembleRunner:
+    runner = EnsembleRunner(workers=1, **kwargs)
+    # Threads instead of spawned processes keep the tests fast
+    runner._pool = ThreadPoolExecutor(max_workers=1)
+    return runner
+
+
+def test_admission_bounds_pending_chunks():
+    runner = _runner(max_queue=2)
+    runner.create_job(3 * CHUNK_SIZE)  # an idle pool takes any job
+    with pytest.raises(QueueFull):
+        runner.create_job(CHUNK_SIZE)
+    assert runner.stats()["rejected"] == 1
+    assert runner.pending == 3
+
+
+def test_admission_rejects_long_waits():
+    runner = _runner(max_queue=100, max_wait=1.0)
+    runner.create_job(5 * CHUNK_SIZE)
+    with pytest.raises(Overloaded):
+        runner.create_job(CHUNK_SIZE)
+
+
+def test_evicting_an_active_job_cancels_its_chunks(monkeypatch):
+    monkeypatch.setattr(ensemble, "MAX_JOBS", 1)
+
+    async def run():
+        runner = _runner()
+        first = runner.create_job(40 * CHUNK_SIZE)
+        runner.start(first, SPEC, seed=1)
+        await asyncio.sleep(0)
+        second = runner.create_job(CHUNK_SIZE)  # evicts first
+        task = runner.start(second, SPEC, seed=2)
+        await asyncio.wait({first.task, task})
+        runner.shutdown()
+        return runner, first, second
+
+    runner, first, second = asyncio.run(run())
+    assert list(runner.jobs) == [second.job_id]
+    assert first.status == "cancelled" and first.chunks_done < first.chunks_total
+    assert second.status == "completed"
+    assert runner.pending == 0
+    assert runner.stats()["cancelled"] == 1
+
+
+def test_predict_ensemble_rejected_when_saturated(client, main_module, monkeypatch):
+    runner = _runner(max_queue=0)
+    runner.pending = 1
+    monkeypatch.setattr(main_module, "ensemble_runner", runner)
+    response = client.post("/predict/ensemble",
+                           json={"asteroid_data": asteroid(), "samples": CHUNK_SIZE})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
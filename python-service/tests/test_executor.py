@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from executor import Overloaded, StageExecutor
+
+
+def _square(x):
+    return x * x
+
+
+def test_process_workers_fork_after_warm_up():
+    warmed = []
+
+    async def before_fork():
+        await asyncio.sleep(0.05)
+        warmed.append(True)
+        return True
+
+    async def run():
+        executor = StageExecutor(kind="process", workers=1, before_fork=before_fork)
+        try:
+            results = await asyncio.gather(*(executor.run(_square, n) for n in range(3)))
+        finally:
+            executor.shutdown()
+        return results
+
+    assert asyncio.run(run()) == [0, 1, 4]
+    assert warmed  # awaited before the first job
+
+
+def test_process_workers_not_forked_before_ready():
+    async def not_ready():
+        return False
+
+    async def run():
+        executor = StageExecutor(kind="process", workers=1, before_fork=not_ready)
+        try:
+            await executor.run(_square, 2)
+        finally:
+            executor.shutdown()
+
+    with pytest.raises(Overloaded):
+        asyncio.run(run())
+
+
+def test_thread_pool_ignores_before_fork():
+    async def never():
+        raise AssertionError("thread pools do not fork")
+
+    async def run():
+        executor = StageExecutor(kind="thread", workers=1, before_fork=never)
+        try:
+            return await executor.run(_square, 3)
+        finally:
+            executor.shutdown()
+
+    assert asyncio.run(run()) == 9
@@ -0,0 +1,70 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from conftest import asteroid
+
+import impact_core
+import population
+from population import PopulationRaster, build_pyramid
+
+BOUNDS = (40.0, -75.0, 41.0, -74.0)  # south, west, north, east
+CENTER = (40.5, -74.5)
+
+
+@pytest.fixture(scope="module")
+def raster(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    people = rng.poisson(20, (512, 512)).astype(np.float32)
+    path = str(tmp_path_factory.mktemp("population"))
+    build_pyramid(people, BOUNDS, path, tile_size=64, levels=4)
+    return PopulationRaster(path)
+
+
+def test_each_radius_uses_its_own_level(raster, monkeypatch):
+    radii = (2.0, 5.0, 25.0)
+    full, levels = raster.exposure(CENTER, radii)
+    assert levels.tolist() == [0, 0, 0]
+
+    # Too few cells for the seismic window at level 0, plenty for the blast ring
+    monkeypatch.setattr(raster, "max_window_cells", 20000)
+    budgeted, levels = raster.exposure(CENTER, radii)
+    assert levels[0] == 0 and levels[2] > 0
+    assert budgeted[0] == full[0]
+    assert budgeted[2] == pytest.approx(full[2], rel=0.05)
+
+
+def test_tile_cache_is_thread_safe(raster, monkeypatch):
+    monkeypatch.setattr(population, "MAX_OPEN_TILES", 2)
+
+    def open_tiles(seed):
+        rng = np.random.default_rng(seed)
+        for tile_row, tile_col in rng.integers(0, 3, (5000, 2)).tolist():
+            raster._tile(0, tile_row, tile_col)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # interleave the cache updates as often as possible
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(open_tiles, range(8)))  # re-raises a worker's KeyError
+    finally:
+        sys.setswitchinterval(interval)
+    assert len(raster._tiles) <= 2
+
+
+def test_density_estimate_keeps_evacuee_cap():
+    exposed = impact_core.density_exposure(1000, (50.0,))[0]
+    assert exposed > impact_core.MAX_ESTIMATED_EVACUEES
+    needs = impact_core.resource_needs(50.0, exposed)
+    assert needs["estimated_evacuees"] == impact_core.MAX_ESTIMATED_EVACUEES
+    assert impact_core.resource_needs(50.0, exposed, measured=True)["estimated_evacuees"] == int(exposed)
+
+
+def test_mid_ocean_impact_without_raster_is_capped(client):
+    body = {"asteroid_data": asteroid(diameter=2000.0, velocity=25.0, location=(0.0, -160.0))}
+    response = client.post("/predict", json=body)
+    assert response.status_code == 200
+    resources = response.json()["resource_allocation"]
+    assert resources["exposure"]["source"] == "density"
+    assert resources["estimated_evacuees"] <= impact_core.MAX_ESTIMATED_EVACUEES
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import facilities
+from facilities import FacilityRegistry, km_to_chord
+from road_network import unit_vectors
+
+CENTER = (40.7128, -74.0060)
+TYPES = ["shelter", "hospital"]
+
+
+@pytest.fixture(scope="module")
+def registry():
+    """Dense registry: thousands of facilities inside a large blast radius"""
+    rng = np.random.default_rng(0)
+    count = 20000
+    lat = CENTER[0] + rng.uniform(-4, 4, count)
+    lng = CENTER[1] + rng.uniform(-5, 5, count)
+    return FacilityRegistry([f"f{i}" for i in range(count)], [f"f{i}" for i in range(count)],
+                            rng.choice(TYPES + ["safe_zone"], count), lat, lng,
+                            rng.choice([0.0, 50.0, 500.0], count))
+
+
+def _brute_force(registry, point, k, types, outside_km, avoid, min_capacity):
+    query = unit_vectors(np.array([point[0]]), np.array([point[1]]))[0]
+    avoid_vec = unit_vectors(np.array([avoid[0]]), np.array([avoid[1]]))[0]
+    points = unit_vectors(registry.lat, registry.lng)
+    ok = (np.isin(registry.types, types) & (registry.capacity >= min_capacity)
+          & (np.linalg.norm(points - avoid_vec, axis=1) > km_to_chord(outside_km)))
+    rows = np.flatnonzero(ok)
+    chords = np.linalg.norm(points[rows] - query, axis=1)
+    return [registry.ids[row] for row in rows[np.argsort(chords, kind="stable")[:k]]]
+
+
+@pytest.mark.parametrize("point,avoid", [(CENTER, CENTER), ((40.9, -73.6), CENTER), ((41.9, -74.0), CENTER)])
+@pytest.mark.parametrize("outside_km", [5.0, 150.0])
+def test_nearest_matches_brute_force(registry, point, avoid, outside_km):
+    found = registry.nearest(point, 5, TYPES, outside_km=outside_km, avoid=avoid, min_capacity=100.0)
+    assert [f["id"] for f in found] == _brute_force(registry, point, 5, TYPES, outside_km, avoid, 100.0)
+
+
+def test_large_radius_reads_only_the_ring(registry, monkeypatch):
+    read = []
+    candidates = facilities._CellIndex.candidates
+
+    def counting(self, *args):
+        rows = candidates(self, *args)
+        read.append(len(rows))
+        return rows
+
+    monkeypatch.setattr(facilities._CellIndex, "candidates", counting)
+    found = registry.nearest(CENTER, 3, ["shelter"], outside_km=300.0)
+    assert [f["id"] for f in found] == _brute_force(registry, CENTER, 3, ["shelter"], 300.0, CENTER, 1.0)
+
+    query = unit_vectors(np.array([CENTER[0]]), np.array([CENTER[1]]))
+    members, tree = registry._trees["shelter"]
+    inside = tree.query_ball_point(query[0], km_to_chord(300.0), return_length=True)
+    assert inside > facilities.RING_SEARCH_INSIDE
+    assert read and max(read) < inside / 2
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from hazard_routing import HazardRouter
+from road_network import RoadGraph
+
+CENTER = (40.7128, -74.0060)
+
+
+def _rings(radius):
+    return radius, 1.5 * radius, 2 * radius
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return RoadGraph.synthetic_grid(CENTER, 200, 200)
+
+
+@pytest.fixture(scope="module")
+def source(graph):
+    return int(graph.nearest_nodes([CENTER])[0][0])
+
+
+def _assert_tree_matches_fresh(router, field, tree, source):
+    fresh = router._full(field, source)
+    np.testing.assert_allclose(tree.dist, fresh.dist, rtol=1e-8)
+    # Every parent pointer is a real edge whose cost accounts for the distance
+    reached = np.flatnonzero(tree.pred_edge >= 0)
+    np.testing.assert_allclose(
+        tree.dist[reached],
+        tree.dist[tree.pred[reached]] + field.weights[tree.pred_edge[reached]],
+        rtol=1e-8,
+    )
+    assert tree.pred[source] < 0
+
+
+@pytest.mark.parametrize("before,after", [(7.8, 7.85), (7.8, 7.801), (7.85, 7.8)])
+def test_small_radius_change_is_repaired_incrementally(graph, source, before, after):
+    router = HazardRouter(graph)
+    router.tree(router.field(CENTER, _rings(before)), source)
+    revised = router.field(CENTER, _rings(after))
+    assert (revised.edge_class != router.field(CENTER, _rings(before)).edge_class).any()
+
+    tree = router.tree(revised, source)
+
+    assert router.stats()["incremental_repairs"] == 1
+    assert router.stats()["full_computations"] == 1
+    _assert_tree_matches_fresh(router, revised, tree, source)
+    target = int(np.nanargmax(np.where(np.isfinite(tree.dist), tree.dist, np.nan)))
+    edges = tree.path_edges(target)
+    assert tree.path_nodes(target)[0] == source
+    assert revised.weights[edges].sum() == pytest.approx(tree.dist[target])
+
+
+def test_large_radius_change_falls_back_to_full_dijkstra(graph, source):
+    router = HazardRouter(graph)
+    router.tree(router.field(CENTER, _rings(7.8)), source)
+    revised = router.field(CENTER, _rings(9.0))
+
+    tree = router.tree(revised, source)
+
+    assert router.stats()["incremental_repairs"] == 0
+    assert router.stats()["full_computations"] == 2
+    _assert_tree_matches_fresh(router, revised, tree, source)
+
+
+def test_router_counters_are_exposed(graph, source, client, main_module, monkeypatch):
+    router = HazardRouter(graph)
+    router.tree(router.field(CENTER, _rings(7.8)), source)
+    router.tree(router.field(CENTER, _rings(7.85)), source)
+    optimizer = main_module.EvacuationOptimizer()
+    optimizer.routing_asset.swap((graph, None, router))
+    monkeypatch.setattr(main_module, "evacuation_optimizer", optimizer)
+
+    health = client.get("/health").json()["hazard_routing"]
+    assert health["full_computations"] == 1 and health["incremental_repairs"] == 1
+    metrics = client.get("/metrics").text
+    assert 'aegis_hazard_routing_total{kind="full_tree"} 1' in metrics
+    assert 'aegis_hazard_routing_total{kind="incremental_repair"} 1' in metrics
+    assert 'aegis_hazard_routing_total{kind="index_route"} 0' in metrics
+
+
+def test_router_counters_absent_without_road_graph(client):
+    assert client.get("/health").json()["hazard_routing"] is None
+    assert "aegis_hazard_routing_total{" not in client.get("/metrics").text
@@ -0,0 +1,35 @@
+import asyncio
+
+from pydantic import BaseModel
+
+from pipeline import Pipeline
+from prediction_cache import PredictionCache
+from startup import Assets, LazyAsset
+
+
+class Request(BaseModel):
+    diameter: float
+
+
+def test_reload_invalidates_stage_memo():
+    datasets = iter(["old", "new"])
+    dataset = LazyAsset("dataset", lambda: next(datasets))
+    assets = Assets([dataset])
+    memo = PredictionCache()
+    pipeline = Pipeline(memo=memo, generation=lambda: assets.generation)
+    calls = []
+
+    @pipeline.stage("exposure", request_fields=["diameter"], offload=False)
+    def exposure(request):
+        calls.append(request.diameter)
+        return (dataset.get(), request.diameter)
+
+    request = Request(diameter=150.0)
+    dataset.get()
+    assert asyncio.run(pipeline.run(request))["exposure"] == ("old", 150.0)
+    assert asyncio.run(pipeline.run(request))["exposure"] == ("old", 150.0)
+    assert len(calls) == 1
+
+    assets.reload()
+    assert asyncio.run(pipeline.run(request))["exposure"] == ("new", 150.0)
+    assert len(calls) == 2
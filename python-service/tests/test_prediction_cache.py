@@ -0,0 +1,65 @@
+import types
+
+import pytest
+from conftest import asteroid
+
+import prediction_cache
+from prediction_cache import PredictionCache, canonical_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"time": 1000.0}
+    monkeypatch.setattr(prediction_cache, "time", types.SimpleNamespace(monotonic=lambda: now["time"]))
+    return now
+
+
+def test_canonical_key_ignores_key_order():
+    assert canonical_key({"a": 1, "b": [1.5, None]}) == canonical_key({"b": [1.5, None], "a": 1})
+    assert canonical_key({"a": 1}) != canonical_key({"a": 1.5})
+
+
+def test_request_key_ignores_labels_and_impact_time(main_module):
+    def key(data, asteroid_id=None):
+        return main_module.prediction_cache_key(
+            main_module.PredictionRequest(asteroid_data=data, asteroid_id=asteroid_id))
+
+    base = asteroid()
+    assert key(base) == key({**base, "impact_time": "2041-06-30T12:00:00Z"})
+    assert key(base) == key(base, asteroid_id="2024 YR4")
+    assert key(base) != key(asteroid(diameter=151.0))
+    # Declared field order, not the client's JSON key order
+    assert key(base) == key(dict(reversed(list(base.items()))))
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = PredictionCache(max_size=4, ttl=10.0)
+    cache.put("k", "value", alias="a")
+    clock["time"] += 9.9
+    assert cache.get("k") == "value"
+    clock["time"] += 0.2
+    assert cache.get("k") is None and cache.get_by_alias("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = PredictionCache(max_size=2, ttl=60.0)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # b is now least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_predict_hit_across_impact_times(client, main_module):
+    data = asteroid(diameter=321.0)
+    first = client.post("/predict", json={"asteroid_data": data})
+    hits = main_module.prediction_cache.hits
+    second = client.post("/predict", json={"asteroid_data": {**data, "impact_time": "2031-02-03T04:05:06Z"}})
+    assert first.status_code == second.status_code == 200
+    assert main_module.prediction_cache.hits == hits + 1
+    first, second = first.json(), second.json()
+    assert second["processing_time"] <= first["processing_time"]
+    assert {**second, "processing_time": None} == {**first, "processing_time": None}
@@ -0,0 +1,129 @@
+import json
+import sqlite3
+import time
+import types
+
+import pytest
+
+import prediction_store
+from prediction_store import HISTORY_COLUMNS, PredictionStore, apply_retention, connect
+
+DAY = 86400.0
+
+
+def _flatten(request, response):
+    return {"diameter": request["diameter"], "blast_radius": response["blast_radius"],
+            "risk_level": response["risk_level"]}
+
+
+def _encode(response):
+    return json.dumps(response).encode()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """prediction_store's wall clock, settable by the test"""
+    now = {"time": 1.7e9}
+    fake = types.SimpleNamespace(time=lambda: now["time"], monotonic=time.monotonic)
+    monkeypatch.setattr(prediction_store, "time", fake)
+    return now
+
+
+def _store(tmp_path, **options) -> PredictionStore:
+    options.setdefault("max_delay", 0.05)
+    store = PredictionStore(str(tmp_path / "predictions.db"), _flatten, _encode, **options)
+    store.start()
+    return store
+
+
+def _record(store, asteroid_id, diameter, key=None):
+    response = {"blast_radius": diameter / 10, "risk_level": "low"}
+    store.record(asteroid_id, key or f"key-{diameter}", {"diameter": diameter}, response)
+
+
+def _rows(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_writes_are_batched(tmp_path, clock):
+    store = _store(tmp_path, max_batch=64, max_delay=1.0)
+    for n in range(150):
+        _record(store, "a", float(n + 1))
+    store.close()
+
+    assert store.written == 150 and store.dropped == 0
+    assert store.batches < 150 and store.largest_batch <= 64
+    assert _rows(store.path, "predictions") == 150
+    assert _rows(store.path, "responses") == 150
+
+
+def test_dedupe_window(tmp_path, clock):
+    store = _store(tmp_path, dedupe_window=60.0)
+    _record(store, "a", 100.0)
+    _record(store, "a", 100.0)  # a cache hit moments later
+    _record(store, "b", 100.0)  # same request, another asteroid
+    clock["time"] += 61
+    _record(store, "a", 100.0)
+    store.close()
+
+    assert store.duplicates == 1
+    assert _rows(store.path, "predictions") == 3
+    assert _rows(store.path, "responses") == 1  # one body per distinct request
+
+
+def test_history_time_range_and_columns(tmp_path, clock):
+    store = _store(tmp_path)
+    start = clock["time"]
+    for n in range(5):
+        _record(store, "a", float(n + 1))
+        _record(store, "b", float(n + 100))
+        clock["time"] += 10
+    store.close()
+
+    history = store.history("a", since=start + 10, until=start + 40, columns=["diameter", "risk_level"])
+    assert history["count"] == 3
+    assert history["diameter"] == [2.0, 3.0, 4.0]  # oldest first
+    assert set(history) == {"count", "created_at", "asteroid_id", "diameter", "risk_level"}
+    assert history["asteroid_id"] == ["a"] * 3
+
+    newest = store.history("a", limit=3)
+    assert newest["diameter"] == [3.0, 4.0, 5.0]
+    assert set(newest) == {"count", "created_at", "asteroid_id", *HISTORY_COLUMNS}
+    with pytest.raises(ValueError):
+        store.history(columns=["diameter", "password"])
+
+
+def test_latest(tmp_path, clock):
+    store = _store(tmp_path)
+    _record(store, "a", 100.0)
+    clock["time"] += 1
+    _record(store, "a", 200.0)
+    _record(store, "b", 300.0)
+    store.close()
+
+    assert json.loads(store.latest("a")) == {"blast_radius": 20.0, "risk_level": "low"}
+    assert store.latest("missing") is None
+
+
+def test_retention_by_age_and_rows(tmp_path, clock):
+    store = _store(tmp_path)
+    for n in range(6):
+        _record(store, "a", float(n + 1))
+        clock["time"] += DAY
+    store.close()
+    conn = connect(store.path)
+    try:
+        # Rows 1-2 are over 4.5 days old at the clock's "now"
+        assert apply_retention(conn, retention_days=4.5) == 2
+        assert apply_retention(conn, max_rows=3) == 1
+        assert apply_retention(conn, retention_days=30, max_rows=3) == 0
+        remaining = [row[0] for row in conn.execute("SELECT diameter FROM predictions ORDER BY id")]
+        keys = {row[0] for row in conn.execute("SELECT request_key FROM responses")}
+    finally:
+        conn.close()
+    assert remaining == [4.0, 5.0, 6.0]
+    assert keys == {"key-4.0", "key-5.0", "key-6.0"}  # orphaned bodies deleted
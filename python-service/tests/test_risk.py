@@ -0,0 +1,46 @@
+import numpy as np
+from conftest import asteroid
+
+import impact_core
+from startup import LazyAsset
+
+
+class _FixedModel:
+    """Stands in for a RiskModel that always rates an impact low"""
+
+    classes = ("low", "medium", "high")
+    version = "test"
+
+    def predict_proba(self, rows):
+        return np.tile([0.9, 0.08, 0.02], (len(rows), 1))
+
+
+def test_rules_keep_blast_driven_evacuation_wording():
+    rules = impact_core.risk_rules(15.0, True, 25.0)
+    assert rules["risk_level"] == "high"
+    assert rules["recommendations"] == ["Prepare for evacuation", "Evacuate to higher ground",
+                                        "Seek immediate shelter"]
+    assert "Moderate blast radius" in rules["risk_factors"]
+
+    small = impact_core.risk_rules(5.0, True, 10.0)
+    assert small["risk_level"] == "high"
+    assert small["recommendations"] == ["Evacuate to higher ground"]
+    assert impact_core.risk_rules(25.0, False, 10.0)["recommendations"] == ["Immediate evacuation required"]
+
+
+def test_model_level_drives_recommendations(client, main_module, monkeypatch):
+    model = LazyAsset("risk_model", _FixedModel)
+    model.get()
+    monkeypatch.setattr(main_module, "risk_model", model)
+    body = {"asteroid_data": asteroid(diameter=1234.0, velocity=25.0)}
+
+    response = client.post("/predict", json=body)
+
+    assert response.status_code == 200
+    risk = response.json()["risk_assessment"]
+    tsunami = response.json()["tsunami_prediction"]["tsunami_risk"]
+    assert risk["model_version"] == "test"
+    assert risk["risk_level"] == "low" and risk["rule_risk_level"] == "high"
+    assert "Large blast radius" in risk["risk_factors"]
+    assert "Immediate evacuation required" not in risk["recommendations"]
+    assert risk["recommendations"] == impact_core.risk_recommendations("low", tsunami, 25.0)
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from hazard_routing import HazardRouter
+from road_network import RoadGraph
+from route_index import RouteIndex, build_index, facility_anchors
+
+CENTER = (40.7128, -74.0060)
+SAFE_ZONES = [(40.78, -73.95), (40.64, -74.08), (40.74, -74.13), (40.69, -73.89)]
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return RoadGraph.synthetic_grid(CENTER, 150, 150)
+
+
+@pytest.fixture(scope="module")
+def index(graph, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("route_index"))
+    build_index(graph, path, SAFE_ZONES, extra_landmarks=4)
+    return RouteIndex(path, graph)
+
+
+def _cost(graph, weights, path):
+    return float(weights[graph.path_edges(path)].sum()) if len(path) > 1 else 0.0
+
+
+def _starts(count, reach_km, seed=0):
+    """Points scattered around the impact, inside the hazard zones"""
+    rng = np.random.default_rng(seed)
+    angle = rng.uniform(0, 2 * np.pi, count)
+    radius = rng.uniform(0, reach_km, count)
+    return [(CENTER[0] + r / 111.32 * np.sin(a), CENTER[1] + r / 84.3 * np.cos(a))
+            for a, r in zip(angle, radius)]
+
+
+def test_index_paths_match_dijkstra(graph, index):
+    rng = np.random.default_rng(0)
+    sources = rng.integers(0, graph.num_nodes, 20)
+    targets = list(index.landmarks[:4]) + rng.integers(0, graph.num_nodes, 4).tolist()
+    for source in sources.tolist():
+        cost, _ = graph.shortest_path_tree(source)
+        for target in targets:
+            path = index.path(source, target)
+            assert path[0] == source and path[-1] == target
+            assert _cost(graph, graph.weights, path) == pytest.approx(cost[target], rel=1e-6)
+
+
+@pytest.mark.parametrize("blast_km", [0.8, 1.5, 3.0])
+def test_exit_paths_match_hazard_dijkstra(graph, index, blast_km):
+    router = HazardRouter(graph)
+    field = router.field(CENTER, (blast_km, 1.5 * blast_km, 2 * blast_km))
+    targets = [int(n) for n in graph.nearest_nodes(SAFE_ZONES)[0]]
+
+    for start in _starts(15, 2 * blast_km):
+        source = int(graph.nearest_nodes([start])[0][0])
+        tree = router._full(field, source)
+        for target, path in zip(targets, router.exit_paths(field, source, targets, index)):
+            if path is None:
+                continue
+            assert path[0] == source and path[-1] == target
+            assert _cost(graph, field.weights, path) == pytest.approx(tree.dist[target], rel=1e-6)
+    assert router.stats()["index_routes"] > 0
+
+
+def test_road_legs_use_index_from_inside_the_zones(graph, index, main_module):
+    with_index = main_module.EvacuationOptimizer()
+    with_index.routing_asset.swap((graph, index, HazardRouter(graph)))
+    without_index = main_module.EvacuationOptimizer()
+    without_index.routing_asset.swap((graph, None, HazardRouter(graph)))
+    radii = (1.0, 1.5, 2.0)
+
+    for start in _starts(10, 1.5, seed=1):
+        indexed = with_index._road_legs(start, SAFE_ZONES, CENTER, radii)
+        plain = without_index._road_legs(start, SAFE_ZONES, CENTER, radii)
+        for leg, expected in zip(indexed, plain):
+            assert leg[1] == pytest.approx(expected[1], rel=1e-6)  # distance km
+            assert leg[2] == pytest.approx(expected[2], rel=1e-6)  # free-flow minutes
+    assert with_index.hazard_router.stats()["index_routes"] > 0
+
+
+def test_registered_facilities_become_landmarks(graph, tmp_path):
+    csv = tmp_path / "facilities.csv"
+    csv.write_text("id,name,type,lat,lng,capacity\n"
+                   "a,A,shelter,40.76,-73.97,500\n"
+                   "b,B,hospital,40.66,-74.05,200\n"
+                   "c,C,evacuation_center,40.70,-73.93,1000\n")
+    anchors = facility_anchors(str(csv), ["shelter", "evacuation_center"])
+    assert anchors == [(40.76, -73.97), (40.70, -73.93)]
+
+    build_index(graph, str(tmp_path / "index"), anchors, extra_landmarks=1)
+    index = RouteIndex(str(tmp_path / "index"), graph)
+    nodes, _ = graph.nearest_nodes(anchors + [(40.66, -74.05)])
+    assert [index.is_landmark(int(node)) for node in nodes] == [True, True, False]
@@ -0,0 +1,92 @@
+import json
+import math
+
+import numpy as np
+import pytest
+from conftest import asteroid
+
+import impact_core
+from physics_kernels import impact_energy_kernel
+from simulation import ImpactSimulation
+
+IMPACT = (40.7128, -74.0060)
+
+
+def _simulation(diameter=150.0, velocity=20.0, density=3000.0, tsunami_height=None, resolution=96):
+    blast = impact_core.blast_radii(diameter, velocity, density)
+    energy = float(impact_energy_kernel(diameter, velocity, density))
+    return ImpactSimulation(IMPACT, blast, energy, diameter, velocity, tsunami_height, resolution)
+
+
+def _run(simulation, duration, steps):
+    for _ in range(steps):
+        simulation.step(duration / steps)
+
+
+@pytest.mark.parametrize("diameter,velocity", [(50.0, 12.0), (150.0, 20.0), (1000.0, 30.0)])
+def test_zones_end_at_the_predict_radii(diameter, velocity):
+    simulation = _simulation(diameter, velocity)
+    _run(simulation, simulation.default_duration(), 200)
+
+    radii = (simulation.blast_radius, simulation.thermal_radius, simulation.seismic_radius)
+    expected = np.vectorize(lambda d: impact_core.hazard_zone(d, radii))(simulation.distance)
+    mismatched = simulation.zones != expected
+    # Only cells within rounding of a ring boundary may disagree
+    near_boundary = np.min([np.abs(simulation.distance - r) for r in radii], axis=0) < 1e-9
+    assert not (mismatched & ~near_boundary).any()
+    assert (simulation.zones == impact_core.BLAST).any()
+
+
+def test_simulate_uses_the_predict_radii(client):
+    data = asteroid()
+    predicted = client.post("/predict", params={"fields": "blast_prediction"},
+                            json={"asteroid_data": data}).json()["blast_prediction"]
+    response = client.post("/simulate", json={"asteroid_data": data, "steps": 2, "resolution": 32})
+    assert response.status_code == 200
+    setup = json.loads(response.text.splitlines()[0])
+    assert setup["stage"] == "setup"
+    assert setup["data"]["blast_prediction"] == predicted
+
+
+def test_debris_converges_to_the_final_deposit():
+    simulation = _simulation()
+    final = simulation._debris_final
+    previous = simulation.debris.copy()
+    steps = 100
+    for _ in range(steps):
+        simulation.step(simulation.default_duration() / steps)
+        assert (simulation.debris >= previous - 1e-12).all()
+        assert (simulation.debris <= final + 1e-12).all()
+        previous = simulation.debris.copy()
+    # Every cell has settled for at least five e-folding times
+    assert np.abs(simulation.debris - final).max() <= math.exp(-5) * final.max() + 1e-9
+
+
+def test_wave_stays_bounded_under_sub_stepping():
+    simulation = _simulation(1000.0, 20.0, tsunami_height=40.0)
+    dt = 25 * simulation._wave_step  # many CFL sub-steps per step
+    _run(simulation, 200 * dt, 200)
+    assert np.isfinite(simulation.wave).all()
+    assert np.abs(simulation.wave).max() <= simulation.wave_source_height
+    assert np.abs(simulation.wave).max() > 0
+
+
+def test_window_slices_and_bounds():
+    simulation = _simulation()
+    south, west, north, east = simulation.bounds
+    rows, cols, bounds = simulation.window()
+    assert (rows, cols, bounds) == (slice(0, 96), slice(0, 96), simulation.bounds)
+
+    lat_step, lng_step = (north - south) / 96, (east - west) / 96
+    roi = (south + 10.3 * lat_step, west + 20.6 * lng_step, south + 40.2 * lat_step, west + 50.5 * lng_step)
+    rows, cols, bounds = simulation.window(roi)
+    # Whole cells covering roi: rows count from the north edge
+    assert rows == slice(96 - 41, 96 - 10) and cols == slice(20, 51)
+    assert bounds[0] <= roi[0] and bounds[1] <= roi[1] and bounds[2] >= roi[2] and bounds[3] >= roi[3]
+    assert bounds == pytest.approx((south + 10 * lat_step, west + 20 * lng_step,
+                                    south + 41 * lat_step, west + 51 * lng_step), abs=1e-6)
+    frame = simulation.frame(("zones", "debris"), rows, cols)
+    assert frame["zones"].shape == frame["debris"].shape == (31, 31)
+
+    rows, cols, _ = simulation.window((north + 1, east + 1, north + 2, east + 2))
+    assert rows.start >= rows.stop and cols.start >= cols.stop
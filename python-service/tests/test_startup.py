@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from startup import Assets, LazyAsset
+
+
+class _Flaky:
+    """Loader that fails until told to succeed"""
+
+    def __init__(self):
+        self.calls = 0
+        self.broken = True
+
+    def __call__(self):
+        self.calls += 1
+        if self.broken:
+            raise OSError("dataset unreadable")
+        return "dataset"
+
+
+def test_failed_optional_asset_degrades_to_fallback():
+    loader = _Flaky()
+    asset = LazyAsset("coastline", loader, fallback=lambda: "built-in")
+    assets = Assets([asset])
+
+    assert asyncio.run(_start(assets, "eager"))
+    assert asset.get() == "built-in" and asset.get() == "built-in"
+    assert asset.status()["state"] == "degraded" and "unreadable" in asset.status()["error"]
+    assert loader.calls == 1  # not retried before retry_at
+
+    loader.broken = False
+    asset.retry_at = 0.0
+    assert asset.get() == "dataset"
+    assert asset.loaded and asset.error is None
+
+
+def test_failed_required_asset_is_retried_by_wait():
+    loader = _Flaky()
+    asset = LazyAsset("road_network", loader)
+    assets = Assets([asset])
+
+    assert not asyncio.run(_start(assets, "eager"))
+    assert assets.failed == ["road_network"]
+    assert not asyncio.run(assets.wait(1.0))  # retry not due yet
+    assert loader.calls == 1
+
+    loader.broken = False
+    asset.retry_at = 0.0
+    assert asyncio.run(assets.wait(1.0))
+    assert asset.get() == "dataset" and not assets.failed
+
+
+def test_required_asset_raises_until_it_loads():
+    asset = LazyAsset("road_network", _Flaky())
+    with pytest.raises(OSError):
+        asset.get()
+    assert asset.status()["state"] == "failed"
+
+
+async def _start(assets, mode):
+    await assets.start(mode)
+    return assets.ready
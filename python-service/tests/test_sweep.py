@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import impact_core
+import scenario_sweep
+from startup import LazyAsset
+
+RADII = scenario_sweep.FIELDS[:4]
+
+
+def _scenarios(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [np.exp(rng.uniform(np.log(lo), np.log(hi), count))
+            for lo, hi, _ in (scenario_sweep.DEFAULT_AXES[name] for name in scenario_sweep.AXES)]
+
+
+@pytest.fixture(params=["float64", "float32"])
+def table(request, main_module, monkeypatch):
+    table = scenario_sweep.build_sweep(dtype=np.dtype(request.param))
+    asset = LazyAsset("sweep_table", lambda: table)
+    asset.get()
+    monkeypatch.setattr(main_module, "sweep_table", asset)
+    return table
+
+
+def test_batch_lookups_match_predict(main_module, table):
+    diameter, velocity, density = _scenarios(20000)
+    blast = main_module.sweep_lookup_batch(diameter, velocity, density)["blast_prediction"]
+    for i in range(len(diameter)):
+        exact = impact_core.blast_radii(float(diameter[i]), float(velocity[i]), float(density[i]))
+        assert {name: float(blast[name][i]) for name in RADII} == exact
+
+
+def test_point_lookups_match_predict(client, table):
+    for diameter, velocity, density in zip(*_scenarios(300, seed=1)):
+        response = client.get("/predict/sweep/lookup",
+                              params={"diameter": diameter, "velocity": velocity, "density": density})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["from_table"]
+        assert body["blast_prediction"] == impact_core.blast_radii(diameter, velocity, density)